@@ -0,0 +1,6 @@
+// /usr/bin/gcc -shared -fpic -lm
+#include <stdio.h>
+#include <stdbool.h>
+
+float universe(float a, float b) { return a + b; }
+void branch(bool a) { if(a) printf("branch function from c works fine\n"); }
\ No newline at end of file
@@ -0,0 +1,52 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid2d_d;
+ void  amr_prolong(struct __Grid2d_d fine, struct __Grid2d_d coarse, int32_t f0, int32_t f1, int32_t c0, int32_t c1, int32_t ratio, bool ghosts, const int32_t* $region);
+struct __Grid2d_d {
+  int32_t time;
+  int32_t shape[2];
+  double** data;
+  uint8_t* boundary_mask;
+};
+static inline double* __Grid2d_d_at(struct __Grid2d_d grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  space_offset = space_offset * grid.shape[1] + space_offset_1;
+  return &grid.data[time_offset][space_offset];
+}
+ void  amr_prolong(struct __Grid2d_d fine, struct __Grid2d_d coarse, int32_t f0, int32_t f1, int32_t c0, int32_t c1, int32_t ratio, bool ghosts, const int32_t* $region){
+#line 14 "/root/package/xgrid/amr/transfer.py"
+  
+        #pragma omp parallel for collapse(2)
+        for (int32_t i = 0; i < fine.shape[0]; i++) {
+            for (int32_t j = 0; j < fine.shape[1]; j++) {
+                int32_t id = i * fine.shape[1] + j;
+                if (ghosts && fine.boundary_mask[id] != 255) {
+                    continue;
+                }
+                double x = (f0 + i + 0.5) / ratio - 0.5 - c0, y = (f1 + j + 0.5) / ratio - 0.5 - c1;
+                // cells beyond the outermost cell centers of the coarse array are extrapolated linearly
+                int32_t x0 = (int32_t) floor(x), y0 = (int32_t) floor(y);
+                x0 = x0 < 0 ? 0 : x0 > coarse.shape[0] - 2 ? coarse.shape[0] - 2 : x0;
+                y0 = y0 < 0 ? 0 : y0 > coarse.shape[1] - 2 ? coarse.shape[1] - 2 : y0;
+                int32_t x1 = x0 + 1, y1 = y0 + 1;
+                double tx = x - x0, ty = y - y0;
+                int32_t n = coarse.shape[1];
+                fine.data[0][id] = (1 - tx) * ((1 - ty) * coarse.data[0][x0 * n + y0] + ty * coarse.data[0][x0 * n + y1]) +
+                                   tx * ((1 - ty) * coarse.data[0][x1 * n + y0] + ty * coarse.data[0][x1 * n + y1]);
+            }
+        }
+        
+}
@@ -0,0 +1,55 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid2d_d;
+ void  smooth(struct __Grid2d_d a, const int32_t* $region);
+struct __Grid2d_d {
+  int32_t time;
+  int32_t shape[2];
+  double** data;
+  uint8_t* boundary_mask;
+};
+static inline double* __Grid2d_d_at(struct __Grid2d_d grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  space_offset = space_offset * grid.shape[1] + space_offset_1;
+  return &grid.data[time_offset][space_offset];
+}
+ void  smooth(struct __Grid2d_d a, const int32_t* $region){
+#line 748 "/tmp/t.py"
+  {
+    double* $value = a.data[a.time];
+    bool $scratch = $value != NULL;
+    if (!$scratch) {
+      $value = malloc(sizeof(double) * (a.shape[0] * a.shape[1]));
+    }
+#pragma omp parallel for collapse(2) schedule(static) if((int64_t) ($region_upper($region, 0, a.shape[0]) - $region_lower($region, 0)) * (int64_t) ($region_upper($region, 1, a.shape[1]) - $region_lower($region, 1)) >= 4096)
+    for (int32_t $dim0 = 0; $dim0 < a.shape[0]; $dim0++) {
+      for (int32_t $dim1 = 0; $dim1 < a.shape[1]; $dim1++) {
+        if ($dim0 >= $region_lower($region, 0) && $dim0 < $region_upper($region, 0, a.shape[0]) && $dim1 >= $region_lower($region, 1) && $dim1 < $region_upper($region, 1, a.shape[1])) {
+          $value[($dim0) * a.shape[1] + $dim1] = (((((*__Grid2d_d_at(a, $dim0 + 1, $dim1 + 0, 0)) + (*__Grid2d_d_at(a, $dim0 + -1, $dim1 + 0, 0))) + (*__Grid2d_d_at(a, $dim0 + 0, $dim1 + 1, 0))) + (*__Grid2d_d_at(a, $dim0 + 0, $dim1 + -1, 0))) * 0.25);
+        } else {
+          $value[($dim0) * a.shape[1] + $dim1] = a.data[0][($dim0) * a.shape[1] + $dim1];
+        }
+      }
+    }
+    if ($scratch) {
+      a.data[a.time] = a.data[0];
+      a.data[0] = $value;
+    } else {
+      memcpy(a.data[0], $value, sizeof(double) * (a.shape[0] * a.shape[1]));
+      free($value);
+    }
+  }
+}
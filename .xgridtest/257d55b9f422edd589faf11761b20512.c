@@ -0,0 +1,40 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid2d_f;
+ void  diffuse(struct __Grid2d_f u, double k, const int32_t* $region);
+struct __Grid2d_f {
+  int32_t time;
+  int32_t shape[2];
+  float** data;
+  uint8_t* boundary_mask;
+};
+static inline float* __Grid2d_f_at(struct __Grid2d_f grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  space_offset = space_offset * grid.shape[1] + space_offset_1;
+  return &grid.data[time_offset][space_offset];
+}
+ void  diffuse(struct __Grid2d_f u, double k, const int32_t* $region){
+#line 462 "/tmp/t.py"
+#pragma omp parallel for collapse(2) schedule(static) if((int64_t) ($region_upper($region, 0, u.shape[0]) - $region_lower($region, 0)) * (int64_t) ($region_upper($region, 1, u.shape[1]) - $region_lower($region, 1)) >= 4096)
+  for (int32_t $dim0 = $region_lower($region, 0); $dim0 < $region_upper($region, 0, u.shape[0]); $dim0++) {
+    for (int32_t $dim1 = $region_lower($region, 1); $dim1 < $region_upper($region, 1, u.shape[1]); $dim1++) {
+      if (u.boundary_mask[($dim0) * u.shape[1] + $dim1] == 0) {
+        double $cse0 = ((double)((*__Grid2d_f_at(u, $dim0 + 0, $dim1 + 0, 1))));
+        (*__Grid2d_f_at(u, $dim0 + 0, $dim1 + 0, 0)) = ((float)(($cse0 + (k * ((((((double)((*__Grid2d_f_at(u, $dim0 + 1, $dim1 + 0, 1)))) + ((double)((*__Grid2d_f_at(u, $dim0 + -1, $dim1 + 0, 1))))) + ((double)((*__Grid2d_f_at(u, $dim0 + 0, $dim1 + 1, 1))))) + ((double)((*__Grid2d_f_at(u, $dim0 + 0, $dim1 + -1, 1))))) - (4.0 * $cse0))))));
+      }
+    }
+  }
+}
@@ -0,0 +1,60 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid2d_d;
+ void  amr_restrict(struct __Grid2d_d coarse, struct __Grid2d_d fine, int32_t c0, int32_t c1, int32_t f0, int32_t f1, int32_t ratio, const int32_t* $region);
+struct __Grid2d_d {
+  int32_t time;
+  int32_t shape[2];
+  double** data;
+  uint8_t* boundary_mask;
+};
+static inline double* __Grid2d_d_at(struct __Grid2d_d grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  space_offset = space_offset * grid.shape[1] + space_offset_1;
+  return &grid.data[time_offset][space_offset];
+}
+ void  amr_restrict(struct __Grid2d_d coarse, struct __Grid2d_d fine, int32_t c0, int32_t c1, int32_t f0, int32_t f1, int32_t ratio, const int32_t* $region){
+#line 41 "/root/package/xgrid/amr/transfer.py"
+  
+        int32_t $lower0 = (f0 - (f0 < 0 ? ratio - 1 : 0)) / ratio - c0, $lower1 = (f1 - (f1 < 0 ? ratio - 1 : 0)) / ratio - c1;
+        int32_t $upper0 = (f0 + fine.shape[0] + ratio - 1) / ratio - c0, $upper1 = (f1 + fine.shape[1] + ratio - 1) / ratio - c1;
+        $lower0 = $lower0 < 0 ? 0 : $lower0;
+        $lower1 = $lower1 < 0 ? 0 : $lower1;
+        $upper0 = $upper0 > coarse.shape[0] ? coarse.shape[0] : $upper0;
+        $upper1 = $upper1 > coarse.shape[1] ? coarse.shape[1] : $upper1;
+        #pragma omp parallel for collapse(2)
+        for (int32_t i = $lower0; i < $upper0; i++) {
+            for (int32_t j = $lower1; j < $upper1; j++) {
+                int32_t fi = (c0 + i) * ratio - f0, fj = (c1 + j) * ratio - f1;
+                if (fi < 0 || fj < 0 || fi + ratio > fine.shape[0] || fj + ratio > fine.shape[1]) {
+                    continue;
+                }
+                double sum = 0;
+                bool covered = true;
+                for (int32_t a = 0; a < ratio; a++) {
+                    for (int32_t b = 0; b < ratio; b++) {
+                        int32_t id = (fi + a) * fine.shape[1] + fj + b;
+                        covered = covered && fine.boundary_mask[id] != 255;
+                        sum += fine.data[0][id];
+                    }
+                }
+                if (covered) {
+                    coarse.data[0][i * coarse.shape[1] + j] = sum / (ratio * ratio);
+                }
+            }
+        }
+        
+}
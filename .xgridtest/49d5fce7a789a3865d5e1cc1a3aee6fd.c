@@ -0,0 +1,79 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid2d_d_t8;
+ double  diffuse(struct __Grid2d_d_t8 u, double k, const int32_t* $region);
+struct __Grid2d_d_t8 {
+  int32_t time;
+  int32_t shape[2];
+  char** data;
+  uint8_t* boundary_mask;
+  int32_t* table;
+  int32_t* origins;
+  int32_t* active;
+  int32_t active_count;
+  int32_t tile_count;
+};
+static inline size_t __Grid2d_d_t8_size(struct __Grid2d_d_t8 grid) {
+  return (size_t) grid.tile_count * 64 * sizeof(double);
+}
+static inline double* __Grid2d_d_t8_at(struct __Grid2d_d_t8 grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  if (space_offset_0 < 0 || space_offset_0 >= grid.shape[0] || space_offset_1 < 0 || space_offset_1 >= grid.shape[1]) {
+    return NULL;
+  }
+  int32_t slot = grid.table[(space_offset_0 / 8) * ((grid.shape[1] + 7) / 8) + space_offset_1 / 8];
+  return slot < 0 ? NULL : (double*) (grid.data[time_offset] + ((size_t) slot * 64 + (space_offset_0 % 8) * 8 + space_offset_1 % 8) * sizeof(double));
+}
+static inline double __Grid2d_d_t8_load(struct __Grid2d_d_t8 grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  double* cell = __Grid2d_d_t8_at(grid, space_offset_0, space_offset_1, time_offset);
+  return cell == NULL ? (double) {0} : *cell;
+}
+static inline void __Grid2d_d_t8_store(struct __Grid2d_d_t8 grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset, double value) {
+  double* cell = __Grid2d_d_t8_at(grid, space_offset_0, space_offset_1, time_offset);
+  if (cell != NULL) {
+    *cell = value;
+  }
+}
+ double  diffuse(struct __Grid2d_d_t8 u, double k, const int32_t* $region){
+#line 810 "/tmp/t.py"
+#pragma omp parallel for collapse(3) schedule(static) if((int64_t) u.active_count * 64 >= 4096)
+  for (int32_t $tile = 0; $tile < u.active_count; $tile++) {
+    for (int32_t $local0 = 0; $local0 < 8; $local0++) {
+      for (int32_t $local1 = 0; $local1 < 8; $local1++) {
+        int32_t $dim0 = u.origins[u.active[$tile] * 2 + 0] + $local0;
+        int32_t $dim1 = u.origins[u.active[$tile] * 2 + 1] + $local1;
+        if ($dim0 < u.shape[0] && $dim1 < u.shape[1] && u.boundary_mask[(size_t) u.active[$tile] * 64 + ($local0) * 8 + $local1] == 0 && $dim0 >= $region_lower($region, 0) && $dim0 < $region_upper($region, 0, u.shape[0]) && $dim1 >= $region_lower($region, 1) && $dim1 < $region_upper($region, 1, u.shape[1])) {
+          double $cse0 = __Grid2d_d_t8_load(u, $dim0 + 0, $dim1 + 0, 1);
+          __Grid2d_d_t8_store(u, $dim0 + 0, $dim1 + 0, 0, ($cse0 + (k * ((((__Grid2d_d_t8_load(u, $dim0 + 1, $dim1 + 0, 1) + __Grid2d_d_t8_load(u, $dim0 + -1, $dim1 + 0, 1)) + __Grid2d_d_t8_load(u, $dim0 + 0, $dim1 + 1, 1)) + __Grid2d_d_t8_load(u, $dim0 + 0, $dim1 + -1, 1)) - (4.0 * $cse0)))));
+        }
+      }
+    }
+  }
+#line 811 "/tmp/t.py"
+  double $reduce0 = 0;
+#pragma omp parallel for collapse(3) schedule(static) if((int64_t) u.active_count * 64 >= 4096) reduction(+:$reduce0)
+  for (int32_t $tile = 0; $tile < u.active_count; $tile++) {
+    for (int32_t $local0 = 0; $local0 < 8; $local0++) {
+      for (int32_t $local1 = 0; $local1 < 8; $local1++) {
+        int32_t $dim0 = u.origins[u.active[$tile] * 2 + 0] + $local0;
+        int32_t $dim1 = u.origins[u.active[$tile] * 2 + 1] + $local1;
+        if ($dim0 < u.shape[0] && $dim1 < u.shape[1] && u.boundary_mask[(size_t) u.active[$tile] * 64 + ($local0) * 8 + $local1] == 0 && $dim0 >= $region_lower($region, 0) && $dim0 < $region_upper($region, 0, u.shape[0]) && $dim1 >= $region_lower($region, 1) && $dim1 < $region_upper($region, 1, u.shape[1])) {
+          double $cell = __Grid2d_d_t8_load(u, $dim0 + 0, $dim1 + 0, 0);
+          $reduce0 += $cell;
+        }
+      }
+    }
+  }
+  return $reduce0;
+}
@@ -0,0 +1,68 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid2d_d_s32;
+ void  relax(struct __Grid2d_d_s32 p, const int32_t* $region);
+struct __Grid2d_d_s32 {
+  int32_t time;
+  int32_t shape[2];
+  char** data;
+  uint8_t* boundary_mask;
+};
+static inline size_t __Grid2d_d_s32_size(struct __Grid2d_d_s32 grid) {
+  return ((size_t) grid.shape[0] * (size_t) grid.shape[1] - 1) * 32 + sizeof(double);
+}
+static inline double* __Grid2d_d_s32_at(struct __Grid2d_d_s32 grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  space_offset = space_offset * grid.shape[1] + space_offset_1;
+  return (double*) (grid.data[time_offset] + (size_t) space_offset * 32);
+}
+static inline double __Grid2d_d_s32_load(struct __Grid2d_d_s32 grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  return *__Grid2d_d_s32_at(grid, space_offset_0, space_offset_1, time_offset);
+}
+static inline void __Grid2d_d_s32_store(struct __Grid2d_d_s32 grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset, double value) {
+  *__Grid2d_d_s32_at(grid, space_offset_0, space_offset_1, time_offset) = value;
+}
+ void  relax(struct __Grid2d_d_s32 p, const int32_t* $region){
+#line 554 "/tmp/t.py"
+  {
+    char* $value = p.data[p.time];
+    bool $scratch = $value != NULL;
+    if (!$scratch) {
+      $value = malloc(__Grid2d_d_s32_size(p));
+      memcpy($value, p.data[0], __Grid2d_d_s32_size(p));
+    }
+    char* $levels[1] = {$value};
+    struct __Grid2d_d_s32 $next = p;
+    $next.data = $levels;
+#pragma omp parallel for collapse(2) schedule(static) if((int64_t) ($region_upper($region, 0, p.shape[0]) - $region_lower($region, 0)) * (int64_t) ($region_upper($region, 1, p.shape[1]) - $region_lower($region, 1)) >= 4096)
+    for (int32_t $dim0 = 0; $dim0 < p.shape[0]; $dim0++) {
+      for (int32_t $dim1 = 0; $dim1 < p.shape[1]; $dim1++) {
+        if (p.boundary_mask[($dim0) * p.shape[1] + $dim1] == 0 && $dim0 >= $region_lower($region, 0) && $dim0 < $region_upper($region, 0, p.shape[0]) && $dim1 >= $region_lower($region, 1) && $dim1 < $region_upper($region, 1, p.shape[1])) {
+          __Grid2d_d_s32_store($next, $dim0, $dim1, 0, (0.25 * ((((*__Grid2d_d_s32_at(p, $dim0 + 1, $dim1 + 0, 0)) + (*__Grid2d_d_s32_at(p, $dim0 + -1, $dim1 + 0, 0))) + (*__Grid2d_d_s32_at(p, $dim0 + 0, $dim1 + 1, 0))) + (*__Grid2d_d_s32_at(p, $dim0 + 0, $dim1 + -1, 0)))));
+        } else {
+          __Grid2d_d_s32_store($next, $dim0, $dim1, 0, __Grid2d_d_s32_load(p, $dim0, $dim1, 0));
+        }
+      }
+    }
+    if ($scratch) {
+      p.data[p.time] = p.data[0];
+      p.data[0] = $value;
+    } else {
+      memcpy(p.data[0], $value, __Grid2d_d_s32_size(p));
+      free($value);
+    }
+  }
+}
@@ -0,0 +1,66 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid2d_d;
+ void  mg_restrict(struct __Grid2d_d r, struct __Grid2d_d f, struct __Grid2d_d x, const int32_t* $region);
+struct __Grid2d_d {
+  int32_t time;
+  int32_t shape[2];
+  double** data;
+  uint8_t* boundary_mask;
+};
+static inline double* __Grid2d_d_at(struct __Grid2d_d grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  space_offset = space_offset * grid.shape[1] + space_offset_1;
+  return &grid.data[time_offset][space_offset];
+}
+ void  mg_restrict(struct __Grid2d_d r, struct __Grid2d_d f, struct __Grid2d_d x, const int32_t* $region){
+#line 45 "/root/package/xgrid/solvers/multigrid.py"
+  
+        int32_t $offsets[6][2] = {{0, 0}, {0, 0}, {1, 0}, {-1, 0}, {0, 1}, {0, -1}};
+        double $ratio0 = (double) (r.shape[0] - 1) / (f.shape[0] - 1), $ratio1 = (double) (r.shape[1] - 1) / (f.shape[1] - 1);
+        #pragma omp parallel for
+        for (int32_t i = 0; i < f.shape[0]; i++) {
+            for (int32_t j = 0; j < f.shape[1]; j++) {
+                int32_t id = i * f.shape[1] + j;
+                double value = 0;
+                for (int32_t fi = (int32_t) ceil((i - 1) * $ratio0); fi <= (int32_t) floor((i + 1) * $ratio0); fi++) {
+                    for (int32_t fj = (int32_t) ceil((j - 1) * $ratio1); fj <= (int32_t) floor((j + 1) * $ratio1); fj++) {
+                        if (fi >= 0 && fi < r.shape[0] && fj >= 0 && fj < r.shape[1]) {
+                            value += r.data[0][fi * r.shape[1] + fj] * (1 - fabs(fi / $ratio0 - i)) * (1 - fabs(fj / $ratio1 - j));
+                        }
+                    }
+                }
+                x.data[0][id] = 0;
+                f.data[0][id] = value / ($ratio0 * $ratio1);
+            }
+        }
+        // residuals restricted onto neumann cells belong to the cells they copy
+        for (int32_t i = 0; i < f.shape[0]; i++) {
+            for (int32_t j = 0; j < f.shape[1]; j++) {
+                int32_t id = i * f.shape[1] + j, label = f.boundary_mask[id];
+                if (label >= 2) {
+                    int32_t target = (i + $offsets[label][0]) * f.shape[1] + j + $offsets[label][1];
+                    if (f.boundary_mask[target] == 0) {
+                        f.data[0][target] += f.data[0][id];
+                    }
+                }
+                if (label != 0) {
+                    f.data[0][id] = 0;
+                }
+            }
+        }
+        
+}
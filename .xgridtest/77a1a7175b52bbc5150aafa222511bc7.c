@@ -0,0 +1,60 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct Cell;
+struct __Grid2d_stCell;
+ void  smooth(struct __Grid2d_stCell c, const int32_t* $region);
+struct Cell {
+  double u;
+  double v;
+};
+struct __Grid2d_stCell {
+  int32_t time;
+  int32_t shape[2];
+  struct Cell** data;
+  uint8_t* boundary_mask;
+};
+static inline struct Cell* __Grid2d_stCell_at(struct __Grid2d_stCell grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  space_offset = space_offset * grid.shape[1] + space_offset_1;
+  return &grid.data[time_offset][space_offset];
+}
+ void  smooth(struct __Grid2d_stCell c, const int32_t* $region){
+#line 518 "/tmp/t.py"
+  {
+    struct Cell* $value = c.data[c.time];
+    bool $scratch = $value != NULL;
+    if (!$scratch) {
+      $value = malloc(sizeof(struct Cell) * (c.shape[0] * c.shape[1]));
+    }
+#pragma omp parallel for collapse(2) schedule(static) if((int64_t) ($region_upper($region, 0, c.shape[0]) - $region_lower($region, 0)) * (int64_t) ($region_upper($region, 1, c.shape[1]) - $region_lower($region, 1)) >= 4096)
+    for (int32_t $dim0 = 0; $dim0 < c.shape[0]; $dim0++) {
+      for (int32_t $dim1 = 0; $dim1 < c.shape[1]; $dim1++) {
+        if (c.boundary_mask[($dim0) * c.shape[1] + $dim1] == 0 && $dim0 >= $region_lower($region, 0) && $dim0 < $region_upper($region, 0, c.shape[0]) && $dim1 >= $region_lower($region, 1) && $dim1 < $region_upper($region, 1, c.shape[1])) {
+          $value[($dim0) * c.shape[1] + $dim1] = ((struct Cell) {(0.5 * (((*__Grid2d_stCell_at(c, $dim0 + 1, $dim1 + 0, 0))).u + ((*__Grid2d_stCell_at(c, $dim0 + -1, $dim1 + 0, 0))).u)), ((*__Grid2d_stCell_at(c, $dim0 + 0, $dim1 + 0, 0))).v});
+        } else {
+          $value[($dim0) * c.shape[1] + $dim1] = c.data[0][($dim0) * c.shape[1] + $dim1];
+        }
+      }
+    }
+    if ($scratch) {
+      c.data[c.time] = c.data[0];
+      c.data[0] = $value;
+    } else {
+      memcpy(c.data[0], $value, sizeof(struct Cell) * (c.shape[0] * c.shape[1]));
+      free($value);
+    }
+  }
+}
@@ -0,0 +1,38 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid1d_d;
+ void  norm(struct __Grid1d_d r, struct __Grid1d_d a, struct __Grid1d_d b, const int32_t* $region);
+struct __Grid1d_d {
+  int32_t time;
+  int32_t shape[1];
+  double** data;
+  uint8_t* boundary_mask;
+};
+static inline double* __Grid1d_d_at(struct __Grid1d_d grid, int32_t space_offset_0, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  return &grid.data[time_offset][space_offset];
+}
+ void  norm(struct __Grid1d_d r, struct __Grid1d_d a, struct __Grid1d_d b, const int32_t* $region){
+#line 348 "/tmp/t.py"
+#pragma omp parallel for schedule(static) if((int64_t) ($region_upper($region, 0, r.shape[0]) - $region_lower($region, 0)) >= 4096)
+  for (int32_t $dim0 = $region_lower($region, 0); $dim0 < $region_upper($region, 0, r.shape[0]); $dim0++) {
+    {
+      double $cse0 = (*__Grid1d_d_at(a, $dim0 + 0, 0));
+      double $cse1 = (*__Grid1d_d_at(b, $dim0 + 0, 0));
+      (*__Grid1d_d_at(r, $dim0 + 0, 0)) = ((pow((($cse0 * $cse0) + ($cse1 * $cse1)), 0.5) * 2.0) * 0.25);
+    }
+  }
+}
@@ -0,0 +1,46 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid1d_d;
+ double  krylov_stabilize(struct __Grid1d_d s, struct __Grid1d_d r, struct __Grid1d_d v, double alpha, const int32_t* $region);
+struct __Grid1d_d {
+  int32_t time;
+  int32_t shape[1];
+  double** data;
+  uint8_t* boundary_mask;
+};
+static inline double* __Grid1d_d_at(struct __Grid1d_d grid, int32_t space_offset_0, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  return &grid.data[time_offset][space_offset];
+}
+ double  krylov_stabilize(struct __Grid1d_d s, struct __Grid1d_d r, struct __Grid1d_d v, double alpha, const int32_t* $region){
+#line 48 "/root/package/xgrid/solvers/krylov.py"
+#pragma omp parallel for schedule(static) if((int64_t) ($region_upper($region, 0, s.shape[0]) - $region_lower($region, 0)) >= 4096)
+  for (int32_t $dim0 = $region_lower($region, 0); $dim0 < $region_upper($region, 0, s.shape[0]); $dim0++) {
+    if (s.boundary_mask[$dim0] == 0) {
+      (*__Grid1d_d_at(s, $dim0 + 0, 0)) = ((*__Grid1d_d_at(r, $dim0 + 0, 0)) - (alpha * (*__Grid1d_d_at(v, $dim0 + 0, 0))));
+    }
+  }
+#line 49 "/root/package/xgrid/solvers/krylov.py"
+  double $reduce0 = 0;
+#pragma omp parallel for schedule(static) if((int64_t) ($region_upper($region, 0, s.shape[0]) - $region_lower($region, 0)) >= 4096) reduction(+:$reduce0)
+  for (int32_t $dim0 = $region_lower($region, 0); $dim0 < $region_upper($region, 0, s.shape[0]); $dim0++) {
+    if (s.boundary_mask[$dim0] == 0) {
+      double $cell = ((*__Grid1d_d_at(s, $dim0 + 0, 0)) * (*__Grid1d_d_at(s, $dim0 + 0, 0)));
+      $reduce0 += $cell;
+    }
+  }
+  return $reduce0;
+}
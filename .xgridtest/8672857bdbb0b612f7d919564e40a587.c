@@ -0,0 +1,80 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid3d_d;
+ void  thomas(struct __Grid3d_d x, struct __Grid3d_d a, struct __Grid3d_d b, struct __Grid3d_d c, struct __Grid3d_d d, int32_t axis, const int32_t* $region);
+struct __Grid3d_d {
+  int32_t time;
+  int32_t shape[3];
+  double** data;
+  uint8_t* boundary_mask;
+};
+static inline double* __Grid3d_d_at(struct __Grid3d_d grid, int32_t space_offset_0, int32_t space_offset_1, int32_t space_offset_2, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  space_offset = space_offset * grid.shape[1] + space_offset_1;
+  space_offset = space_offset * grid.shape[2] + space_offset_2;
+  return &grid.data[time_offset][space_offset];
+}
+ void  thomas(struct __Grid3d_d x, struct __Grid3d_d a, struct __Grid3d_d b, struct __Grid3d_d c, struct __Grid3d_d d, int32_t axis, const int32_t* $region){
+  size_t $batch_size = 64;
+#line 23 "/root/package/xgrid/solvers/tridiagonal.py"
+  
+        size_t $outer = 1, $inner = 1, $n = x.shape[axis];
+        for (int32_t $i = 0; $i < (int32_t) (sizeof(x.shape) / sizeof(x.shape[0])); $i++) {
+            if ($i < axis) {
+                $outer *= x.shape[$i];
+            } else if ($i > axis) {
+                $inner *= x.shape[$i];
+            }
+        }
+        size_t $batch = $inner < $batch_size ? $inner : $batch_size;
+        size_t $blocks = ($inner + $batch - 1) / $batch;
+        #pragma omp parallel
+        {
+            double* $factors = malloc(sizeof(double) * $n * $batch);
+            #pragma omp for collapse(2)
+            for (size_t $o = 0; $o < $outer; $o++) {
+                for (size_t $block = 0; $block < $blocks; $block++) {
+                    size_t $first = $block * $batch;
+                    size_t $width = $inner - $first < $batch ? $inner - $first : $batch;
+                    size_t $base = $o * $n * $inner + $first;
+                    // forward elimination, x holds the modified right hand side
+                    for (size_t $k = 0; $k < $width; $k++) {
+                        size_t $id = $base + $k;
+                        double $pivot = b.data[0][$id];
+                        $factors[$k] = c.data[0][$id] / $pivot;
+                        x.data[0][$id] = d.data[0][$id] / $pivot;
+                    }
+                    for (size_t $i = 1; $i < $n; $i++) {
+                        for (size_t $k = 0; $k < $width; $k++) {
+                            size_t $id = $base + $i * $inner + $k;
+                            double $pivot = b.data[0][$id] - a.data[0][$id] * $factors[($i - 1) * $batch + $k];
+                            $factors[$i * $batch + $k] = c.data[0][$id] / $pivot;
+                            x.data[0][$id] = (d.data[0][$id] - a.data[0][$id] * x.data[0][$id - $inner]) / $pivot;
+                        }
+                    }
+                    // back substitution
+                    for (size_t $i = $n - 1; $i-- > 0;) {
+                        for (size_t $k = 0; $k < $width; $k++) {
+                            size_t $id = $base + $i * $inner + $k;
+                            x.data[0][$id] -= $factors[$i * $batch + $k] * x.data[0][$id + $inner];
+                        }
+                    }
+                }
+            }
+            free($factors);
+        }
+        
+}
@@ -0,0 +1,50 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid2d_d;
+ void  mg_prolong(struct __Grid2d_d x, struct __Grid2d_d coarse, const int32_t* $region);
+struct __Grid2d_d {
+  int32_t time;
+  int32_t shape[2];
+  double** data;
+  uint8_t* boundary_mask;
+};
+static inline double* __Grid2d_d_at(struct __Grid2d_d grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  space_offset = space_offset * grid.shape[1] + space_offset_1;
+  return &grid.data[time_offset][space_offset];
+}
+ void  mg_prolong(struct __Grid2d_d x, struct __Grid2d_d coarse, const int32_t* $region){
+#line 85 "/root/package/xgrid/solvers/multigrid.py"
+  
+        double $ratio0 = (double) (coarse.shape[0] - 1) / (x.shape[0] - 1), $ratio1 = (double) (coarse.shape[1] - 1) / (x.shape[1] - 1);
+        #pragma omp parallel for
+        for (int32_t i = 0; i < x.shape[0]; i++) {
+            for (int32_t j = 0; j < x.shape[1]; j++) {
+                int32_t id = i * x.shape[1] + j;
+                if (x.boundary_mask[id] == 1) {
+                    continue;
+                }
+                double s0 = i * $ratio0, s1 = j * $ratio1;
+                int32_t i0 = (int32_t) s0, j0 = (int32_t) s1;
+                int32_t i1 = i0 + 1 < coarse.shape[0] ? i0 + 1 : i0, j1 = j0 + 1 < coarse.shape[1] ? j0 + 1 : j0;
+                double t0 = s0 - i0, t1 = s1 - j0;
+                int32_t n = coarse.shape[1];
+                x.data[0][id] += (1 - t0) * ((1 - t1) * coarse.data[0][i0 * n + j0] + t1 * coarse.data[0][i0 * n + j1]) +
+                                 t0 * ((1 - t1) * coarse.data[0][i1 * n + j0] + t1 * coarse.data[0][i1 * n + j1]);
+            }
+        }
+        
+}
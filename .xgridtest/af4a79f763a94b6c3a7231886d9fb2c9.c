@@ -0,0 +1,2 @@
+// /usr/bin/gcc -shared -fpic -lm
+innt main() {}
\ No newline at end of file
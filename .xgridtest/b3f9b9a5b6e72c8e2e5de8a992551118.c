@@ -0,0 +1,52 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct __Grid2d_i32;
+ int32_t  extent(struct __Grid2d_i32 n, const int32_t* $region);
+struct __Grid2d_i32 {
+  int32_t time;
+  int32_t shape[2];
+  int32_t** data;
+  uint8_t* boundary_mask;
+};
+static inline int32_t* __Grid2d_i32_at(struct __Grid2d_i32 grid, int32_t space_offset_0, int32_t space_offset_1, int32_t time_offset) {
+  int32_t space_offset = 0;
+  space_offset = space_offset * grid.shape[0] + space_offset_0;
+  space_offset = space_offset * grid.shape[1] + space_offset_1;
+  return &grid.data[time_offset][space_offset];
+}
+ int32_t  extent(struct __Grid2d_i32 n, const int32_t* $region){
+#line 624 "/tmp/t.py"
+  int32_t $reduce0 = INT32_MIN;
+#pragma omp parallel for collapse(2) schedule(static) if((int64_t) ($region_upper($region, 0, n.shape[0]) - $region_lower($region, 0)) * (int64_t) ($region_upper($region, 1, n.shape[1]) - $region_lower($region, 1)) >= 4096) reduction(max:$reduce0)
+  for (int32_t $dim0 = $region_lower($region, 0); $dim0 < $region_upper($region, 0, n.shape[0]); $dim0++) {
+    for (int32_t $dim1 = $region_lower($region, 1); $dim1 < $region_upper($region, 1, n.shape[1]); $dim1++) {
+      {
+        int32_t $cell = (*__Grid2d_i32_at(n, $dim0 + 0, $dim1 + 0, 0));
+        $reduce0 = $cell > $reduce0 ? $cell : $reduce0;
+      }
+    }
+  }
+  int32_t $reduce1 = INT32_MAX;
+#pragma omp parallel for collapse(2) schedule(static) if((int64_t) ($region_upper($region, 0, n.shape[0]) - $region_lower($region, 0)) * (int64_t) ($region_upper($region, 1, n.shape[1]) - $region_lower($region, 1)) >= 4096) reduction(min:$reduce1)
+  for (int32_t $dim0 = $region_lower($region, 0); $dim0 < $region_upper($region, 0, n.shape[0]); $dim0++) {
+    for (int32_t $dim1 = $region_lower($region, 1); $dim1 < $region_upper($region, 1, n.shape[1]); $dim1++) {
+      {
+        int32_t $cell = (*__Grid2d_i32_at(n, $dim0 + 0, $dim1 + 0, 0));
+        $reduce1 = $cell < $reduce1 ? $cell : $reduce1;
+      }
+    }
+  }
+  return (($reduce0 * 1000) + $reduce1);
+}
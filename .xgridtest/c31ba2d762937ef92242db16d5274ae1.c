@@ -0,0 +1,30 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <stdbool.h>
+#include <string.h>
+#include <math.h>
+#include <omp.h>
+static inline int32_t $region_lower(const int32_t* region, int32_t i) {
+  return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;
+}
+static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {
+  return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;
+}
+struct Vector3i;
+ int32_t  aux(struct Vector3i a, struct Vector3i b, const int32_t* $region);
+ int32_t  dot(struct Vector3i self, struct Vector3i b, const int32_t* $region);
+struct Vector3i {
+  int32_t x;
+  int32_t y;
+  int32_t z;
+};
+ int32_t  aux(struct Vector3i a, struct Vector3i b, const int32_t* $region){
+#line 160 "/tmp/t.py"
+  return dot(a, b, $region);
+}
+ int32_t  dot(struct Vector3i self, struct Vector3i b, const int32_t* $region){
+#line 153 "/tmp/t.py"
+  return ((((self).x * (b).x) + ((self).y * (b).y)) + ((self).z * (b).z));
+}
@@ -0,0 +1,42 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+
+#include <stddef.h>
+#include <string.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+// cells of the calling thread under a static schedule without chunk size, the schedule of the stencil loops
+static void xgrid_block(size_t cells, size_t* first, size_t* last) {
+#ifdef _OPENMP
+    size_t threads = omp_get_num_threads(), thread = omp_get_thread_num();
+#else
+    size_t threads = 1, thread = 0;
+#endif
+    size_t count = cells / threads, rest = cells % threads;
+    if (thread < rest) {
+        count++;
+        *first = thread * count;
+    } else {
+        *first = thread * count + rest;
+    }
+    *last = *first + count;
+}
+
+void xgrid_touch(char* data, size_t cells, size_t size, int threads) {
+    #pragma omp parallel num_threads(threads > 0 ? threads : omp_get_max_threads())
+    {
+        size_t first, last;
+        xgrid_block(cells, &first, &last);
+        memset(data + first * size, 0, (last - first) * size);
+    }
+}
+
+void xgrid_copy(char* target, const char* source, size_t cells, size_t size, int threads) {
+    #pragma omp parallel num_threads(threads > 0 ? threads : omp_get_max_threads())
+    {
+        size_t first, last;
+        xgrid_block(cells, &first, &last);
+        memcpy(target + first * size, source + first * size, (last - first) * size);
+    }
+}
@@ -0,0 +1,25 @@
+// /usr/bin/gcc -shared -fpic -lm -fopenmp -O3
+#include <stdbool.h>
+#include <stdint.h>
+#include <string.h>
+struct replay0 { int32_t time; int32_t shape[2]; void* data; void* boundary_mask; };
+struct replay1 { int32_t time; int32_t shape[2]; void* data; void* boundary_mask; };
+struct replay2 { int32_t time; int32_t shape[2]; void* data; void* boundary_mask; };
+struct replay3 { int32_t time; int32_t shape[2]; void* data; void* boundary_mask; };
+
+// time levels of a ticked grid move one step back, the oldest one becomes the current one
+static void rotate(void** levels, int32_t count) {
+    void* last = levels[count - 1];
+    memmove(levels + 1, levels, sizeof(void*) * (count - 1));
+    levels[0] = last;
+}
+
+void replay(int64_t steps, void** functions, void** arguments, void*** levels, const int32_t* counts) {
+    for (int64_t step = 0; step < steps; step++) {
+        rotate(levels[0], counts[0]);
+        ((void (*)(struct replay0, double, void*)) functions[0])(*(struct replay0*) arguments[0], *(double*) arguments[1], *(void**) arguments[2]);
+        ((double (*)(struct replay1, struct replay2, double, void*)) functions[1])(*(struct replay1*) arguments[3], *(struct replay2*) arguments[4], *(double*) arguments[5], *(void**) arguments[6]);
+        rotate(levels[1], counts[1]);
+        ((void (*)(struct replay3, void*)) functions[2])(*(struct replay3*) arguments[7], *(void**) arguments[8]);
+    }
+}
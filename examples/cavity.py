@@ -56,9 +56,6 @@ b = xgrid.Grid((SIZE_X, SIZE_Y), float)
 u.boundary[0, :] = u.boundary[:, 0] = u.boundary[:, -1] = 1
 u.boundary[-1, :] = 2
 
-v.boundary.fill(1)
-v.boundary[1:-1, 1:-1] = 0
-
 p.boundary[:, -1] = 1
 p.boundary[0, :] = 2
 p.boundary[:, 0] = 3
@@ -66,6 +63,8 @@ p.boundary[-1, :] = 4
 
 b.boundary.fill(1)
 b.boundary[1:-1, 1:-1] = 0
+# v shares the labels of b
+v.boundary = b.boundary
 
 
 config = Config(1.0, 0.1, 0.0001, 2 / (SIZE_X - 1), 2 / (SIZE_Y - 1))
@@ -1,13 +1,14 @@
 import struct
 from typing import Any
-from xgrid.lang import boundary, c
+from xgrid.lang import boundary, c, ordering
 from xgrid.lang.operator import kernel, function, external
+from xgrid.lang.capture import capture
 from xgrid.util.init import init
 from xgrid.util.typing import BaseType, Void
-from xgrid.util.typing.annotation import ptr, grid
-from xgrid.util.typing.value import Integer
+from xgrid.util.typing.annotation import ptr, grid, f16, f32, f64
+from xgrid.util.typing.value import Floating, Integer, Number
 from xgrid.util.typing.reference import Grid as _Grid
-from xgrid.xgrid import Grid
+from xgrid.xgrid import Grid, FieldBundle, SparseGrid, active_region
 
 
 def _dimension_typecheck(args: list[BaseType]) -> BaseType:
@@ -27,6 +28,20 @@ def _shape_typecheck(args: list[BaseType]) -> BaseType:
     return Integer(struct.calcsize("i"))
 
 
+def _reduction_typecheck(args: list[BaseType]) -> BaseType:
+    if not isinstance(args[0], Number):
+        raise Exception(f"Incompatible reduction to type '{args[0]}'")
+
+    return args[0]
+
+
+def _norm_typecheck(args: list[BaseType]) -> BaseType:
+    if not isinstance(args[0], Floating):
+        raise Exception(f"Incompatible norm to type '{args[0]}'")
+
+    return args[0]
+
+
 def _tick_typecheck(args: list[BaseType]) -> BaseType:
     if not isinstance(args[0], _Grid):
         raise Exception(f"Incompatible tick to type '{args[0]}'")
@@ -44,10 +59,35 @@ def shape(grid: Any, dimension: int) -> int:
     ...
 
 
+# sum, max and min are only called as xgrid.sum, xgrid.max and xgrid.min, star imports keep the builtins
+@external(typecheck_override=_reduction_typecheck)
+def sum(value: Any) -> Any:
+    ...
+
+
+@external(typecheck_override=_reduction_typecheck)
+def max(value: Any) -> Any:
+    ...
+
+
+@external(typecheck_override=_reduction_typecheck)
+def min(value: Any) -> Any:
+    ...
+
+
+@external(typecheck_override=_norm_typecheck)
+def norm(value: Any) -> Any:
+    ...
+
+
 @external(typecheck_override=_tick_typecheck)
 def tick(grid: Any) -> None:
     ...
 
 
 __all__ = ["kernel", "function", "init",
-           "ptr", "grid", "boundary", "c", "external", "Grid", "shape", "dimension", "tick"]
+           "ptr", "grid", "f16", "f32", "f64", "boundary", "ordering", "c", "external", "capture", "Grid", "FieldBundle", "SparseGrid", "active_region", "shape", "dimension", "norm", "tick"]
+
+# solvers are built on the kernels above
+from xgrid import amr, distributed, io, solvers  # nopep8
+from xgrid.io import checkpoint, restore  # nopep8
@@ -0,0 +1,4 @@
+from xgrid.amr.hierarchy import Hierarchy, Patch
+from xgrid.amr.transfer import GHOST
+
+__all__ = ["Hierarchy", "Patch", "GHOST"]
@@ -0,0 +1,246 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+import numpy as np
+from xgrid.amr.transfer import GHOST, amr_prolong, amr_restrict
+from xgrid.lang.operator import Operator
+from xgrid.util.logging import Logger
+from xgrid.xgrid import Grid, mask_dtype
+
+
+@dataclass
+class Patch:
+    "rectangular box of cells of a refinement level, stored with ghost cells around it"
+    level: int
+    lower: tuple[int, ...]
+    upper: tuple[int, ...]
+    ghost: int
+    spacing: tuple[float, ...]
+    fields: dict[str, Grid]
+    parent: "Patch | None" = None
+
+    @property
+    def origin(self) -> tuple[int, ...]:
+        "level index of the first cell of the patch arrays"
+        return tuple(l - self.ghost for l in self.lower)
+
+    @property
+    def interior(self) -> tuple[slice, ...]:
+        return tuple(slice(self.ghost, self.ghost + u - l) for l, u in zip(self.lower, self.upper))
+
+    @property
+    def boundary(self) -> np.ndarray:
+        return next(iter(self.fields.values())).boundary
+
+    def __getitem__(self, name: str) -> Grid:
+        return self.fields[name]
+
+
+def overlap(a: tuple[tuple[int, ...], tuple[int, ...]], b: tuple[tuple[int, ...], tuple[int, ...]]):
+    lower = tuple(max(x, y) for x, y in zip(a[0], b[0]))
+    upper = tuple(min(x, y) for x, y in zip(a[1], b[1]))
+    if any(l >= u for l, u in zip(lower, upper)):
+        return None
+    return lower, upper
+
+
+def window(patch: Patch, box: tuple[tuple[int, ...], tuple[int, ...]]) -> tuple[slice, ...]:
+    "slices of the patch arrays holding the cells of the box given in level indexes"
+    return tuple(slice(l - o, u - o) for l, u, o in zip(box[0], box[1], patch.origin))
+
+
+class Hierarchy:
+    "block-structured refinement levels of two dimensional float fields, level 0 covers the domain with a single patch"
+
+    def __init__(self, shape: tuple[int, ...], fields: list[str], spacing: tuple[float, ...] = (1.0, 1.0),
+                 ratio: int = 2, ghost: int = 2, max_level: int = 1, block: int = 8, buffer: int = 1,
+                 workers: int = 1) -> None:
+        self.logger = Logger(self)
+
+        if len(shape) != 2:
+            self.logger.dead(
+                "Adaptive mesh refinement requires two dimensional grids")
+        # ghost cells of fine patches are interpolated from the ghost cells of their parents
+        if -(-ghost // ratio) + 1 > ghost:
+            self.logger.dead(
+                f"Ghost width {ghost} is too narrow for refinement ratio {ratio}")
+
+        self.shape = shape
+        self.names = fields
+        self.ratio = ratio
+        self.ghost = ghost
+        self.max_level = max_level
+        self.block = block
+        self.buffer = buffer
+        if workers < 1:
+            self.logger.dead(
+                f"Patches should run on at least one worker instead of {workers}")
+        # every launch already spreads over the OpenMP threads, kernels applied by several workers should be
+        # declared with threads=1 so that the workers do not oversubscribe the cores
+        self.workers = workers
+
+        boundary = np.zeros(shape, dtype=mask_dtype())
+        self.root = Patch(0, (0,) * len(shape), shape, 0, spacing,
+                          self.allocate(shape, boundary))
+        self.levels: list[list[Patch]] = [[self.root]]
+
+    def allocate(self, shape: tuple[int, ...], boundary: np.ndarray) -> dict[str, Grid]:
+        # the fields of a patch share its boundary labels
+        fields = {}
+        for name in self.names:
+            fields[name] = Grid(shape, float)
+            fields[name].boundary = boundary
+        return fields
+
+    @property
+    def boundary(self) -> np.ndarray:
+        "boundary labels of the domain, shared by the fields of level 0 and inherited by refined cells"
+        return self.root.boundary
+
+    def __getitem__(self, name: str) -> Grid:
+        return self.root[name]
+
+    def patches(self) -> Iterator[Patch]:
+        for level in self.levels:
+            yield from level
+
+    def fill_ghosts(self):
+        "interpolate ghost cells from the parent patches, then copy them from overlapping patches of the same level"
+        for level in self.levels[1:]:
+            for patch in level:
+                for name in self.names:
+                    self.prolong(patch, name, True)
+
+            for patch in level:
+                box = (patch.origin, tuple(u + patch.ghost for u in patch.upper))
+                for other in level:
+                    if other is patch:
+                        continue
+                    common = overlap(box, (other.lower, other.upper))
+                    if common is None:
+                        continue
+                    ghosts = patch.boundary[window(patch, common)] == GHOST
+                    for name, grid in patch.fields.items():
+                        target = grid.now[window(patch, common)]
+                        target[ghosts] = other[name].now[window(other, common)][ghosts]
+
+    def restrict(self):
+        "replace coarse cells covered by finer patches with the average of their fine cells"
+        for level in reversed(self.levels[1:]):
+            for patch in level:
+                parent = patch.parent
+                assert parent is not None
+                for name in self.names:
+                    amr_restrict(parent[name], patch[name], *parent.origin,
+                                 *patch.origin, self.ratio)
+
+    def prolong(self, patch: Patch, name: str, ghosts: bool):
+        parent = patch.parent
+        assert parent is not None
+        amr_prolong(patch[name], parent[name], *patch.origin,
+                    *parent.origin, self.ratio, ghosts)
+
+    def apply(self, kernel: Operator, arguments: Callable[[Patch], tuple]) -> list[Any]:
+        """
+        run the kernel on every patch with the arguments returned for the patch after filling the ghost cells,
+        patches of refined levels run on the workers and are restricted to the coarser levels afterwards
+        """
+        self.fill_ghosts()
+
+        # the root patch runs first so that the kernel is compiled once
+        results = [kernel(*arguments(self.root))]
+        refined = [patch for level in self.levels[1:] for patch in level]
+        if self.workers == 1:
+            results.extend(kernel(*arguments(patch)) for patch in refined)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results.extend(executor.map(
+                    lambda patch: kernel(*arguments(patch)), refined))
+
+        self.restrict()
+        return results
+
+    def regrid(self, flag: Operator, arguments: Callable[[Patch], tuple]):
+        """
+        rebuild the refined levels from the cells tagged by flag(tags, *arguments(patch)) on every patch,
+        tagged cells grown by the buffer are covered by blocks of the next level clipped to their patch
+        """
+        self.fill_ghosts()
+
+        old = self.levels
+        self.levels = [[self.root]]
+        for level in range(self.max_level):
+            boxes = []
+            for patch in self.levels[level]:
+                tags = Grid(patch.boundary.shape, int)
+                tags.boundary = patch.boundary
+                flag(tags, *arguments(patch))
+                boxes.extend((patch, box) for box in self.cluster(
+                    patch, tags.now[patch.interior] != 0))
+            if len(boxes) == 0:
+                break
+
+            patches = []
+            for parent, (lower, upper) in boxes:
+                patch = self.refine(parent, lower, upper)
+                for previous in (old[level + 1] if level + 1 < len(old) else []):
+                    common = overlap((patch.lower, patch.upper),
+                                     (previous.lower, previous.upper))
+                    if common is not None:
+                        for name in self.names:
+                            patch[name].now[window(patch, common)] = \
+                                previous[name].now[window(previous, common)]
+                patches.append(patch)
+            self.levels.append(patches)
+            self.fill_ghosts()
+
+    def cluster(self, patch: Patch, tagged: np.ndarray) -> list[tuple[tuple[int, ...], tuple[int, ...]]]:
+        "boxes in level indexes covering the tagged cells of the patch, built from runs of tagged blocks"
+        for _ in range(self.buffer):
+            grown = tagged.copy()
+            grown[1:, :] |= tagged[:-1, :]
+            grown[:-1, :] |= tagged[1:, :]
+            grown[:, 1:] |= tagged[:, :-1]
+            grown[:, :-1] |= tagged[:, 1:]
+            tagged = grown
+
+        boxes = []
+        rows, columns = (-(-n // self.block) for n in tagged.shape)
+        for i in range(rows):
+            j = 0
+            while j < columns:
+                def block(j: int) -> bool:
+                    return bool(tagged[i * self.block:(i + 1) * self.block, j * self.block:(j + 1) * self.block].any())
+
+                if not block(j):
+                    j += 1
+                    continue
+                first = j
+                while j < columns and block(j):
+                    j += 1
+                lower = (patch.lower[0] + i * self.block,
+                         patch.lower[1] + first * self.block)
+                upper = (min(patch.lower[0] + (i + 1) * self.block, patch.upper[0]),
+                         min(patch.lower[1] + j * self.block, patch.upper[1]))
+                boxes.append((lower, upper))
+        return boxes
+
+    def refine(self, parent: Patch, lower: tuple[int, ...], upper: tuple[int, ...]) -> Patch:
+        "patch of the next level covering the given box of the parent level, interpolated from the parent"
+        r, g = self.ratio, self.ghost
+        fine_lower = tuple(l * r for l in lower)
+        fine_upper = tuple(u * r for u in upper)
+        shape = tuple(u - l + 2 * g for l, u in zip(fine_lower, fine_upper))
+
+        # refined cells inherit the labels of their parents, the ring around them holds ghost cells
+        boundary = np.full(shape, GHOST, dtype=mask_dtype())
+        labels = parent.boundary[window(parent, (lower, upper))]
+        boundary[g:-g, g:-g] = labels.repeat(r, axis=0).repeat(r, axis=1)
+
+        spacing = tuple(h / r for h in parent.spacing)
+        patch = Patch(parent.level + 1, fine_lower, fine_upper, g,
+                      spacing, self.allocate(shape, boundary), parent)
+        for name in self.names:
+            self.prolong(patch, name, False)
+        return patch
@@ -0,0 +1,69 @@
+import xgrid
+
+
+float2d = xgrid.grid[float, 2]  # type: ignore
+
+# boundary label of the ghost cells of patches, they are never updated by stencils, the largest uint8 label
+GHOST = 255
+
+
+@xgrid.kernel(tick=False)
+def amr_prolong(fine: float2d, coarse: float2d, f0: int, f1: int, c0: int, c1: int, ratio: int, ghosts: bool) -> None:
+    # bilinear interpolation between cell centers, the origins are the level indexes of the first cells of the arrays
+    with xgrid.c():
+        """
+        #pragma omp parallel for collapse(2)
+        for (int32_t i = 0; i < fine.shape[0]; i++) {
+            for (int32_t j = 0; j < fine.shape[1]; j++) {
+                int32_t id = i * fine.shape[1] + j;
+                if (ghosts && fine.boundary_mask[id] != 255) {
+                    continue;
+                }
+                double x = (f0 + i + 0.5) / ratio - 0.5 - c0, y = (f1 + j + 0.5) / ratio - 0.5 - c1;
+                // cells beyond the outermost cell centers of the coarse array are extrapolated linearly
+                int32_t x0 = (int32_t) floor(x), y0 = (int32_t) floor(y);
+                x0 = x0 < 0 ? 0 : x0 > coarse.shape[0] - 2 ? coarse.shape[0] - 2 : x0;
+                y0 = y0 < 0 ? 0 : y0 > coarse.shape[1] - 2 ? coarse.shape[1] - 2 : y0;
+                int32_t x1 = x0 + 1, y1 = y0 + 1;
+                double tx = x - x0, ty = y - y0;
+                int32_t n = coarse.shape[1];
+                fine.data[0][id] = (1 - tx) * ((1 - ty) * coarse.data[0][x0 * n + y0] + ty * coarse.data[0][x0 * n + y1]) +
+                                   tx * ((1 - ty) * coarse.data[0][x1 * n + y0] + ty * coarse.data[0][x1 * n + y1]);
+            }
+        }
+        """
+
+
+@xgrid.kernel(tick=False)
+def amr_restrict(coarse: float2d, fine: float2d, c0: int, c1: int, f0: int, f1: int, ratio: int) -> None:
+    # coarse cells entirely covered by non-ghost cells of the fine patch are replaced by their average
+    with xgrid.c():
+        """
+        int32_t $lower0 = (f0 - (f0 < 0 ? ratio - 1 : 0)) / ratio - c0, $lower1 = (f1 - (f1 < 0 ? ratio - 1 : 0)) / ratio - c1;
+        int32_t $upper0 = (f0 + fine.shape[0] + ratio - 1) / ratio - c0, $upper1 = (f1 + fine.shape[1] + ratio - 1) / ratio - c1;
+        $lower0 = $lower0 < 0 ? 0 : $lower0;
+        $lower1 = $lower1 < 0 ? 0 : $lower1;
+        $upper0 = $upper0 > coarse.shape[0] ? coarse.shape[0] : $upper0;
+        $upper1 = $upper1 > coarse.shape[1] ? coarse.shape[1] : $upper1;
+        #pragma omp parallel for collapse(2)
+        for (int32_t i = $lower0; i < $upper0; i++) {
+            for (int32_t j = $lower1; j < $upper1; j++) {
+                int32_t fi = (c0 + i) * ratio - f0, fj = (c1 + j) * ratio - f1;
+                if (fi < 0 || fj < 0 || fi + ratio > fine.shape[0] || fj + ratio > fine.shape[1]) {
+                    continue;
+                }
+                double sum = 0;
+                bool covered = true;
+                for (int32_t a = 0; a < ratio; a++) {
+                    for (int32_t b = 0; b < ratio; b++) {
+                        int32_t id = (fi + a) * fine.shape[1] + fj + b;
+                        covered = covered && fine.boundary_mask[id] != 255;
+                        sum += fine.data[0][id];
+                    }
+                }
+                if (covered) {
+                    coarse.data[0][i * coarse.shape[1] + j] = sum / (ratio * ratio);
+                }
+            }
+        }
+        """
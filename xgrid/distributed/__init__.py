@@ -0,0 +1,5 @@
+from xgrid.distributed.domain import HALO, Decomposition, Domain, Reach, stencil_reach
+from xgrid.distributed.transport import SharedMemoryTransport, SocketTransport, Transport
+
+__all__ = ["HALO", "Decomposition", "Domain", "Reach", "stencil_reach",
+           "Transport", "SocketTransport", "SharedMemoryTransport"]
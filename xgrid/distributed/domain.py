@@ -0,0 +1,261 @@
+from dataclasses import dataclass
+import threading
+from typing import Any
+
+import numpy as np
+import xgrid.lang.ir.expression as expr
+import xgrid.lang.ir.statement as stat
+from xgrid.distributed.transport import Transport
+from xgrid.lang.generator import StencilParser
+from xgrid.lang.ir.visitor import IRVisitor
+from xgrid.lang.operator import Operator
+from xgrid.util.logging import Logger
+from xgrid.util.typing import Void
+from xgrid.xgrid import Grid
+
+
+# boundary label of the halo cells of subdomains, they are never updated by stencils, the largest uint8 label
+HALO = 255
+
+
+@dataclass
+class Reach:
+    "farthest offsets of the loads of a grid argument per dimension, and the time offsets it is loaded at"
+    offsets: list[int]
+    times: set[int]
+
+
+class ReachParser(IRVisitor):
+    def __init__(self, operator: Operator) -> None:
+        super().__init__()
+        self.arguments = set(operator.signature.argnames_map)
+        self.scope = operator.ir.scope
+        self.reaches: dict[str, Reach] = {}
+        self.visit(operator.ir)
+
+    def visit_Stencil(self, ir: expr.Stencil):
+        name = ir.variable.name
+        if ir.context != "load" or name not in self.arguments or self.scope.get(name) is not ir.variable:
+            return
+        reach = self.reaches.setdefault(
+            name, Reach([0] * len(ir.space_offset), set()))
+        reach.offsets = [max(r, abs(o))
+                         for r, o in zip(reach.offsets, ir.space_offset)]
+        if any(ir.space_offset):
+            reach.times.add(ir.time_offset)
+
+
+def stencil_reach(operator: Operator) -> dict[str, Reach]:
+    "reach of the stencil loads of every grid argument of the kernel"
+    return ReachParser(operator).reaches
+
+
+class HazardParser(StencilParser):
+    def __init__(self, operator: Operator) -> None:
+        super().__init__(Logger(self))
+        self.implicit = False
+        self.visit(operator.ir)
+
+    def visit_Assignment(self, ir: stat.Assignment):
+        super().visit_Assignment(ir)
+        flag = getattr(ir, "__stencil_flag", None)
+        if flag is not None and flag.implicit:
+            self.implicit = True
+
+
+def implicit(operator: Operator) -> bool:
+    "whether stores of the kernel are read by neighbouring cells of the same sweep"
+    return HazardParser(operator).implicit
+
+
+class Decomposition:
+    "partition of a global grid into blocks, one per rank of a process grid"
+
+    def __init__(self, shape: tuple[int, ...], ranks: tuple[int, ...]) -> None:
+        self.logger = Logger(self)
+        if len(shape) != len(ranks) or any(r < 1 or r > n for n, r in zip(shape, ranks)):
+            self.logger.dead(
+                f"Unable to partition grid of shape {shape} over {ranks} ranks")
+        self.shape = shape
+        self.ranks = ranks
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.ranks))
+
+    def coordinates(self, rank: int) -> tuple[int, ...]:
+        return tuple(int(c) for c in np.unravel_index(rank, self.ranks))
+
+    def box(self, rank: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+        "global indexes of the first and past the last cells owned by the rank"
+        coordinates = self.coordinates(rank)
+        lower = tuple(n * c // r for n, c, r in zip(self.shape, coordinates, self.ranks))
+        upper = tuple(n * (c + 1) // r for n, c, r in zip(self.shape, coordinates, self.ranks))
+        return lower, upper
+
+    def neighbour(self, rank: int, axis: int, direction: int) -> int | None:
+        coordinates = list(self.coordinates(rank))
+        coordinates[axis] += direction
+        if not 0 <= coordinates[axis] < self.ranks[axis]:
+            return None
+        return int(np.ravel_multi_index(coordinates, self.ranks))
+
+
+class Domain:
+    """
+    subdomain of a rank holding its cells and halos as wide as the farthest loads of the kernels,
+    kernels run unchanged on the local grids
+    """
+
+    def __init__(self, decomposition: Decomposition, rank: int, transport: Transport,
+                 kernels: list[Operator]) -> None:
+        self.logger = Logger(self)
+        self.decomposition = decomposition
+        self.rank = rank
+        self.transport = transport
+
+        dimension = len(decomposition.shape)
+        ghost = [0] * dimension
+        for kernel in kernels:
+            for reach in stencil_reach(kernel).values():
+                ghost = [max(g, r) for g, r in zip(ghost, reach.offsets)]
+        self.ghost = tuple(ghost)
+
+        self.lower, self.upper = decomposition.box(rank)
+        self.shape = tuple(u - l + 2 * g for l, u, g in zip(self.lower, self.upper, self.ghost))
+
+    @property
+    def own(self) -> tuple[slice, ...]:
+        "local slices of the cells owned by the rank"
+        return tuple(slice(g, g + u - l) for l, u, g in zip(self.lower, self.upper, self.ghost))
+
+    @property
+    def box(self) -> tuple[slice, ...]:
+        "global slices of the cells owned by the rank"
+        return tuple(slice(l, u) for l, u in zip(self.lower, self.upper))
+
+    def grid(self, dtype: type, boundary: np.ndarray | None = None) -> Grid:
+        "local grid whose owned cells take their labels from the global boundary labels"
+        grid = Grid(self.shape, dtype)
+        grid.boundary[...] = HALO
+        grid.boundary[self.own] = 0 if boundary is None else boundary[self.box]
+        return grid
+
+    def scatter(self, grid: Grid, data: np.ndarray):
+        grid.now[self.own] = data[self.box]
+
+    def gather(self, grid: Grid, root: int = 0) -> np.ndarray | None:
+        "global array of the current level assembled on the root rank"
+        if self.rank != root:
+            self.transport.send(root, "gather", grid.now[self.own])
+            return None
+
+        result = np.zeros(self.decomposition.shape, dtype=grid.now.dtype)
+        for rank in range(self.decomposition.size):
+            lower, upper = self.decomposition.box(rank)
+            box = tuple(slice(l, u) for l, u in zip(lower, upper))
+            if rank == root:
+                result[box] = grid.now[self.own]
+            else:
+                self.transport.recv(rank, "gather", result[box])
+        return result
+
+    def exchange(self, data: np.ndarray, offsets: list[int], tag: str):
+        "exchange halos of a time level axis by axis, halos of earlier axes are forwarded to fill the corners"
+        for axis, width in enumerate(offsets):
+            if width == 0:
+                continue
+
+            def slab(start: int, stop: int) -> tuple[slice, ...]:
+                index = []
+                for i, (g, l, u) in enumerate(zip(self.ghost, self.lower, self.upper)):
+                    if i == axis:
+                        index.append(slice(start, stop))
+                    elif i < axis:
+                        index.append(slice(g - offsets[i], g + u - l + offsets[i]))
+                    else:
+                        index.append(slice(g, g + u - l))
+                return tuple(index)
+
+            g, n = self.ghost[axis], self.upper[axis] - self.lower[axis]
+            sides = {-1: (slab(g, g + width), slab(g - width, g)),
+                     1: (slab(g + n - width, g + n), slab(g + n, g + n + width))}
+            for direction, (inner, _) in sides.items():
+                peer = self.decomposition.neighbour(self.rank, axis, direction)
+                if peer is not None:
+                    self.transport.send(peer, f"{tag}:{axis}:{direction}", data[inner])
+            for direction, (_, outer) in sides.items():
+                peer = self.decomposition.neighbour(self.rank, axis, direction)
+                if peer is not None:
+                    self.transport.recv(peer, f"{tag}:{axis}:{-direction}", data[outer])
+
+    def run(self, kernel: Operator, *args: Any, overlap: bool = True) -> Any:
+        """
+        exchange the halos read by the kernel and run it on the local grids, the interior cells are swept
+        while halos are exchanged for explicit ticking kernels without result, the cells next to the halos
+        afterwards
+        """
+        reaches = stencil_reach(kernel)
+        levels: list[tuple[np.ndarray, list[int], str]] = []
+        width = [0] * len(self.shape)
+        for (name, _), arg in zip(kernel.signature.arguments, args):
+            if not isinstance(arg, Grid) or name not in reaches:
+                continue
+            reach = reaches[name]
+            if arg.shape != self.shape or arg.layout != "aos":
+                self.logger.dead(
+                    f"Grid '{name}' of kernel '{kernel.name}' is not a contiguous local grid of the domain")
+            if any(r > g for r, g in zip(reach.offsets, self.ghost)):
+                self.logger.dead(
+                    f"Loads of '{name}' in kernel '{kernel.name}' reach {reach.offsets} beyond the halos {list(self.ghost)}")
+            width = [max(w, r) for w, r in zip(width, reach.offsets)]
+            # levels read by the kernel before it ticks them
+            access = kernel.access[name]
+            for time in sorted(reach.times):
+                level = abs(time) - 1 if kernel.tick and access.written else access.level(time)
+                if 0 <= level < len(arg._data):
+                    levels.append((arg._data[level], reach.offsets, f"{name}:{level}"))
+
+        def exchange():
+            for data, offsets, tag in levels:
+                self.exchange(data, offsets, tag)
+
+        # implicit sweeps read cells updated earlier in the same sweep, split into regions they would read
+        # the interior cells of a swapped scratch level or the other colour of a finished sweep
+        if not overlap or not kernel.tick or not isinstance(kernel.signature.return_type, Void) or implicit(kernel):
+            exchange()
+            return kernel(*args)
+
+        errors = []
+
+        def communicate():
+            try:
+                exchange()
+            except Exception as e:
+                errors.append(e)
+
+        communication = threading.Thread(target=communicate)
+        communication.start()
+        interior = tuple(slice(g + w, g + u - l - w)
+                         for g, w, l, u in zip(self.ghost, width, self.lower, self.upper))
+        kernel(*args, region=interior)
+        communication.join()
+        if errors:
+            raise errors[0]
+
+        # cells within reach of the halos, the slabs of every axis exclude the slabs of the earlier axes
+        for axis in range(len(self.shape)):
+            for side in (0, 1):
+                g, w, n = self.ghost[axis], width[axis], self.upper[axis] - self.lower[axis]
+                if w == 0:
+                    continue
+                region = []
+                for i, (gi, wi, l, u) in enumerate(zip(self.ghost, width, self.lower, self.upper)):
+                    if i == axis:
+                        region.append(slice(g, min(g + w, g + n)) if side == 0 else slice(max(g + n - w, g + w), g + n))
+                    elif i < axis:
+                        region.append(slice(gi + wi, gi + u - l - wi))
+                    else:
+                        region.append(slice(gi, gi + u - l))
+                kernel(*args, region=tuple(region), tick=False)
+        return None
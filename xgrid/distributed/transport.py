@@ -0,0 +1,175 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from multiprocessing import resource_tracker, shared_memory
+import socket
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+from xgrid.util.logging import Logger
+
+
+class Transport(ABC):
+    "point to point messages between ranks, messages of the same peer and tag are received in order"
+
+    def __init__(self, rank: int) -> None:
+        self.logger = Logger(self)
+        self.rank = rank
+
+    @abstractmethod
+    def send(self, peer: int, tag: str, data: np.ndarray):
+        pass
+
+    @abstractmethod
+    def recv(self, peer: int, tag: str, out: np.ndarray):
+        pass
+
+    def close(self):
+        pass
+
+
+# sender rank, tag length and payload length of a socket message
+HEADER = struct.Struct("!iiq")
+
+
+class SocketTransport(Transport):
+    "messages over tcp connections, every rank listens on its own address"
+
+    def __init__(self, rank: int, addresses: list[tuple[str, int]], timeout: float = 30.0) -> None:
+        super().__init__(rank)
+        self.addresses = addresses
+        self.timeout = timeout
+
+        self.server = socket.create_server(addresses[rank])
+        self.connections: dict[int, socket.socket] = {}
+        self.incoming: list[socket.socket] = []
+        self.inbox: dict[tuple[int, str], deque[bytes]] = {}
+        self.condition = threading.Condition()
+        self.sending = threading.Lock()
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            self.incoming.append(connection)
+            threading.Thread(target=self.receive, args=(
+                connection,), daemon=True).start()
+
+    @staticmethod
+    def read(connection: socket.socket, size: int) -> bytes | None:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        while len(view) > 0:
+            count = connection.recv_into(view)
+            if count == 0:
+                return None
+            view = view[count:]
+        return bytes(buffer)
+
+    def receive(self, connection: socket.socket):
+        while True:
+            try:
+                header = self.read(connection, HEADER.size)
+                if header is None:
+                    return
+                source, tag_size, size = HEADER.unpack(header)
+                tag = self.read(connection, tag_size)
+                payload = self.read(connection, size)
+            except OSError:
+                return
+            if tag is None or payload is None:
+                return
+            with self.condition:
+                self.inbox.setdefault(
+                    (source, tag.decode()), deque()).append(payload)
+                self.condition.notify_all()
+
+    def connect(self, peer: int) -> socket.socket:
+        # peers may not listen yet when the ranks start together
+        deadline = time.monotonic() + self.timeout
+        while peer not in self.connections:
+            try:
+                self.connections[peer] = socket.create_connection(
+                    self.addresses[peer])
+            except ConnectionRefusedError:
+                if time.monotonic() > deadline:
+                    self.logger.dead(
+                        f"Unable to connect to rank {peer} at {self.addresses[peer]}")
+                time.sleep(0.01)
+        return self.connections[peer]
+
+    def send(self, peer: int, tag: str, data: np.ndarray):
+        payload = np.ascontiguousarray(data)
+        encoded = tag.encode()
+        with self.sending:
+            connection = self.connect(peer)
+            connection.sendall(HEADER.pack(
+                self.rank, len(encoded), payload.nbytes) + encoded)
+            connection.sendall(memoryview(payload).cast("B"))
+
+    def recv(self, peer: int, tag: str, out: np.ndarray):
+        with self.condition:
+            if not self.condition.wait_for(lambda: len(self.inbox.get((peer, tag), ())) > 0, self.timeout):
+                self.logger.dead(
+                    f"Timed out receiving '{tag}' from rank {peer}")
+            payload = self.inbox[(peer, tag)].popleft()
+        out[...] = np.frombuffer(payload, dtype=out.dtype).reshape(out.shape)
+
+    def close(self):
+        self.server.close()
+        for connection in list(self.connections.values()) + self.incoming:
+            connection.close()
+
+
+class SharedMemoryTransport(Transport):
+    "messages through shared memory segments of the node, named after the ranks, the tag and a sequence number"
+
+    def __init__(self, rank: int, prefix: str = "xgrid", timeout: float = 30.0) -> None:
+        super().__init__(rank)
+        self.prefix = prefix
+        self.timeout = timeout
+        self.sequences: dict[tuple[int, int, str], int] = {}
+
+    def segment(self, source: int, target: int, tag: str) -> str:
+        key = (source, target, tag)
+        sequence = self.sequences.get(key, 0)
+        self.sequences[key] = sequence + 1
+        return f"{self.prefix}_{source}_{target}_{zlib.crc32(tag.encode()):x}_{sequence}"
+
+    def send(self, peer: int, tag: str, data: np.ndarray):
+        payload = np.ascontiguousarray(data)
+        # the first word is set once the payload is written, the receiver owns the segment from then on and
+        # unlinks it, the resource tracker of the sender would otherwise unlink it again when the sender exits
+        segment = shared_memory.SharedMemory(name=self.segment(
+            self.rank, peer, tag), create=True, size=8 + max(payload.nbytes, 1))
+        segment.buf[8:8 + payload.nbytes] = memoryview(payload).cast("B")
+        resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore
+        struct.pack_into("q", segment.buf, 0, 1)
+        segment.close()
+
+    def recv(self, peer: int, tag: str, out: np.ndarray):
+        name = self.segment(peer, self.rank, tag)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                segment = shared_memory.SharedMemory(name=name)
+                if struct.unpack_from("q", segment.buf, 0)[0] == 1:
+                    break
+                segment.close()
+            except (FileNotFoundError, ValueError):
+                # the segment is not created or not sized yet
+                pass
+            if time.monotonic() > deadline:
+                self.logger.dead(
+                    f"Timed out receiving '{tag}' from rank {peer}")
+            time.sleep(0.0001)
+
+        out[...] = np.frombuffer(segment.buf, dtype=out.dtype, count=out.size,
+                                 offset=8).reshape(out.shape)
+        segment.close()
+        segment.unlink()
@@ -0,0 +1,4 @@
+from xgrid.io.checkpoint import Checkpoint, checkpoint, restore
+from xgrid.io.frames import FrameWriter, read_frames
+
+__all__ = ["Checkpoint", "checkpoint", "restore", "FrameWriter", "read_frames"]
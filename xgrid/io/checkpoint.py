@@ -0,0 +1,195 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+from xgrid.util.logging import Logger
+from xgrid.util.memory import parallel_copy
+from xgrid.xgrid import NUMPY_ANNOTATIONS, Grid, aligned_empty
+
+
+# magic, offset and length of the json header written after the arrays
+PREFIX = struct.Struct("<8sQQ")
+MAGIC = b"XGRIDCKP"
+# arrays start on cache line boundaries so that they are mapped aligned
+ALIGNMENT = 64
+
+logger = Logger("xgrid.io.checkpoint")
+
+
+def describe(dtype: np.dtype):
+    return dtype.str if dtype.fields is None else dtype.descr
+
+
+def parse_dtype(description) -> np.dtype:
+    if isinstance(description, str):
+        return np.dtype(description)
+    return np.dtype([tuple(field) for field in description])
+
+
+class Checkpoint:
+    "snapshot of grids being written to a file, by a background thread when asynchronous"
+
+    def __init__(self, path: str, snapshot: dict[str, dict], base: str | None) -> None:
+        self.path = path
+        self.snapshot = snapshot
+        self.base = base
+        self.error: Exception | None = None
+        self.thread: threading.Thread | None = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            self.write()
+        except Exception as e:
+            self.error = e
+        # the snapshot is released once written
+        self.snapshot = {}
+
+    def wait(self) -> "Checkpoint":
+        if self.thread is not None:
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def write(self):
+        # arrays whose size and digest match an array of the base checkpoint or an array written before
+        # are referenced instead of written
+        known: dict[tuple[int, str], dict] = {}
+        if self.base is not None:
+            directory = os.path.dirname(os.path.abspath(self.base))
+            for grid in read_header(self.base)["grids"].values():
+                for blob in grid["levels"] + ([grid["boundary"]] if grid["boundary"] is not None else []):
+                    file = os.path.join(directory, blob["file"]) if blob["file"] is not None \
+                        else os.path.abspath(self.base)
+                    known[(blob["size"], blob["digest"])] = dict(blob, file=file)
+
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(PREFIX.pack(MAGIC, 0, 0))
+
+            def store(array: np.ndarray) -> dict:
+                data = memoryview(array.reshape(-1).view(np.uint8))
+                digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+                reference = known.get((array.nbytes, digest))
+                if reference is not None:
+                    if reference["file"] is None:
+                        return reference
+                    file_name = os.path.relpath(reference["file"], os.path.dirname(os.path.abspath(self.path)))
+                    return dict(reference, file=file_name)
+                offset = -(-file.tell() // ALIGNMENT) * ALIGNMENT
+                file.write(bytes(offset - file.tell()))
+                file.write(data)
+                blob = {"file": None, "offset": offset, "size": array.nbytes, "digest": digest}
+                known[(array.nbytes, digest)] = blob
+                return blob
+
+            grids = {}
+            for name, state in self.snapshot.items():
+                boundary = state["boundary"]
+                grids[name] = {"shape": state["shape"], "dtype": state["dtype"], "layout": state["layout"],
+                               "levels": [store(level) for level in state["levels"]],
+                               "boundary": None if boundary is None else store(boundary),
+                               "mask": None if boundary is None else boundary.dtype.str}
+
+            header = json.dumps({"version": 1, "grids": grids}).encode()
+            offset = file.tell()
+            file.write(header)
+            file.seek(0)
+            file.write(PREFIX.pack(MAGIC, offset, len(header)))
+        os.replace(temporary, self.path)
+
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as file:
+        magic, offset, length = PREFIX.unpack(file.read(PREFIX.size))
+        if magic != MAGIC:
+            logger.dead(f"'{path}' is not a grid checkpoint")
+        file.seek(offset)
+        return json.loads(file.read(length))
+
+
+def checkpoint(path: str, grids: dict[str, Grid], async_: bool = True, base: str | None = None) -> Checkpoint:
+    """
+    snapshot every time level and boundary mask of the grids and write them to the file at path,
+    in a background thread when asynchronous, arrays unchanged since the base checkpoint are referenced
+    """
+    snapshot = {}
+    for name, grid in grids.items():
+        if grid.layout not in ("aos", "soa"):
+            logger.dead(f"Unable to checkpoint {grid.layout} grid '{name}'")
+        # levels are copied in their ring order, the current level first, grids without labels store none
+        arrays = []
+        for level in grid._data + ([grid.boundary] if grid.masked else []):
+            copy = aligned_empty(level.shape, level.dtype)
+            parallel_copy(copy, level)
+            arrays.append(copy)
+        levels, boundary = arrays[:len(grid._data)], arrays[len(grid._data):]
+        snapshot[name] = {"shape": list(grid.shape), "dtype": describe(np.dtype(grid.numpy_dtype)),
+                          "layout": grid.layout, "levels": levels, "boundary": boundary[0] if boundary else None}
+
+    job = Checkpoint(path, snapshot, base)
+    if async_:
+        job.start()
+    else:
+        job.write()
+    return job
+
+
+def restore(path: str, dtypes: dict[str, type] | None = None) -> dict[str, Grid]:
+    """
+    grids of a checkpoint whose levels and boundary masks are mapped from its files without copies,
+    written cells are private to the process, dtypes gives the elements of structure grids
+    """
+    header = read_header(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    mappings: dict[str, mmap.mmap] = {}
+    mapped: set[tuple[str, int]] = set()
+
+    def load(blob: dict, shape: tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        file = os.path.abspath(path) if blob["file"] is None else os.path.join(directory, blob["file"])
+        if file not in mappings:
+            with open(file, "rb") as f:
+                mappings[file] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        if blob["offset"] + blob["size"] > len(mappings[file]):
+            logger.dead(f"Array referenced by '{path}' lies past the end of '{file}'")
+        raw = np.frombuffer(mappings[file], dtype=np.uint8, count=blob["size"], offset=blob["offset"])
+        # arrays referenced from base checkpoints are checked, the base may have been rewritten since
+        if blob["file"] is not None and hashlib.blake2b(raw, digest_size=16).hexdigest() != blob["digest"]:
+            logger.dead(f"Array referenced by '{path}' in '{file}' has changed since the checkpoint was written")
+        data = raw.view(dtype).reshape(shape)
+        # equal arrays are stored once, every array but the first mapped from a block gets pages of its own
+        if (file, blob["offset"]) in mapped:
+            copy = aligned_empty(shape, dtype)
+            parallel_copy(copy, data)
+            return copy
+        mapped.add((file, blob["offset"]))
+        return data
+
+    grids = {}
+    for name, state in header["grids"].items():
+        shape = tuple(state["shape"])
+        dtype = parse_dtype(state["dtype"])
+        element = (dtypes or {}).get(name, NUMPY_ANNOTATIONS.get(dtype.type))
+        if element is None:
+            logger.dead(f"Unable to infer the element of grid '{name}' of type '{dtype}'")
+
+        if state["layout"] == "soa":
+            grid = Grid(shape, element, layout="soa")
+            grid._data = [load(blob, (blob["size"],), np.dtype(np.uint8)) for blob in state["levels"]]
+        else:
+            levels = [load(blob, shape, dtype) for blob in state["levels"]]
+            grid = Grid(shape, element, data=levels[0])
+            for time, level in enumerate(levels[1:], 1):
+                grid.adopt(time, level)
+        if state["boundary"] is not None:
+            grid.boundary = load(state["boundary"], shape, np.dtype(state["mask"]))
+        grids[name] = grid
+    return grids
@@ -0,0 +1,197 @@
+import bz2
+import json
+import lzma
+import queue
+import struct
+import threading
+import zlib
+from typing import Any, Iterator
+
+import numpy as np
+from xgrid.io.checkpoint import describe, parse_dtype
+from xgrid.lang.capture import hook, unhook
+from xgrid.util.logging import Logger
+from xgrid.util.memory import parallel_copy
+from xgrid.xgrid import Grid, Planes, aligned_empty
+
+
+MAGIC = b"XGRIDFRM"
+# length of the json header following the magic
+HEADER = struct.Struct("<I")
+# frame number, step, grid index, byte offset in the level, stored and raw size, checksum of the raw bytes
+CHUNK = struct.Struct("<QqIQIII")
+VERSION = 2
+
+# stdlib codecs by name, zlib at a low level is the fastest of them
+CODECS = {
+    "zlib": (lambda data, level: zlib.compress(data, 1 if level is None else level), zlib.decompress),
+    "bz2": (lambda data, level: bz2.compress(data, 9 if level is None else level), bz2.decompress),
+    "lzma": (lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+}
+
+logger = Logger("xgrid.io.frames")
+
+
+class FrameWriter:
+    """
+    current levels of grids snapshot every few steps into spare buffers and appended by a background thread
+    to a chunked, optionally compressed file, the solver only waits when every buffer is still being written
+    """
+
+    def __init__(self, grids: dict[str, Grid], every: int = 1, path: str = "frames.xgf",
+                 compression: str | None = None, level: int | None = None, chunk: int = 1 << 20,
+                 buffers: int = 2, kernel: Any = None) -> None:
+        self.logger = Logger(self)
+        if every < 1 or buffers < 1 or chunk < 1:
+            self.logger.dead(
+                f"Frames should be written at least every step into at least one buffer")
+        if compression is not None and compression not in CODECS:
+            self.logger.dead(
+                f"Unknown compression '{compression}', expected one of {', '.join(CODECS)}")
+        for name, grid in grids.items():
+            if grid.layout not in ("aos", "soa"):
+                self.logger.dead(f"Unable to write frames of {grid.layout} grid '{name}'")
+
+        self.grids = grids
+        self.every = every
+        self.path = path
+        self.compression = compression
+        self.level = level
+        self.chunk = chunk
+        # steps are counted on launches ticking any of the grids, or on launches of the kernel only
+        self.kernel = kernel
+        self.step = 0
+        # frames are told apart by their number, snapshots may share a step
+        self.frames = 0
+        self.ids = {id(grid) for grid in grids.values()}
+        self.error: Exception | None = None
+
+        self.file = open(path, "wb")
+        header = json.dumps({"version": VERSION, "compression": compression, "grids": {
+            name: {"shape": list(grid.shape), "dtype": describe(np.dtype(grid.numpy_dtype))}
+            for name, grid in grids.items()}}).encode()
+        self.file.write(MAGIC + HEADER.pack(len(header)) + header)
+
+        # buffers alternate between the solver copying into them and the writer draining them
+        self.free: queue.Queue = queue.Queue()
+        self.pending: queue.Queue = queue.Queue()
+        for _ in range(buffers):
+            self.free.put({name: aligned_empty(grid._data[0].shape, grid._data[0].dtype)
+                           for name, grid in grids.items()})
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        hook(self.launched)
+
+    def launched(self, operator: Any, ticked: list[Grid]):
+        if self.kernel is not None and operator is not self.kernel:
+            return
+        if not any(id(grid) in self.ids for grid in ticked):
+            return
+        self.step += 1
+        if self.step % self.every == 0:
+            self.snapshot()
+
+    def snapshot(self, step: int | None = None):
+        "copy the current levels into a free buffer and queue them, waiting only when no buffer is free"
+        if self.error is not None:
+            raise self.error
+        buffers = self.free.get()
+        for name, grid in self.grids.items():
+            parallel_copy(buffers[name], grid._data[0])
+        self.pending.put((self.frames, self.step if step is None else step, buffers))
+        self.frames += 1
+
+    def run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            frame, step, buffers = item
+            try:
+                if self.error is None:
+                    self.write(frame, step, buffers)
+            except Exception as e:
+                self.error = e
+            self.free.put(buffers)
+
+    def write(self, frame: int, step: int, buffers: dict[str, np.ndarray]):
+        for index, (name, grid) in enumerate(self.grids.items()):
+            data = buffers[name]
+            if grid.layout == "soa":
+                # planes are interleaved back into elements off the solver thread
+                planes = Planes(data, grid.element, grid.shape)  # type: ignore
+                data = np.empty(grid.shape, dtype=planes.dtype)
+                for field in planes.fields:
+                    data[field] = planes[field]
+            raw = memoryview(data.reshape(-1).view(np.uint8))
+            for offset in range(0, len(raw), self.chunk):
+                piece = raw[offset:offset + self.chunk]
+                stored = piece if self.compression is None else CODECS[self.compression][0](piece, self.level)
+                self.file.write(CHUNK.pack(frame, step, index, offset, len(stored), len(piece), zlib.crc32(piece)))
+                self.file.write(stored)
+        self.file.flush()
+
+    def close(self):
+        "write the queued frames and stop the writer"
+        if self.file.closed:
+            return
+        unhook(self.launched)
+        self.pending.put(None)
+        self.thread.join()
+        self.file.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self) -> "FrameWriter":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def read_frames(path: str) -> Iterator[tuple[int, dict[str, np.ndarray]]]:
+    "step and grids of every complete frame of a frame file, a truncated last frame is dropped"
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            logger.dead(f"'{path}' is not a frame file")
+        (length,) = HEADER.unpack(file.read(HEADER.size))
+        header = json.loads(file.read(length))
+        if header["version"] != VERSION:
+            logger.dead(f"Unsupported version {header['version']} of frame file '{path}'")
+        decompress = None if header["compression"] is None else CODECS[header["compression"]][1]
+        names = list(header["grids"])
+        shapes = [tuple(header["grids"][name]["shape"]) for name in names]
+        dtypes = [parse_dtype(header["grids"][name]["dtype"]) for name in names]
+        sizes = [int(np.prod(shape)) * dtype.itemsize for shape, dtype in zip(shapes, dtypes)]
+
+        number, step, frame, filled = None, 0, [np.empty(size, dtype=np.uint8) for size in sizes], [0] * len(names)
+
+        def complete() -> dict[str, np.ndarray] | None:
+            if number is None or filled != sizes:
+                return None
+            return {name: data.view(dtype).reshape(shape)
+                    for name, data, dtype, shape in zip(names, frame, dtypes, shapes)}
+
+        while True:
+            record = file.read(CHUNK.size)
+            if len(record) < CHUNK.size:
+                break
+            chunk_number, chunk_step, index, offset, stored, size, crc = CHUNK.unpack(record)
+            if chunk_number != number:
+                grids = complete()
+                if grids is not None:
+                    yield step, grids
+                number, step = chunk_number, chunk_step
+                frame, filled = [np.empty(size, dtype=np.uint8) for size in sizes], [0] * len(names)
+            data = file.read(stored)
+            if len(data) < stored:
+                break
+            piece = data if decompress is None else decompress(data)
+            if len(piece) != size or zlib.crc32(piece) != crc:
+                logger.dead(f"Corrupted chunk of grid '{names[index]}' at step {chunk_step} in '{path}'")
+            frame[index][offset:offset + size] = np.frombuffer(piece, dtype=np.uint8)
+            filled[index] += size
+
+        grids = complete()
+        if grids is not None:
+            yield step, grids
@@ -15,3 +15,7 @@ def c() -> StubContext:
 
 def boundary(type: int) -> StubContext:
     ...
+
+
+def ordering(type: str) -> StubContext:
+    ...
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+
+import xgrid.lang.ir.expression as expr
+import xgrid.lang.ir.statement as stat
+from xgrid.lang.ir.visitor import IRVisitor
+from xgrid.util.typing.reference import Grid
+
+
+@dataclass
+class Access:
+    "farthest time offset of the stencils of a grid argument, and whether the kernel stores into it"
+    span: int = 0
+    written: bool = False
+    # passed to functions or inline code, which read the boundary labels without knowing the grid has none
+    escapes: bool = False
+
+    def level(self, time_offset: int) -> int:
+        "time level addressed at the time offset, grids a kernel never stores into are not ticked by it"
+        return abs(time_offset) if self.written else max(abs(time_offset) - 1, 0)
+
+    @property
+    def depth(self) -> int:
+        return self.level(self.span) + 1
+
+
+class AccessParser(IRVisitor):
+    def __init__(self, definition: stat.Definition) -> None:
+        super().__init__()
+        self.scope = definition.scope
+        self.arguments = [name for name, t in definition.signature.arguments if isinstance(t, Grid)]
+        self.access = {name: Access() for name in self.arguments}
+        self.visit(definition)
+
+    def argument(self, variable) -> Access | None:
+        if variable.name in self.access and self.scope.get(variable.name) is variable:
+            return self.access[variable.name]
+        return None
+
+    def visit_Stencil(self, ir: expr.Stencil):
+        access = self.argument(ir.variable)
+        if access is not None:
+            access.span = max(access.span, abs(ir.time_offset))
+            access.written = access.written or ir.context == "store"
+
+    def visit_Call(self, ir: expr.Call):
+        # grids passed on are addressed without knowing whether they are ticked, like written grids
+        parameters: list[Access | None] = []
+        if not isinstance(ir.operator, expr.Constructor) and ir.operator.mode != "external":
+            callee = ir.operator.ir
+            accesses = grid_access(callee)
+            parameters = [accesses.get(name) for name, _ in callee.signature.arguments]
+
+        for i, argument in enumerate(ir.arguments):
+            access = self.argument(argument.variable) if isinstance(argument, expr.Identifier) else None
+            if access is None:
+                self.visit(argument)
+                continue
+            access.written = access.escapes = True
+            parameter = parameters[i] if i < len(parameters) else None
+            if parameter is not None:
+                access.span = max(access.span, parameter.span)
+
+    def visit_Inline(self, ir: stat.Inline):
+        # inline code addresses the levels of every grid directly
+        for access in self.access.values():
+            access.written = access.escapes = True
+
+
+def grid_access(definition: stat.Definition) -> dict[str, Access]:
+    "time levels addressed in the grid arguments of an operator"
+    return AccessParser(definition).access
@@ -0,0 +1,198 @@
+from contextlib import contextmanager
+import ctypes
+from dataclasses import dataclass
+import threading
+from typing import Any, Callable, Iterator
+
+from xgrid.util.ffi import Compiler
+from xgrid.util.init import get_config
+from xgrid.util.logging import Logger
+from xgrid.util.typing import Void
+from xgrid.util.typing.reference import Region
+from xgrid.xgrid import BundledGrid, Grid
+
+
+SCALARS = {ctypes.c_bool: "bool", ctypes.c_char: "char",
+           ctypes.c_int8: "int8_t", ctypes.c_int16: "int16_t", ctypes.c_int32: "int32_t", ctypes.c_int64: "int64_t",
+           ctypes.c_float: "float", ctypes.c_double: "double"}
+
+
+@dataclass
+class Call:
+    "kernel launch recorded by a capture, with the grids it ticks"
+    name: str
+    native: Callable
+    args: tuple
+    region: Any
+    ticked: list[Grid]
+
+
+class Declarations:
+    "c declarations of the ctypes passed to the recorded kernels, structures are passed by value"
+
+    def __init__(self) -> None:
+        self.structures: dict[type, str] = {}
+        self.lines: list[str] = []
+
+    def declare(self, ctype) -> str:
+        if ctype is None:
+            return "void"
+        if ctype in SCALARS:
+            return SCALARS[ctype]
+        if issubclass(ctype, (ctypes._Pointer, ctypes.c_void_p)):  # type: ignore
+            return "void*"
+        if issubclass(ctype, ctypes.Structure):
+            if ctype not in self.structures:
+                members = []
+                for name, member in ctype._fields_:
+                    if issubclass(member, ctypes.Array):
+                        members.append(f"{self.declare(member._type_)} {name}[{member._length_}];")
+                    else:
+                        members.append(f"{self.declare(member)} {name};")
+                self.structures[ctype] = f"struct replay{len(self.structures)}"
+                self.lines.append(
+                    f"{self.structures[ctype]} {{ {' '.join(members)} }};")
+            return self.structures[ctype]
+        Logger(self).dead(f"Unable to replay argument of type '{ctype.__name__}'")
+
+
+class Capture:
+    "kernel launches recorded within a capture context, replayed back to back by a native driver"
+
+    def __init__(self) -> None:
+        self.logger = Logger(self)
+        self.calls: list[Call] = []
+        self.levels: dict[int, int] = {}
+        self._driver = None
+
+    def record(self, name: str, native: Callable, args: tuple, region: Any, ticked: list[Grid]):
+        for grid in {id(arg): arg for arg in args if isinstance(arg, Grid)}.values():
+            # levels rotated by the driver are fixed for the whole step
+            if self.levels.setdefault(id(grid), len(grid._data)) != len(grid._data):
+                self.logger.dead(
+                    f"Unable to capture kernel '{name}' resizing the time levels of a grid used by earlier kernels")
+        for grid in ticked:
+            # the driver rotates levels without carrying the fields of a bundle the kernel does not advance
+            if isinstance(grid, BundledGrid) and any(all(field is not other for other in ticked)
+                                                     for field in grid.bundle.fields.values()):
+                self.logger.dead(
+                    f"Unable to capture kernel '{name}' advancing only some fields of a bundle")
+        self.calls.append(Call(name, native, args, region, ticked))
+        self._driver = None
+
+    def driver(self) -> Callable:
+        if self._driver is not None:
+            return self._driver
+
+        declarations = Declarations()
+        body, position, ticks = [], 0, 0
+        for index, call in enumerate(self.calls):
+            for _ in call.ticked:
+                body.append(f"rotate(levels[{ticks}], counts[{ticks}]);")
+                ticks += 1
+            types = [t.ctype for t in call.native.argtypes]
+            parameters = ", ".join(declarations.declare(t) for t in types)
+            values = ", ".join(f"*({declarations.declare(t)}*) arguments[{position + i}]"
+                               for i, t in enumerate(types))
+            restype = declarations.declare(
+                None if isinstance(call.native.restype, Void) else call.native.restype.ctype)
+            body.append(f"(({restype} (*)({parameters})) functions[{index}])({values});")
+            position += len(types)
+
+        source = ["#include <stdbool.h>", "#include <stdint.h>", "#include <string.h>"]
+        source.extend(declarations.lines)
+        source.append("""
+// time levels of a ticked grid move one step back, the oldest one becomes the current one
+static void rotate(void** levels, int32_t count) {
+    void* last = levels[count - 1];
+    memmove(levels + 1, levels, sizeof(void*) * (count - 1));
+    levels[0] = last;
+}
+""")
+        source.append(
+            "void replay(int64_t steps, void** functions, void** arguments, void*** levels, const int32_t* counts) {")
+        source.append("    for (int64_t step = 0; step < steps; step++) {")
+        source.extend(f"        {line}" for line in body)
+        source.append("    }")
+        source.append("}")
+
+        config = get_config()
+        library = ctypes.cdll.LoadLibrary(Compiler(cacheroot=config.cacheroot, cc=config.cc).compile(
+            "\n".join(source) + "\n", config.cflags))
+        self._driver = library.replay
+        self._driver.argtypes = [ctypes.c_int64, ctypes.c_void_p,
+                                 ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
+        return self._driver
+
+    def replay(self, steps: int = 1):
+        "run the recorded launches steps times in native code, results of the kernels are discarded"
+        if len(self.calls) == 0 or steps <= 0:
+            return
+        driver = self.driver()
+
+        grids = {id(arg): arg for call in self.calls for arg in call.args if isinstance(arg, Grid)}
+        for grid in grids.values():
+            if len(grid._data) != self.levels[id(grid)]:
+                self.logger.dead(
+                    "Unable to replay kernels on grids whose time levels were resized since the capture")
+            grid._pointers = None
+
+        # arguments are serialized once, grids share their level pointers rotated in place by the driver
+        values = []
+        for call in self.calls:
+            for t, arg in zip(call.native.argtypes, call.args + (call.region,)):
+                values.append(ctypes.cast(arg, ctypes.POINTER(ctypes.c_int32))
+                              if isinstance(t, Region) else t.serialize(arg))
+        functions = (ctypes.c_void_p * len(self.calls))(
+            *[ctypes.cast(call.native.handler, ctypes.c_void_p).value for call in self.calls])
+        arguments = (ctypes.c_void_p * len(values))(*[ctypes.addressof(value) for value in values])
+        ticked = [grid for call in self.calls for grid in call.ticked]
+        levels = (ctypes.c_void_p * max(len(ticked), 1))(
+            *[ctypes.addressof(grid._level_pointers()) for grid in ticked])
+        counts = (ctypes.c_int32 * max(len(ticked), 1))(*[len(grid._data) for grid in ticked])
+
+        driver(steps, functions, arguments, levels, counts)
+
+        for grid in grids.values():
+            grid._reorder()
+            grid._pointers = None
+            if isinstance(grid, BundledGrid):
+                grid.bundle._reorder(grid)
+
+
+_active = threading.local()
+# callbacks run after every kernel launch with the operator and the grids it ticked
+_hooks: list[Callable] = []
+
+
+def hook(callback: Callable):
+    "run callback(operator, ticked) after every kernel launch, launches replayed natively are not seen"
+    _hooks.append(callback)
+
+
+def unhook(callback: Callable):
+    if callback in _hooks:
+        _hooks.remove(callback)
+
+
+def launched(operator: Any, ticked: list[Grid]):
+    for callback in tuple(_hooks):
+        callback(operator, ticked)
+
+
+def recording() -> Capture | None:
+    "capture of the current thread, launches of other threads are not recorded"
+    return getattr(_active, "capture", None)
+
+
+@contextmanager
+def capture() -> Iterator[Capture]:
+    "record the kernel launches of the block, which still run once, as a step replayed by step.replay(n)"
+    step = Capture()
+    if recording() is not None:
+        step.logger.dead("Unable to nest kernel captures")
+    _active.capture = step
+    try:
+        yield step
+    finally:
+        _active.capture = None
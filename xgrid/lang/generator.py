@@ -1,5 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from io import StringIO
+import math
 import sys
 from typing import Optional, cast
 import xgrid.lang.ir as ir
@@ -12,7 +13,7 @@ from xgrid.util.ffi import Compiler, Library
 from xgrid.util.logging import Logger
 from xgrid.util.init import get_config
 from xgrid.util.typing import BaseType, Void
-from xgrid.util.typing.reference import Grid, Pointer
+from xgrid.util.typing.reference import Grid, Pointer, Region
 from xgrid.util.typing.value import Boolean, Floating, Integer, Structure, Value
 
 
@@ -24,12 +25,20 @@ def repeat_str(element: str, time: int, sep: str):
 class StencilFlag:
     variable: ir.Variable
     boundary: int
-    implicit: bool = False
+    time_offset: int
+    space_offset: list[int]
+    ordering: str
+    # offsets relative to the stored cell of loads from the stored time level of the same grid
+    hazards: list[tuple[int, ...]] = field(default_factory=list)
 
     def __post_init__(self):
         assert isinstance(self.variable.type, Grid)
         self._type = self.variable.type
 
+    @property
+    def implicit(self) -> bool:
+        return any(self.hazards)
+
     @property
     def name(self) -> str:
         return self.variable.name
@@ -58,17 +67,31 @@ class StencilParser(IRVisitor):
         if ir.context == "store":
             assert self.stencil_flag is None
 
-            self.stencil_flag = StencilFlag(ir.variable, ir.boundary_mask)
+            self.stencil_flag = StencilFlag(
+                ir.variable, ir.boundary_mask, ir.time_offset, ir.space_offset, ir.ordering)
         elif ir.context == "load":
             if self.stencil_flag is None:
                 self.logger.dead(
                     f"Unable to perform load operation to grid '{ir.variable.name}' without stencil context")
 
-            if ir.time_offset == 0 and self.stencil_flag.variable == ir.variable and ir.boundary_mask == 0:
-                self.stencil_flag.implicit = True
+            flag = self.stencil_flag
+            if ir.time_offset == flag.time_offset and flag.variable == ir.variable and ir.boundary_mask == 0:
+                # only loads from other cells than the stored one could observe partially updated values
+                offset = tuple(l - s for l, s in zip(
+                    ir.space_offset, flag.space_offset))
+                if any(offset) and offset not in flag.hazards:
+                    flag.hazards.append(offset)
+
+    def visit_Reduction(self, ir: expr.Reduction):
+        # reductions iterate the cells on their own, they are not part of a stencil context
+        if self.stencil_flag is not None:
+            self.logger.dead(
+                f"Unable to perform reduction '{ir.operator}' inside stencil of grid '{self.stencil_flag.name}'")
 
     def visit_Assignment(self, ir: stat.Assignment):
         self.visit(ir.terminal)
+        for _, value in getattr(ir, "__cell_bindings", []):
+            self.visit(value)
         self.visit(ir.value)
 
         setattr(ir, "__stencil_flag", self.stencil_flag)
@@ -77,7 +100,7 @@ class StencilParser(IRVisitor):
 
 
 class Generator:
-    def __init__(self, operator: Operator) -> None:
+    def __init__(self, operator: Operator, layouts: dict[str, Grid] | None = None, unmasked: set[str] | None = None) -> None:
         self.logger = Logger(self)
 
         self.operator = operator
@@ -87,7 +110,8 @@ class Generator:
 
         self.definitions = LineFormat()
         self.logger.info("Insert necessary and predefined headers")
-        headers = ["stdio.h", "stdlib.h", "stdint.h", "stdbool.h", "math.h"]
+        headers = ["stdio.h", "stdlib.h", "stdint.h",
+                   "stdbool.h", "string.h", "math.h"]
         if self.config.parallel:
             headers.append("omp.h")
 
@@ -97,15 +121,34 @@ class Generator:
         for header in operator.includes:
             self.definitions.println(f"#include \"{header}\"")
 
+        # bounds of stencil loops over a dimension restricted by the region of the launch
+        self.definitions.println(
+            "static inline int32_t $region_lower(const int32_t* region, int32_t i) {")
+        with self.definitions.indent():
+            self.definitions.println(
+                "return region != NULL && i < region[0] ? region[1 + 2 * i] : 0;")
+        self.definitions.println("}")
+        self.definitions.println(
+            "static inline int32_t $region_upper(const int32_t* region, int32_t i, int32_t n) {")
+        with self.definitions.indent():
+            self.definitions.println(
+                "return region != NULL && i < region[0] && region[2 + 2 * i] < n ? region[2 + 2 * i] : n;")
+        self.definitions.println("}")
+
         self.op_impls: dict[str, LineFormat] = {}
         self.t_impls: dict[str, LineFormat] = {}
-        self.depth = 0
+        self.scratch: set[str] = set()
+        self.reductions = 0
+        # grid argument types of the exported kernel specialized with their storage layouts
+        self.layouts = {} if layouts is None else layouts
+        # grid arguments of the exported kernel passed without boundary labels, every cell is labelled 0
+        self.unmasked = set() if unmasked is None else unmasked
 
         self.define_operator(operator, True)
 
     @property
     def result(self):
-        return self.compile(), self.depth + 1
+        return self.compile(), self.scratch
 
     @property
     def source(self):
@@ -127,8 +170,9 @@ class Generator:
         elif isinstance(t, Integer):
             return f"i{t.width_bits}" if abbr else f"int{t.width_bits}_t"
         elif isinstance(t, Floating):
-            fullname = {32: "float", 64: "double"}[t.width_bits]
-            return fullname[0] if abbr else fullname
+            abbrname, fullname = {16: ("h", "_Float16"), 32: (
+                "f", "float"), 64: ("d", "double")}[t.width_bits]
+            return abbrname if abbr else fullname
         elif isinstance(t, Structure):
             self.define_type(t, t.name)
             return f"st{t.name}" if abbr else f"struct {t.name}"
@@ -137,10 +181,119 @@ class Generator:
         elif isinstance(t, Pointer):
             return f"{self.format_type(t.element)}*"
         elif isinstance(t, Grid):
-            name = f"__Grid{t.dimension}d_{self.format_type(t.element, True)}"
+            name = f"__Grid{t.dimension}d_{self.format_type(t.element, True)}{t.suffix}"
             self.define_type(t, name)
             return name if abbr else f"struct {name}"
 
+    def grid_type(self, variable: ir.Variable) -> Grid:
+        "type of the grid variable specialized with the layout of the exported kernel argument"
+        t = cast(Grid, variable.type)
+        if variable.name in self.layouts and self.operator.ir.scope.get(variable.name) is variable:
+            specialized = self.layouts[variable.name]
+            return replace(t, layout=specialized.layout, stride=specialized.stride, tile=specialized.tile)
+        return t
+
+    def mask_condition(self, variable: ir.Variable, index: str, label: int) -> str | None:
+        "test of the label of a cell, None when it always holds"
+        if variable.name in self.unmasked and self.operator.ir.scope.get(variable.name) is variable:
+            return None if label == 0 else "0"
+        return f"{variable.name}.boundary_mask[{index}] == {label}"
+
+    def is_soa(self, ir: expr.Expression) -> bool:
+        return isinstance(ir, expr.Stencil) and self.grid_type(ir.variable).layout == "soa"
+
+    def is_accessed(self, ir: expr.Expression) -> bool:
+        "whether cells of the stencil are only reached through the load and store accessors of the grid"
+        return isinstance(ir, expr.Stencil) and self.grid_type(ir.variable).layout in ("soa", "sparse")
+
+    def is_sparse(self, variable: ir.Variable) -> bool:
+        return self.grid_type(variable).layout == "sparse"
+
+    def loop_depth(self, variable: ir.Variable) -> int:
+        "number of nested loops sweeping the cells of a grid, tiles of sparse grids are swept by an outer loop"
+        return cast(Grid, variable.type).dimension + (1 if self.is_sparse(variable) else 0)
+
+    def sparse_head(self, name: str, t: Grid, boundary: int, implementation: LineFormat,
+                    colored: bool = False, bounded: bool = True):
+        "loops over the cells of the active tiles of a sparse grid, opening a condition on the current cell"
+        cells = t.tile ** t.dimension
+        implementation.println(
+            f"for (int32_t $tile = 0; $tile < {name}.active_count; $tile++) {{")
+        implementation.force_indent()
+        for i in range(t.dimension):
+            implementation.println(
+                f"for (int32_t $local{i} = 0; $local{i} < {t.tile}; $local{i}++) {{")
+            implementation.force_indent()
+
+        local = "$local0"
+        for i in range(1, t.dimension):
+            local = f"({local}) * {t.tile} + $local{i}"
+        for i in range(t.dimension):
+            implementation.println(
+                f"int32_t $dim{i} = {name}.origins[{name}.active[$tile] * {t.dimension} + {i}] + $local{i};")
+
+        conditions = [f"$dim{i} < {name}.shape[{i}]" for i in range(t.dimension)]
+        conditions.append(
+            f"{name}.boundary_mask[(size_t) {name}.active[$tile] * {cells} + {local}] == {boundary}")
+        if colored:
+            conditions.append(
+                "(" + " + ".join(["$color"] + [f"$dim{i}" for i in range(t.dimension)]) + ") % 2 == 0")
+        # cells out of the region are skipped, or visited and kept by implicit stencils
+        if bounded:
+            for i in range(t.dimension):
+                lower, upper = self.region_bounds(name, i)
+                conditions.append(f"$dim{i} >= {lower} && $dim{i} < {upper}")
+        implementation.println(f"if ({' && '.join(conditions)}) {{")
+        implementation.force_indent()
+
+    def store(self, terminal: expr.Terminal, value: str, implementation: LineFormat):
+        if self.is_accessed(terminal):
+            terminal = cast(expr.Stencil, terminal)
+            implementation.println(
+                f"{self.format_type(self.grid_type(terminal.variable), True)}_store({self.stencil_arguments(terminal)}, {value});")
+        else:
+            implementation.println(
+                f"{self.visit(terminal, implementation)} = {value};")
+
+    def region_bounds(self, name: str, i: int) -> tuple[str, str]:
+        "bounds of the stencil loop over dimension i of grid name restricted by the region of the launch"
+        return f"$region_lower($region, {i})", f"$region_upper($region, {i}, {name}.shape[{i}])"
+
+    def parallel_for(self, variable: ir.Variable, collapse: int, clauses: str = "") -> str:
+        "worksharing pragma of a stencil loop with the threading controls of the kernel"
+        pragma = ["#pragma omp parallel for"]
+        if collapse > 1:
+            pragma.append(f"collapse({collapse})")
+
+        operator = self.operator
+        threads = operator.threads if operator.threads is not None else self.config.threads
+        schedule = operator.schedule if operator.schedule is not None else self.config.schedule
+        minimum = operator.min_parallel_cells if operator.min_parallel_cells is not None \
+            else self.config.min_parallel_cells
+        if threads is not None:
+            pragma.append(f"num_threads({threads})")
+        # the static schedule is explicit so that pages first touched by the runtime are swept by the same threads
+        pragma.append(f"schedule({schedule})")
+        if minimum > 0:
+            # grids with fewer cells in the launch run serially instead of paying for the fork and join
+            name, t = variable.name, self.grid_type(variable)
+            if self.is_sparse(variable):
+                cells = f"(int64_t) {name}.active_count * {t.tile ** t.dimension}"
+            else:
+                cells = " * ".join(f"(int64_t) ({upper} - {lower})" for i in range(t.dimension)
+                                   for lower, upper in [self.region_bounds(name, i)])
+            pragma.append(f"if({cells} >= {minimum})")
+        if clauses:
+            pragma.append(clauses)
+        return " ".join(pragma)
+
+    def linear_index(self, name: str, dimension: int):
+        "row major index of the current cell of a stencil loop in grid name"
+        index = "$dim0"
+        for i in range(1, dimension):
+            index = f"({index}) * {name}.shape[{i}] + $dim{i}"
+        return index
+
     def define_type(self, t: BaseType, name: str):
         if name in self.t_impls:
             return
@@ -160,25 +313,173 @@ class Generator:
                 implementation.println("int32_t time;")
                 implementation.println(f"int32_t shape[{t.dimension}];")
                 implementation.println(
-                    f"{self.format_type(t.element)}** data;")
-                implementation.println("int32_t* boundary_mask;")
+                    f"{self.format_type(t.element) if t.layout == 'aos' else 'char'}** data;")
+                implementation.println(f"{self.config.mask}_t* boundary_mask;")
+                if t.layout == "sparse":
+                    for field_name in ("table", "origins", "active"):
+                        implementation.println(f"int32_t* {field_name};")
+                    implementation.println("int32_t active_count;")
+                    implementation.println("int32_t tile_count;")
             implementation.println("};")
 
-            implementation.println(
-                f"static inline {self.format_type(t.element)}* {name}_at(struct {name} grid, {', '.join(f'int32_t space_offset_{i}' for i in range(t.dimension))}, int32_t time_offset) {{")
-            with implementation.indent():
+            parameters = ', '.join(
+                f'int32_t space_offset_{i}' for i in range(t.dimension))
+            arguments = ', '.join(
+                f'space_offset_{i}' for i in range(t.dimension))
+
+            def gen_space_offset():
                 implementation.println("int32_t space_offset = 0;")
                 for i in range(t.dimension):
                     if self.config.overstep == "wrap":
-                        space_offset_i = f"((space_offset_{t.dimension - 1 - i} + grid.shape[{i}]) % grid.shape[{i}])"
+                        space_offset_i = f"((space_offset_{i} + grid.shape[{i}]) % grid.shape[{i}])"
                     elif self.config.overstep == "limit":
-                        space_offset_i = f"(space_offset_{t.dimension - 1 - i} < 0 ? 0 : space_offset_{t.dimension - 1 - i} >= grid.shape[{i}] ? grid.shape[{i}] - 1 : space_offset_{t.dimension - 1 - i})"
+                        space_offset_i = f"(space_offset_{i} < 0 ? 0 : space_offset_{i} >= grid.shape[{i}] ? grid.shape[{i}] - 1 : space_offset_{i})"
                     else:
-                        space_offset_i = f"space_offset_{t.dimension - 1 - i}"
+                        space_offset_i = f"space_offset_{i}"
                     implementation.println(
-                        f"space_offset += {space_offset_i} * {'1' if i == 0 else f'grid.shape[{i - 1}]'};")
+                        f"space_offset = space_offset * grid.shape[{i}] + {space_offset_i};")
+
+            cells = " * ".join(
+                f"(size_t) grid.shape[{i}]" for i in range(t.dimension))
+
+            if t.layout == "aos":
+                implementation.println(
+                    f"static inline {self.format_type(t.element)}* {name}_at(struct {name} grid, {parameters}, int32_t time_offset) {{")
+                with implementation.indent():
+                    gen_space_offset()
+                    implementation.println(
+                        f"return &grid.data[time_offset][space_offset];")
+                implementation.println("}")
+                return
+
+            if t.layout == "sparse":
+                # cells are stored in tiles allocated on demand, cells of unallocated tiles read as zero
+                element_name = self.format_type(t.element)
+                tile_cells = t.tile ** t.dimension
+                implementation.println(
+                    f"static inline size_t {name}_size(struct {name} grid) {{")
+                with implementation.indent():
+                    implementation.println(
+                        f"return (size_t) grid.tile_count * {tile_cells} * sizeof({element_name});")
+                implementation.println("}")
+
+                implementation.println(
+                    f"static inline {element_name}* {name}_at(struct {name} grid, {parameters}, int32_t time_offset) {{")
+                with implementation.indent():
+                    for i in range(t.dimension):
+                        if self.config.overstep == "wrap":
+                            implementation.println(
+                                f"space_offset_{i} = (space_offset_{i} + grid.shape[{i}]) % grid.shape[{i}];")
+                        elif self.config.overstep == "limit":
+                            implementation.println(
+                                f"space_offset_{i} = space_offset_{i} < 0 ? 0 : space_offset_{i} >= grid.shape[{i}] ? grid.shape[{i}] - 1 : space_offset_{i};")
+                    outside = " || ".join(
+                        f"space_offset_{i} < 0 || space_offset_{i} >= grid.shape[{i}]" for i in range(t.dimension))
+                    implementation.println(f"if ({outside}) {{")
+                    with implementation.indent():
+                        implementation.println("return NULL;")
+                    implementation.println("}")
+                    tile, local = f"space_offset_0 / {t.tile}", f"space_offset_0 % {t.tile}"
+                    for i in range(1, t.dimension):
+                        tile = f"({tile}) * ((grid.shape[{i}] + {t.tile - 1}) / {t.tile}) + space_offset_{i} / {t.tile}"
+                        local = f"({local}) * {t.tile} + space_offset_{i} % {t.tile}"
+                    implementation.println(f"int32_t slot = grid.table[{tile}];")
+                    implementation.println(
+                        f"return slot < 0 ? NULL : ({element_name}*) (grid.data[time_offset] + ((size_t) slot * {tile_cells} + {local}) * sizeof({element_name}));")
+                implementation.println("}")
+
                 implementation.println(
-                    f"return &grid.data[time_offset][space_offset];")
+                    f"static inline {element_name} {name}_load(struct {name} grid, {parameters}, int32_t time_offset) {{")
+                with implementation.indent():
+                    implementation.println(
+                        f"{element_name}* cell = {name}_at(grid, {arguments}, time_offset);")
+                    implementation.println(
+                        f"return cell == NULL ? ({element_name}) {{0}} : *cell;")
+                implementation.println("}")
+
+                implementation.println(
+                    f"static inline void {name}_store(struct {name} grid, {parameters}, int32_t time_offset, {element_name} value) {{")
+                with implementation.indent():
+                    implementation.println(
+                        f"{element_name}* cell = {name}_at(grid, {arguments}, time_offset);")
+                    implementation.println("if (cell != NULL) {")
+                    with implementation.indent():
+                        implementation.println("*cell = value;")
+                    implementation.println("}")
+                implementation.println("}")
+                return
+
+            if t.layout == "strided":
+                # elements are interleaved with other fields of a bundle, the stride is a compile time constant
+                element_name = self.format_type(t.element)
+                implementation.println(
+                    f"static inline size_t {name}_size(struct {name} grid) {{")
+                with implementation.indent():
+                    implementation.println(
+                        f"return ({cells} - 1) * {t.stride} + sizeof({element_name});")
+                implementation.println("}")
+
+                implementation.println(
+                    f"static inline {element_name}* {name}_at(struct {name} grid, {parameters}, int32_t time_offset) {{")
+                with implementation.indent():
+                    gen_space_offset()
+                    implementation.println(
+                        f"return ({element_name}*) (grid.data[time_offset] + (size_t) space_offset * {t.stride});")
+                implementation.println("}")
+
+                implementation.println(
+                    f"static inline {element_name} {name}_load(struct {name} grid, {parameters}, int32_t time_offset) {{")
+                with implementation.indent():
+                    implementation.println(
+                        f"return *{name}_at(grid, {arguments}, time_offset);")
+                implementation.println("}")
+
+                implementation.println(
+                    f"static inline void {name}_store(struct {name} grid, {parameters}, int32_t time_offset, {element_name} value) {{")
+                with implementation.indent():
+                    implementation.println(
+                        f"*{name}_at(grid, {arguments}, time_offset) = value;")
+                implementation.println("}")
+                return
+
+            # every field is stored in its own plane of the time level, planes are aligned to 64 bytes
+            element = cast(Structure, t.element)
+            planes = []
+            for field_name, field_type in element.elements:
+                planes.append(
+                    f"(({cells} * sizeof({self.format_type(field_type)}) + 63) / 64 * 64)")
+
+            implementation.println(
+                f"static inline size_t {name}_size(struct {name} grid) {{")
+            with implementation.indent():
+                implementation.println(f"return {' + '.join(planes)};")
+            implementation.println("}")
+
+            for i, (field_name, field_type) in enumerate(element.elements):
+                field_type_name = self.format_type(field_type)
+                implementation.println(
+                    f"static inline {field_type_name}* {name}_at_{field_name}(struct {name} grid, {parameters}, int32_t time_offset) {{")
+                with implementation.indent():
+                    gen_space_offset()
+                    implementation.println(
+                        f"return ({field_type_name}*) (grid.data[time_offset] + {' + '.join(planes[:i]) or '0'}) + space_offset;")
+                implementation.println("}")
+
+            element_name = self.format_type(element)
+            implementation.println(
+                f"static inline {element_name} {name}_load(struct {name} grid, {parameters}, int32_t time_offset) {{")
+            with implementation.indent():
+                fields = ', '.join(
+                    f"*{name}_at_{field_name}(grid, {arguments}, time_offset)" for field_name, _ in element.elements)
+                implementation.println(f"return ({element_name}) {{{fields}}};")
+            implementation.println("}")
+
+            implementation.println(
+                f"static inline void {name}_store(struct {name} grid, {parameters}, int32_t time_offset, {element_name} value) {{")
+            with implementation.indent():
+                for field_name, _ in element.elements:
+                    implementation.println(
+                        f"*{name}_at_{field_name}(grid, {arguments}, time_offset) = value.{field_name};")
             implementation.println("}")
 
     def define_operator(self, operator: Operator, export: bool = False):
@@ -194,8 +495,23 @@ class Generator:
         implementation = LineFormat()
         self.op_impls[operator.name] = implementation
 
-        arguments = ', '.join(
-            map(lambda x: f"{self.format_type(x[1])} {x[0]}", opir.signature.arguments))
+        def format_argument(t: BaseType):
+            # half precision scalars cross the exported interface as float
+            if export and isinstance(t, Floating) and t.width_bytes == 2:
+                return "float"
+            return self.format_type(t)
+
+        if export:
+            argtypes = [self.grid_type(opir.scope[name]) if isinstance(t, Grid) else t
+                        for name, t in opir.signature.arguments]
+        else:
+            argtypes = [t for _, t in opir.signature.arguments]
+        arguments = [f"{format_argument(t)} {name}" for (name, _), t in zip(
+            opir.signature.arguments, argtypes)]
+        if operator.mode != "external":
+            # the region of the launch is passed down to every operator which may contain stencils
+            arguments.append("const int32_t* $region")
+        arguments = ', '.join(arguments)
         
         if sys.platform == "win32" and export:
             decl_export = "__declspec(dllexport)"
@@ -204,7 +520,7 @@ class Generator:
             decl_export = ""
             decl_call = ""
 
-        definition = f"{decl_export} {self.format_type(opir.signature.return_type)} {decl_call} {operator.name}({arguments})"
+        definition = f"{decl_export} {format_argument(opir.signature.return_type)} {decl_call} {operator.name}({arguments})"
         self.definitions.println(
             ("extern " if operator.mode == "external" else "") + definition + ";")
 
@@ -228,10 +544,15 @@ class Generator:
     def compile(self):
         self.logger.info(
             f"Compiling kernel {self.operator.name}' and retrive interface")
-        dynlib = Compiler(cacheroot=self.config.cacheroot, cc=self.config.cc).compile(
-            self.source, self.config.cflags)
-
-        argtypes = [x[1] for x in self.operator.ir.signature.arguments]
+        compiler = Compiler(cacheroot=self.config.cacheroot, cc=self.config.cc)
+        source = self.source
+        if "_Float16" in source and not compiler.supports(
+                "_Float16 half(_Float16 x) { return x + x; }\n", self.config.cflags):
+            self.logger.dead(
+                f"Compiler '{compiler.cc}' lacks _Float16 for the half precision values of kernel '{self.operator.name}'")
+        dynlib = compiler.compile(source, self.config.cflags)
+
+        argtypes = [x[1] for x in self.operator.ir.signature.arguments] + [Region()]
         rettype = self.operator.ir.signature.return_type
 
         return Library(dynlib).function(self.operator.name, argtypes, rettype)
@@ -273,8 +594,21 @@ class Generator:
         implementation.println("}")
 
     def visit_While(self, ir: stat.While, implementation: LineFormat):
-        implementation.println(
-            f"while ({self.visit(ir.condition, implementation)}) {{")
+        prelude = LineFormat()
+        prelude.indents = implementation.indents + implementation.indent_size
+        condition = self.visit(ir.condition, prelude)
+
+        if any(prelude.lines):
+            # reductions of the condition are evaluated again before every iteration
+            implementation.println("while (1) {")
+            implementation.lines.extend(prelude.lines)
+            with implementation.indent():
+                implementation.println(f"if (!{condition}) break;")
+                self.visits(ir.body, implementation)
+            implementation.println("}")
+            return
+
+        implementation.println(f"while ({condition}) {{")
         with implementation.indent():
             self.visits(ir.body, implementation)
         implementation.println("}")
@@ -286,82 +620,156 @@ class Generator:
         stencil_flag = getattr(ir, "__stencil_flag", None)
 
         if stencil_flag is not None:
-            def gen_head(s: StencilFlag):
+            def gen_head(s: StencilFlag, colored: bool = False, bounded: bool = True):
+                if self.is_sparse(s.variable):
+                    self.sparse_head(s.name, self.grid_type(s.variable),
+                                     s.boundary, implementation, colored, bounded)
+                    return
+
                 for i in range(s.dimension):
-                    implementation.println(
-                        f"for (int32_t $dim{i} = 0; $dim{i} < {s.name}.shape[{i}]; $dim{i}++) {{")
+                    lower, upper = self.region_bounds(s.name, i) if bounded else ("0", f"{s.name}.shape[{i}]")
+                    if colored and i == s.dimension - 1:
+                        # the innermost loop visits every other cell, starting from the one of $color
+                        parity = " + ".join(["$color", lower] + [f"$dim{j}" for j in range(i)])
+                        implementation.println(
+                            f"for (int32_t $dim{i} = {lower} + ({parity}) % 2; $dim{i} < {upper}; $dim{i} += 2) {{")
+                    else:
+                        implementation.println(
+                            f"for (int32_t $dim{i} = {lower}; $dim{i} < {upper}; $dim{i}++) {{")
                     implementation.force_indent()
 
-                id = " + ".join(
-                    f"$dim{s.dimension - i - 1} * {'1' if i == 0 else f'{s.name}.shape[{i - 1}]'}" for i in range(s.dimension))
-                implementation.println(
-                    f"if ({s.name}.boundary_mask[{id}] == {s.boundary}) {{")
+                condition = self.mask_condition(
+                    s.variable, self.linear_index(s.name, s.dimension), s.boundary)
+                conditions = [] if condition is None else [condition]
+                if not bounded:
+                    # cells out of the region are visited but keep their values
+                    conditions += [f"$dim{i} >= {lower} && $dim{i} < {upper}" for i in range(s.dimension)
+                                   for lower, upper in [self.region_bounds(s.name, i)]]
+                implementation.println(f"if ({' && '.join(conditions)}) {{" if any(conditions) else "{")
                 implementation.force_indent()
 
+            def gen_bindings():
+                for variable, value in getattr(ir, "__cell_bindings", []):
+                    implementation.println(
+                        f"{self.format_type(variable.type)} {variable.name} = {self.visit(value, implementation)};")
+
             def gen_tail(s: StencilFlag):
-                for i in range(s.dimension + 1):
+                for i in range(self.loop_depth(s.variable) + 1):
                     implementation.force_dedent()
                     implementation.println("}")
 
             stencil_flag = cast(StencilFlag, stencil_flag)
 
-            if stencil_flag.implicit and not self.config.parallel:
-                self.logger.dead(
-                    f"Unable to perform implicit operation while parallel is off")
+            if stencil_flag.implicit and stencil_flag.boundary == 0 and stencil_flag.ordering == "redblack":
+                # cells of one color only depend on cells of the other color, update them in place in two half sweeps
+                for offset in stencil_flag.hazards:
+                    if sum(map(abs, offset)) % 2 == 0:
+                        self.logger.dead(
+                            f"Unable to perform red-black ordering on '{stencil_flag.name}', load at offset {list(offset)} has the color of the stored cell")
 
-            if stencil_flag.implicit and stencil_flag.boundary == 0:
-                # TODO: handle implicit case
+                implementation.println(
+                    "for (int32_t $color = 0; $color < 2; $color++) {")
+                with implementation.indent():
+                    if self.config.parallel:
+                        # the innermost loop of dense grids skips every other cell and is not collapsed
+                        collapse = self.loop_depth(stencil_flag.variable) - \
+                            (0 if self.is_sparse(stencil_flag.variable) else 1)
+                        implementation.println(
+                            self.parallel_for(stencil_flag.variable, collapse), indent=False)
+                    gen_head(stencil_flag, True)
+                    gen_bindings()
+                    self.store(ir.terminal, self.visit(
+                        ir.value, implementation), implementation)
+                    gen_tail(stencil_flag)
+                implementation.println("}")
+            elif stencil_flag.implicit and stencil_flag.boundary == 0:
+                # the whole grid is evaluated into the scratch time level slot provided by the runtime,
+                # which is swapped with the stored time level afterwards
                 implementation.println("{")
                 with implementation.indent():
-                    # create a thread local intermediate value to store
-                    value_type = self.format_type(ir.value.type)
-                    value_size = " * ".join(
-                        f"{stencil_flag.name}.shape[{i}]" for i in range(stencil_flag.dimension))
-                    implementation.println(
-                        f"{value_type}* $value = malloc(sizeof({value_type}) * ({value_size}));")
+                    name = stencil_flag.name
+                    time = abs(cast(expr.Stencil, ir.terminal).time_offset)
+                    # structure of arrays and strided levels are only addressed through their accessors
+                    bytewise = self.grid_type(stencil_flag.variable).layout != "aos"
+                    grid_name = self.format_type(
+                        self.grid_type(stencil_flag.variable), True)
+                    value_type = "char" if bytewise else self.format_type(ir.value.type)
+                    value_id = self.linear_index(name, stencil_flag.dimension)
+                    value_size = f"{grid_name}_size({name})" if bytewise else f"sizeof({value_type}) * (" + " * ".join(
+                        f"{name}.shape[{i}]" for i in range(stencil_flag.dimension)) + ")"
 
                     implementation.println(
-                        "#pragma omp parallel", indent=False)
-                    implementation.println("{")
+                        f"{value_type}* $value = {name}.data[{name}.time];")
+                    implementation.println("bool $scratch = $value != NULL;")
+                    implementation.println("if (!$scratch) {")
                     with implementation.indent():
+                        implementation.println(
+                            f"$value = malloc({value_size});")
+                        if bytewise:
+                            # strided levels share their bytes with other fields which must be preserved
+                            implementation.println(
+                                f"memcpy($value, {name}.data[{time}], {value_size});")
+                    implementation.println("}")
 
-                        value_id = " + ".join(
-                            f"$dim{stencil_flag.dimension - i - 1} * {'1' if i == 0 else f'{stencil_flag.name}.shape[{i - 1}]'}" for i in range(stencil_flag.dimension))
+                    if bytewise:
+                        # the scratch level is addressed through a grid holding it as its only level
+                        dims = ", ".join(
+                            f"$dim{i}" for i in range(stencil_flag.dimension))
+                        implementation.println("char* $levels[1] = {$value};")
+                        implementation.println(
+                            f"struct {grid_name} $next = {name};")
+                        implementation.println("$next.data = $levels;")
 
-                        # load value to thread local value first
+                    if self.config.parallel:
                         implementation.println(
-                            f"#pragma omp for collapse({stencil_flag.dimension})", indent=False)
-                        gen_head(stencil_flag)
+                            self.parallel_for(stencil_flag.variable, self.loop_depth(stencil_flag.variable)), indent=False)
+                    gen_head(stencil_flag, bounded=False)
+                    gen_bindings()
+                    if bytewise:
+                        implementation.println(
+                            f"{grid_name}_store($next, {dims}, 0, {self.visit(ir.value, implementation)});")
+                    else:
                         implementation.println(
                             f"$value[{value_id}] = {self.visit(ir.value, implementation)};")
-                        gen_tail(stencil_flag)
-
-                        # perform barrier operation
+                    implementation.force_dedent()
+                    implementation.println("} else {")
+                    implementation.force_indent()
+                    if bytewise:
+                        implementation.println(
+                            f"{grid_name}_store($next, {dims}, 0, {grid_name}_load({name}, {dims}, {time}));")
+                    else:
                         implementation.println(
-                            "#pragma omp barrier", indent=False)
+                            f"$value[{value_id}] = {name}.data[{time}][{value_id}];")
+                    gen_tail(stencil_flag)
 
-                        # load value to grid then
+                    implementation.println("if ($scratch) {")
+                    with implementation.indent():
+                        implementation.println(
+                            f"{name}.data[{name}.time] = {name}.data[{time}];")
                         implementation.println(
-                            f"#pragma omp for collapse({stencil_flag.dimension})", indent=False)
-                        gen_head(stencil_flag)
+                            f"{name}.data[{time}] = $value;")
+                    implementation.println("} else {")
+                    with implementation.indent():
                         implementation.println(
-                            f"{self.visit(ir.terminal, implementation)} = $value[{value_id}];")
-                        gen_tail(stencil_flag)
+                            f"memcpy({name}.data[{time}], $value, {value_size});")
+                        implementation.println("free($value);")
                     implementation.println("}")
-                    implementation.println("free($value);")
                 implementation.println("}")
+
+                self.scratch.add(name)
             else:
                 if self.config.parallel:
                     implementation.println(
-                        f"#pragma omp parallel for collapse({stencil_flag.dimension})", indent=False)
+                        self.parallel_for(stencil_flag.variable, self.loop_depth(stencil_flag.variable)), indent=False)
 
                 gen_head(stencil_flag)
-                implementation.println(
-                    f"{self.visit(ir.terminal, implementation)} = {self.visit(ir.value, implementation)};")
+                gen_bindings()
+                self.store(ir.terminal, self.visit(
+                    ir.value, implementation), implementation)
                 gen_tail(stencil_flag)
         else:
-            implementation.println(
-                f"{self.visit(ir.terminal, implementation)} = {self.visit(ir.value, implementation)};")
+            self.store(ir.terminal, self.visit(
+                ir.value, implementation), implementation)
 
     def visit_Inline(self, ir: stat.Inline, implementation: LineFormat):
         implementation.println(ir.source)
@@ -385,12 +793,21 @@ class Generator:
             return f"({self.visit(ir.left, implementation)} {ir.operator.value} {self.visit(ir.right, implementation)})"
 
     def visit_Unary(self, ir: expr.Unary, implementation: LineFormat):
+        if ir.operator == expr.UnaryOperator.Sqrt:
+            if isinstance(ir.type, Floating) and ir.type.width_bits == 64:
+                sqrt_func = "sqrt"
+            else:
+                sqrt_func = "sqrtf"
+            return f"{sqrt_func}({self.visit(ir.right, implementation)})"
         return f"({ir.operator.value} {self.visit(ir.right, implementation)})"
 
     def visit_Condition(self, ir: expr.Condition, implementation: LineFormat):
         return f"({self.visit(ir.condition, implementation)} ? {self.visit(ir.body, implementation)} : {self.visit(ir.orelse, implementation)})"
 
     def visit_Constant(self, ir: expr.Constant, implementation: LineFormat):
+        # non finite constants have no literal in c
+        if isinstance(ir.value, float) and not math.isfinite(ir.value):
+            return "NAN" if math.isnan(ir.value) else "INFINITY" if ir.value > 0 else "(-INFINITY)"
         return repr(ir.value).lower()
 
     def visit_Identifier(self, ir: expr.Identifier, implementation: LineFormat):
@@ -400,12 +817,20 @@ class Generator:
             return ir.variable.name
 
     def visit_Access(self, ir: expr.Access, implementation: LineFormat):
+        if self.is_soa(ir.value):
+            # a single field is loaded from its plane instead of gathering the whole structure
+            stencil = cast(expr.Stencil, ir.value)
+            return f"(*{self.format_type(self.grid_type(stencil.variable), True)}_at_{ir.attribute}({self.stencil_arguments(stencil)}))"
         return f"({self.visit(ir.value, implementation)}).{ir.attribute}"
 
     def visit_Call(self, ir: expr.Call, implementation: LineFormat):
         args = []
 
         for id, argument in enumerate(ir.arguments):
+            if isinstance(argument, expr.Identifier) and isinstance(argument.variable.type, Grid) \
+                    and self.grid_type(argument.variable).layout != "aos":
+                self.logger.dead(
+                    f"Unable to pass {self.grid_type(argument.variable).layout} grid '{argument.variable.name}' to operator '{ir.operator.name}'")
             arg_code = self.visit(argument, implementation)
             arg_type = ir.operator.signature.arguments[id][1]
             if isinstance(arg_type, Pointer) and argument.type == arg_type.element:
@@ -416,6 +841,8 @@ class Generator:
             return f"(({self.format_type(ir.operator.type)}) {{{args}}})"
         else:
             self.define_operator(ir.operator)
+            if ir.operator.mode != "external":
+                args = ', '.join(filter(None, [args, "$region"]))
             return f"{ir.operator.name}({args})"
 
     def visit_Cast(self, ir: expr.Cast, implementation: LineFormat):
@@ -425,11 +852,73 @@ class Generator:
         irvar = ir.variable
         assert isinstance(irvar.type, Grid)
 
-        self.depth = max(self.depth, abs(ir.time_offset))
+        if self.is_accessed(ir):
+            return f"{self.format_type(self.grid_type(irvar), True)}_load({self.stencil_arguments(ir)})"
+        return f"(*{self.format_type(self.grid_type(irvar), True)}_at({self.stencil_arguments(ir)}))"
+
+    def stencil_arguments(self, ir: expr.Stencil):
+        assert isinstance(ir.variable.type, Grid)
+
+        # grids of the exported kernel it never stores into are not ticked, their loads are shifted accordingly
+        level = abs(ir.time_offset)
+        access = self.operator.access.get(ir.variable.name)
+        if access is not None and self.operator.ir.scope.get(ir.variable.name) is ir.variable:
+            level = access.level(ir.time_offset)
 
         indexes = ', '.join(
-            f"$dim{i} + {ir.space_offset[i]}" for i in range(irvar.type.dimension))
-        return f"(*{self.format_type(irvar.type, True)}_at({ir.variable.name}, {indexes}, {abs(ir.time_offset)}))"
+            f"$dim{i} + {ir.space_offset[i]}" for i in range(ir.variable.type.dimension))
+        return f"{ir.variable.name}, {indexes}, {level}"
+
+    def visit_Reduction(self, ir: expr.Reduction, implementation: LineFormat):
+        # the cells are reduced by a loop emitted before the statement using the result, the loop sweeps the
+        # cells of the first grid the value reads and is masked by the boundary labels of that grid only
+        grid = cast(Grid, ir.variable.type)
+        name = ir.variable.name
+        result = f"$reduce{self.reductions}"
+        self.reductions += 1
+
+        value_type = self.format_type(ir.value.type)
+        if ir.operator in ("sum", "norm"):
+            clause, initial = "+", "0"
+        elif isinstance(ir.value.type, Floating):
+            clause, initial = ir.operator, "-INFINITY" if ir.operator == "max" else "INFINITY"
+        else:
+            bound = "MIN" if ir.operator == "max" else "MAX"
+            clause, initial = ir.operator, f"INT{ir.value.type.width_bits}_{bound}"  # type: ignore
+
+        implementation.println(f"{value_type} {result} = {initial};")
+        if self.config.parallel:
+            implementation.println(
+                self.parallel_for(ir.variable, self.loop_depth(ir.variable), f"reduction({clause}:{result})"), indent=False)
+        if self.is_sparse(ir.variable):
+            self.sparse_head(name, self.grid_type(ir.variable),
+                             ir.boundary_mask, implementation)
+            implementation.force_dedent()
+        else:
+            for i in range(grid.dimension):
+                lower, upper = self.region_bounds(name, i)
+                implementation.println(
+                    f"for (int32_t $dim{i} = {lower}; $dim{i} < {upper}; $dim{i}++) {{")
+                implementation.force_indent()
+            condition = self.mask_condition(ir.variable, self.linear_index(name, grid.dimension), ir.boundary_mask)
+            implementation.println("{" if condition is None else f"if ({condition}) {{")
+        with implementation.indent():
+            implementation.println(
+                f"{value_type} $cell = {self.visit(ir.value, implementation)};")
+            if ir.operator in ("sum", "norm"):
+                implementation.println(
+                    f"{result} += {'$cell * $cell' if ir.operator == 'norm' else '$cell'};")
+            else:
+                implementation.println(
+                    f"{result} = $cell {'>' if ir.operator == 'max' else '<'} {result} ? $cell : {result};")
+        implementation.println("}")
+        for i in range(self.loop_depth(ir.variable)):
+            implementation.force_dedent()
+            implementation.println("}")
+
+        if ir.operator == "norm":
+            return f"{'sqrt' if ir.type.width_bits == 64 else 'sqrtf'}({result})"  # type: ignore
+        return result
 
     def visit_GridInfo(self, ir: expr.GridInfo, implementation: LineFormat):
         assert isinstance(ir.variable.type, Grid)
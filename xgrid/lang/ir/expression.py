@@ -48,6 +48,8 @@ class UnaryOperator(Enum):
     Neg = "-"
     Not = "!"
 
+    Sqrt = "sqrt"
+
 
 @dataclass
 class Binary(Expression):
@@ -118,6 +120,7 @@ class Stencil(Terminal):
     time_offset: int
     space_offset: list[int]
     boundary_mask: int = 0
+    ordering: Literal["jacobi", "redblack"] = "jacobi"
 
     def __post_init__(self):
         assert isinstance(self.variable.type, Grid)
@@ -183,3 +186,15 @@ class GridInfo(Expression):
         if self.dimension is not None:
             format.print(self.dimension)
         format.print(plain(")"))
+
+
+@dataclass
+class Reduction(Expression):
+    operator: Literal["sum", "max", "min", "norm"]
+    value: Expression
+    # cells of this grid matching the boundary mask are reduced
+    variable: Variable
+    boundary_mask: int
+
+    def write(self, format: ElementFormat):
+        format.print(kw(self.operator), plain(f"[{self.boundary_mask}]("), self.value, plain(")"))
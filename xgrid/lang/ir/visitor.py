@@ -25,3 +25,32 @@ class IRVisitor:
                 self.generic_visit(ir)
             else:
                 method(ir)
+
+
+class IRTransformer(IRVisitor):
+    def generic_visit(self, ir: IR):
+        ir_fields = fields(ir)
+        for ir_field in ir_fields:
+            ir_fval = getattr(ir, ir_field.name)
+            if isinstance(ir_fval, list):
+                transformed = []
+                for val in ir_fval:
+                    val = self.visit(val)
+                    if isinstance(val, list):
+                        transformed.extend(val)
+                    else:
+                        transformed.append(val)
+                setattr(ir, ir_field.name, transformed)
+            elif isinstance(ir_fval, IR):
+                setattr(ir, ir_field.name, self.visit(ir_fval))
+        return ir
+
+    def visit(self, ir: IR):
+        if isinstance(ir, IR):
+            ir_class = ir.__class__.__name__
+            method = getattr(self, "visit_" + ir_class, None)
+            if method is None:
+                return self.generic_visit(ir)
+            else:
+                return method(ir)
+        return ir
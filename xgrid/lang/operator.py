@@ -1,17 +1,26 @@
-from typing import Any, Callable
+from ctypes import c_int32
+from threading import Lock
+from typing import Any, Callable, Literal, get_args
+from xgrid.lang.access import Access, grid_access
+from xgrid.lang.capture import launched, recording
 from xgrid.lang.ir.statement import Definition
+from xgrid.lang.optimizer import Optimizer
 from xgrid.lang.parser import Parser
 
+from xgrid.util.init import Schedule
 from xgrid.util.logging import Logger
 from xgrid.util.typing import BaseType
-from xgrid.xgrid import Grid as XGrid
+from xgrid.xgrid import BundledGrid, Grid as XGrid
 
 
 CustomTypecheck = Callable[[list[BaseType]], BaseType]
 
+# kernels launched from several threads are parsed and compiled once
+compiling = Lock()
+
 
 class Operator:
-    def __init__(self, func, mode: str, name: str | None = None, includes: list[str] | None = None, self_type: BaseType | None = None, typecheck_override: CustomTypecheck | None = None, tick: bool = True, macro: list[str] | None = None) -> None:
+    def __init__(self, func, mode: str, name: str | None = None, includes: list[str] | None = None, self_type: BaseType | None = None, typecheck_override: CustomTypecheck | None = None, tick: bool = True, macro: list[str] | None = None, ordering: Literal["jacobi", "redblack"] = "jacobi", threads: int | None = None, schedule: Schedule | None = None, min_parallel_cells: int | None = None) -> None:
         self.func = func
         self.mode = mode
 
@@ -21,39 +30,137 @@ class Operator:
         self.includes = [] if includes is None else includes
         self.macro = [] if macro is None else macro
 
-        self.native = None
+        # compiled kernels specialized by the storage layouts of grid arguments
+        self.natives: dict[tuple, tuple[Callable, set[str]]] = {}
         self.self_type = self_type
         self.typecheck_override = typecheck_override
         self.tick = tick
+        self.ordering = ordering
 
-    def __call__(self, *args: Any) -> Any:
-        if self.mode == "kernel":
-            if self.native is None:
-                from xgrid.lang.generator import Generator
-
-                self.native, self.depth = Generator(self).result
+        # threading controls of the stencil loops, the defaults of init are used when not given
+        if threads is not None and threads < 1:
+            self.logger.dead(
+                f"Kernel '{self.name}' should run on at least one thread instead of {threads}")
+        if schedule is not None and schedule not in get_args(Schedule):
+            self.logger.dead(
+                f"Unknown schedule '{schedule}' of kernel '{self.name}'")
+        self.threads = threads
+        self.schedule = schedule
+        self.min_parallel_cells = min_parallel_cells
 
-            # tick the field and resize the time step if necessary
-            for arg in args:
+    def __call__(self, *args: Any, region: tuple[slice, ...] | None = None, tick: bool | None = None) -> Any:
+        if self.mode == "kernel":
+            with compiling:
+                layouts = {name: arg.typing for (name, _), arg in zip(self.signature.arguments, args)
+                           if isinstance(arg, XGrid) and arg.layout != "aos"}
+                # labels of grids without any are never read, unless the grid escapes to unspecialized code
+                unmasked = set()
+                for (name, _), arg in zip(self.signature.arguments, args):
+                    if isinstance(arg, XGrid) and not arg.masked:
+                        if self.access[name].escapes:
+                            arg.boundary
+                        else:
+                            unmasked.add(name)
+                specialization = tuple(sorted((name, t.layout, t.stride, t.tile)
+                                       for name, t in layouts.items())) + tuple(sorted(unmasked))
+                if specialization not in self.natives:
+                    from xgrid.lang.generator import Generator
+
+                    self.natives[specialization] = Generator(self, layouts, unmasked).result
+                native, scratch_names = self.natives[specialization]
+
+            # extend the time levels of every grid to those it is addressed at and tick the grids stored into,
+            # grids passed more than once are ticked once
+            grids: dict[int, XGrid] = {}
+            depths: dict[int, int] = {}
+            written: set[int] = set()
+            scratch: set[int] = set()
+            for (name, _), arg in zip(self.signature.arguments, args):
                 if isinstance(arg, XGrid):
-                    arg._op_invoke(self.depth, self.tick)
-
-            return self.native(*args)
+                    key = id(arg)
+                    grids[key] = arg
+                    depths[key] = max(depths.get(key, 1), self.access[name].depth)
+                    if self.access[name].written:
+                        written.add(key)
+                    if name in scratch_names:
+                        scratch.add(key)
+
+            # launches completing a partial sweep of the same step do not tick again
+            ticking = self.tick if tick is None else tick
+            # fields of a bundle advance together so that a time level stays one record, implicit stencils
+            # on them use a temporary level instead of a scratch slot
+            bundles: dict[int, list[BundledGrid]] = {}
+            for key, grid in grids.items():
+                if isinstance(grid, BundledGrid):
+                    bundles.setdefault(id(grid.bundle), []).append(grid)
+                else:
+                    grid._op_invoke(depths[key], ticking and key in written, key in scratch)
+            for members in bundles.values():
+                members[0].bundle._op_invoke(max(depths[id(grid)] for grid in members),
+                                             [grid for grid in members if ticking and id(grid) in written])
+
+            region_bounds = self._region(region, args)
+            result = native(*args, region_bounds)
+
+            for grid in grids.values():
+                grid._op_return()
+
+            ticked = [grids[key] for key in grids if ticking and key in written]
+            step = recording()
+            if step is not None:
+                step.record(self.name, native, args, region_bounds, ticked)
+            launched(self, ticked)
+
+            return result
         elif self.mode == "function":
             return self.func(*args)
         else:
             self.logger.dead(
                 f"Invalid call to non-kernel or non-function ({self.mode}) operator '{self.name}'")
 
+    def on(self, region: tuple[slice, ...] | None) -> Callable:
+        "launch the kernel over the cells in region only, given as slices of the first grid argument"
+        def launch(*args: Any) -> Any:
+            return self(*args, region=region)
+        return launch
+
+    def _region(self, region: tuple[slice, ...] | None, args: tuple) -> Any:
+        if region is None:
+            return None
+
+        grid = next((arg for arg in args if isinstance(arg, XGrid)), None)
+        if grid is None or len(region) > grid.dimension:
+            self.logger.dead(
+                f"Region of kernel '{self.name}' should not exceed the dimension of its first grid argument")
+
+        # leading dimensions are bounded, stencils of other grids are clamped to their own shapes
+        bounds = [len(region)]
+        for s, n in zip(region, grid.shape):
+            start, stop, step = s.indices(n)
+            if step != 1:
+                self.logger.dead(
+                    f"Region of kernel '{self.name}' should be contiguous slices")
+            bounds.extend((start, max(start, stop)))
+        return (c_int32 * len(bounds))(*bounds)
+
     @property
     def ir(self) -> Definition:
         _ir = getattr(self, "_ir", None)
         if _ir is None:
-            parser = Parser(self.func, self.name, self.mode, self.self_type)
-            self._ir = parser.result
+            parser = Parser(self.func, self.name, self.mode,
+                            self.self_type, self.ordering)
+            self._ir = Optimizer(parser.result).result
             self.includes.extend(parser.includes)
         return self._ir
 
+    @property
+    def access(self) -> dict[str, Access]:
+        "time levels addressed in every grid argument"
+        _access = getattr(self, "_access", None)
+        if _access is None:
+            self._access = grid_access(self.ir)
+        return self._access
+
     @property
     def src(self) -> str:
         from xgrid.lang.generator import Generator
@@ -64,9 +171,10 @@ class Operator:
         return self.ir.signature
 
 
-def kernel(*, name: str | None = None, includes: list[str] | None = None, tick: bool = True, macro: list[str] | None = None):
+def kernel(*, name: str | None = None, includes: list[str] | None = None, tick: bool = True, macro: list[str] | None = None, ordering: Literal["jacobi", "redblack"] = "jacobi", threads: int | None = None, schedule: Schedule | None = None, min_parallel_cells: int | None = None):
     def aux(func):
-        return Operator(func, "kernel", name, includes, tick=tick, macro=macro)
+        return Operator(func, "kernel", name, includes, tick=tick, macro=macro, ordering=ordering,
+                        threads=threads, schedule=schedule, min_parallel_cells=min_parallel_cells)
     return aux
 
 
@@ -0,0 +1,444 @@
+from collections import Counter
+from copy import copy
+import math
+import struct
+from typing import Callable
+
+import xgrid.lang.ir.statement as stat
+import xgrid.lang.ir.expression as expr
+from xgrid.lang.ir import Variable
+from xgrid.lang.ir.visitor import IRTransformer
+from xgrid.util.init import get_config
+from xgrid.util.logging import Logger
+from xgrid.util.typing.reference import Pointer
+from xgrid.util.typing.value import Boolean, Floating, Integer
+
+
+def structural_key(ir: expr.Expression) -> tuple:
+    if isinstance(ir, expr.Constant):
+        return ("constant", repr(ir.type), repr(ir.value))
+    elif isinstance(ir, expr.Identifier):
+        return ("identifier", ir.variable.name)
+    elif isinstance(ir, expr.Stencil):
+        return ("stencil", ir.variable.name, ir.time_offset, tuple(ir.space_offset))
+    elif isinstance(ir, expr.Access):
+        return ("access", structural_key(ir.value), ir.attribute)
+    elif isinstance(ir, expr.Binary):
+        return ("binary", ir.operator, repr(ir.type), structural_key(ir.left), structural_key(ir.right))
+    elif isinstance(ir, expr.Unary):
+        return ("unary", ir.operator, repr(ir.type), structural_key(ir.right))
+    elif isinstance(ir, expr.Condition):
+        return ("condition", repr(ir.type), structural_key(ir.condition), structural_key(ir.body), structural_key(ir.orelse))
+    elif isinstance(ir, expr.Cast):
+        return ("cast", repr(ir.type), structural_key(ir.value))
+    elif isinstance(ir, expr.GridInfo):
+        return ("gridinfo", ir.info, ir.variable.name, None if ir.dimension is None else structural_key(ir.dimension))
+    else:
+        # calls (and anything unknown) may have side effects, never share them
+        return ("opaque", id(ir))
+
+
+def subexpressions(ir: expr.Expression) -> list[tuple[str, expr.Expression, bool]]:
+    "direct subexpressions as (field, expression, guarded), guarded ones are conditionally evaluated"
+    if isinstance(ir, expr.Binary):
+        guarded = ir.operator.is_logic()
+        return [("left", ir.left, False), ("right", ir.right, guarded)]
+    elif isinstance(ir, expr.Unary):
+        return [("right", ir.right, False)]
+    elif isinstance(ir, expr.Condition):
+        return [("condition", ir.condition, False), ("body", ir.body, True), ("orelse", ir.orelse, True)]
+    elif isinstance(ir, expr.Cast):
+        return [("value", ir.value, False)]
+    elif isinstance(ir, (expr.Access, expr.Reduction)):
+        return [("value", ir.value, False)]
+    elif isinstance(ir, expr.GridInfo) and ir.dimension is not None:
+        return [("dimension", ir.dimension, False)]
+    elif isinstance(ir, expr.Call):
+        return [(str(i), arg, False) for i, arg in enumerate(ir.arguments)]
+    return []
+
+
+def rebuild(ir: expr.Expression, func: Callable[[expr.Expression, bool], expr.Expression]) -> expr.Expression:
+    "shallow copy the expression with every direct subexpression replaced by func(sub, guarded)"
+    children = subexpressions(ir)
+    if not any(children):
+        return ir
+
+    rebuilt = copy(ir)
+    if isinstance(ir, expr.Call):
+        rebuilt.arguments = [func(sub, guarded)
+                             for _, sub, guarded in children]
+    else:
+        for name, sub, guarded in children:
+            setattr(rebuilt, name, func(sub, guarded))
+    return rebuilt
+
+
+def is_trivial(ir: expr.Expression) -> bool:
+    if isinstance(ir, (expr.Constant, expr.Identifier)):
+        return True
+    elif isinstance(ir, expr.Access):
+        return is_trivial(ir.value)
+    elif isinstance(ir, expr.GridInfo):
+        return ir.dimension is None or is_trivial(ir.dimension)
+    return False
+
+
+def is_invariant(ir: expr.Expression) -> bool:
+    "whether the expression evaluates to the same value in every cell of a stencil loop"
+    if isinstance(ir, (expr.Stencil, expr.Call)):
+        return False
+    return all(is_invariant(sub) for _, sub, _ in subexpressions(ir))
+
+
+def size(ir: expr.Expression) -> int:
+    return 1 + sum(size(sub) for _, sub, _ in subexpressions(ir))
+
+
+def is_stencil_assignment(ir: stat.Statement) -> bool:
+    return isinstance(ir, stat.Assignment) and isinstance(ir.terminal, expr.Stencil) and ir.terminal.context == "store"
+
+
+def has_call(ir: expr.Expression) -> bool:
+    return isinstance(ir, expr.Call) or any(has_call(sub) for _, sub, _ in subexpressions(ir))
+
+
+class Simplification(IRTransformer):
+    """fold constant expressions and rewrite small integral powers into multiplications, with fast math, powers of
+    0.5 become square roots and divisions by cell invariant values in stencils become reciprocal multiplications"""
+
+    def __init__(self, fast_math: bool) -> None:
+        super().__init__()
+        self.fast_math = fast_math
+        self.stencil = False
+
+    def constant(self, ir: expr.Expression, value) -> expr.Expression:
+        "create a constant of the type of ir, or keep ir if value is not representable"
+        t = ir.type
+        if isinstance(t, Boolean):
+            return expr.Constant(ir.location, t, bool(value))
+        elif isinstance(t, Integer):
+            value = int(value)
+            if -(1 << (t.width_bits - 1)) <= value < (1 << (t.width_bits - 1)):
+                return expr.Constant(ir.location, t, value)
+        elif isinstance(t, Floating):
+            value = float(value)
+            if t.width_bits == 32:
+                value = struct.unpack("f", struct.pack("f", value))[0]
+            if math.isfinite(value):
+                return expr.Constant(ir.location, t, value)
+        return ir
+
+    def cast(self, ir: expr.Expression, t) -> expr.Expression:
+        return ir if ir.type == t else expr.Cast(ir.location, t, ir)
+
+    def visit_Assignment(self, ir: stat.Assignment):
+        self.stencil = is_stencil_assignment(ir)
+        self.generic_visit(ir)
+        self.stencil = False
+        return ir
+
+    def visit_Unary(self, ir: expr.Unary):
+        self.generic_visit(ir)
+
+        if isinstance(ir.right, expr.Constant):
+            if ir.operator == expr.UnaryOperator.Neg:
+                return self.constant(ir, -ir.right.value)
+            elif ir.operator == expr.UnaryOperator.Not:
+                return self.constant(ir, not ir.right.value)
+
+        if ir.operator == expr.UnaryOperator.Pos:
+            return ir.right
+        elif ir.operator in (expr.UnaryOperator.Neg, expr.UnaryOperator.Not) and isinstance(ir.right, expr.Unary) and ir.right.operator == ir.operator:
+            return ir.right.right
+        return ir
+
+    def visit_Cast(self, ir: expr.Cast):
+        self.generic_visit(ir)
+
+        if ir.value.type == ir.type:
+            return ir.value
+        if isinstance(ir.value, expr.Constant) and isinstance(ir.type, (Integer, Floating)):
+            return self.constant(ir, math.trunc(ir.value.value) if isinstance(ir.type, Integer) else ir.value.value)
+        return ir
+
+    def visit_Condition(self, ir: expr.Condition):
+        self.generic_visit(ir)
+
+        if isinstance(ir.condition, expr.Constant):
+            return ir.body if ir.condition.value else ir.orelse
+        return ir
+
+    def fold(self, ir: expr.Binary, left, right):
+        op = expr.BinaryOperator
+        integral = isinstance(ir.left.type, Integer)
+
+        if ir.operator == op.Add:
+            return left + right
+        elif ir.operator == op.Sub:
+            return left - right
+        elif ir.operator == op.Mul:
+            return left * right
+        elif ir.operator == op.Div and right != 0:
+            # c division truncates toward zero
+            return abs(left) // abs(right) * (1 if (left < 0) == (right < 0) else -1) if integral else left / right
+        elif ir.operator == op.Mod and right != 0 and integral:
+            return left - right * (abs(left) // abs(right) * (1 if (left < 0) == (right < 0) else -1))
+        elif ir.operator == op.Pow:
+            try:
+                return math.pow(left, right)
+            except (ValueError, OverflowError):
+                return None
+        elif ir.operator == op.Eq:
+            return left == right
+        elif ir.operator == op.Neq:
+            return left != right
+        elif ir.operator == op.Gt:
+            return left > right
+        elif ir.operator == op.Ge:
+            return left >= right
+        elif ir.operator == op.Lt:
+            return left < right
+        elif ir.operator == op.Le:
+            return left <= right
+        elif ir.operator == op.And:
+            return left and right
+        elif ir.operator == op.Or:
+            return left or right
+        return None
+
+    def power(self, ir: expr.Binary, exponent: float) -> expr.Expression:
+        op = expr.BinaryOperator
+        base = self.cast(ir.left, ir.type)
+
+        def multiply(a: expr.Expression, b: expr.Expression):
+            return expr.Binary(ir.location, ir.type, a, b, op.Mul)
+
+        def reciprocal(a: expr.Expression):
+            return expr.Binary(ir.location, ir.type, self.constant(ir, 1.0), a, op.Div)
+
+        if not math.isfinite(exponent):
+            return ir
+        if exponent == 0.5:
+            # square roots differ from pow at -0.0 and -inf
+            return expr.Unary(ir.location, ir.type, base, expr.UnaryOperator.Sqrt) if self.fast_math else ir
+
+        if exponent != int(exponent) or has_call(base):
+            return ir
+        exponent = int(exponent)
+
+        # exactly rounded rewrites are always performed, longer chains round more than once
+        if exponent == 0:
+            return self.constant(ir, 1.0)
+        elif exponent == 1:
+            return base
+        elif exponent == 2:
+            return multiply(base, base)
+        elif exponent == -1:
+            return reciprocal(base)
+        elif self.fast_math and 2 < abs(exponent) <= 4:
+            square = multiply(base, base)
+            chain = multiply(square, base) if abs(exponent) == 3 else multiply(square, square)
+            return chain if exponent > 0 else reciprocal(chain)
+        elif self.fast_math and exponent == -2:
+            return reciprocal(multiply(base, base))
+        return ir
+
+    def visit_Binary(self, ir: expr.Binary):
+        self.generic_visit(ir)
+
+        op = expr.BinaryOperator
+        left, right = ir.left, ir.right
+
+        if isinstance(left, expr.Constant) and isinstance(right, expr.Constant):
+            folded = self.fold(ir, left.value, right.value)
+            if folded is not None:
+                return self.constant(ir, folded)
+
+        if ir.operator == op.Pow and isinstance(right, expr.Constant):
+            return self.power(ir, right.value)
+
+        def is_value(e: expr.Expression, value) -> bool:
+            return isinstance(e, expr.Constant) and not isinstance(e.type, Boolean) and e.value == value
+
+        integral = isinstance(ir.type, Integer)
+        if ir.operator == op.Mul:
+            if is_value(right, 1):
+                return left
+            if is_value(left, 1):
+                return right
+            if integral and (is_value(left, 0) and not has_call(right) or is_value(right, 0) and not has_call(left)):
+                return self.constant(ir, 0)
+        elif ir.operator == op.Add:
+            # x + 0.0 is not x for x = -0.0
+            if integral and is_value(right, 0):
+                return left
+            if integral and is_value(left, 0):
+                return right
+        elif ir.operator == op.Sub and is_value(right, 0):
+            return left
+        elif ir.operator == op.Div and isinstance(ir.type, Floating):
+            if is_value(right, 1):
+                return left
+            if isinstance(right, expr.Constant):
+                mantissa, _ = math.frexp(right.value)
+                inverse = self.constant(right, 1.0 / right.value) if right.value != 0 else right
+                # the reciprocal of a power of two is exact
+                if isinstance(inverse, expr.Constant) and inverse is not right and (abs(mantissa) == 0.5 or self.fast_math):
+                    return expr.Binary(ir.location, ir.type, left, inverse, op.Mul)
+            elif self.fast_math and self.stencil and is_invariant(right) and not is_value(left, 1):
+                inverse = expr.Binary(ir.location, ir.type, self.constant(
+                    right, 1.0), right, op.Div)
+                return expr.Binary(ir.location, ir.type, left, inverse, op.Mul)
+        return ir
+
+
+class CommonSubexpression(IRTransformer):
+    """hoist cell invariant subexpressions of stencil assignments into kernel scope temporaries,
+    and share repeated subexpressions (e.g. stencil loads) within a cell through cell local bindings"""
+
+    def __init__(self, definition: stat.Definition) -> None:
+        super().__init__()
+        self.definition = definition
+        self.temporaries: Counter[str] = Counter()
+
+    def temporary(self, prefix: str, type) -> Variable:
+        name = f"{prefix}{self.temporaries[prefix]}"
+        self.temporaries[prefix] += 1
+        return Variable(name, type)
+
+    def has_side_effect(self, ir: expr.Expression) -> bool:
+        if isinstance(ir, expr.Call) and not isinstance(ir.operator, expr.Constructor):
+            if any(isinstance(t, Pointer) for _, t in ir.operator.signature.arguments):
+                return True
+        return any(self.has_side_effect(sub) for _, sub, _ in subexpressions(ir))
+
+    def visit_Assignment(self, ir: stat.Assignment):
+        if not is_stencil_assignment(ir) or self.has_side_effect(ir.value):
+            return ir
+
+        _, invariants = self.share("$inv", [], self.hoist(ir))
+        for variable, _ in invariants:
+            self.definition.scope[variable.name] = variable
+
+        (ir.value, ), bindings = self.share("$cse", [ir.value], [])
+        setattr(ir, "__cell_bindings", bindings)
+
+        return [stat.Assignment(ir.location, expr.Identifier(ir.location, variable.type, "store", variable), value) for variable, value in invariants] + [ir]
+
+    def hoist(self, ir: stat.Assignment) -> list[tuple[Variable, expr.Expression]]:
+        # maximal invariant subexpressions that are evaluated unconditionally in the cell
+        candidates: set[tuple] = set()
+
+        def collect(e: expr.Expression, guarded: bool):
+            if not guarded and is_invariant(e) and not is_trivial(e):
+                candidates.add(structural_key(e))
+                return
+            for _, sub, sub_guarded in subexpressions(e):
+                collect(sub, guarded or sub_guarded)
+        collect(ir.value, False)
+
+        temporaries: dict[tuple, expr.Identifier] = {}
+        hoisted: list[tuple[Variable, expr.Expression]] = []
+
+        def replace(e: expr.Expression, guarded: bool = False) -> expr.Expression:
+            key = structural_key(e)
+            if key in candidates:
+                if key not in temporaries:
+                    variable = self.temporary("$inv", e.type)
+                    temporaries[key] = expr.Identifier(
+                        ir.location, e.type, "load", variable)
+                    hoisted.append((variable, e))
+                return temporaries[key]
+            return rebuild(e, replace)
+
+        ir.value = replace(ir.value)
+        return hoisted
+
+    def share(self, prefix: str, roots: list[expr.Expression], bindings: list[tuple[Variable, expr.Expression]]):
+        """bind every repeated unconditionally evaluated subexpression of roots and bindings to a temporary,
+        returns the rewritten roots and the bindings in evaluation order"""
+        while True:
+            counts: Counter[tuple] = Counter()
+            nodes: dict[tuple, expr.Expression] = {}
+
+            def count(e: expr.Expression, guarded: bool = False):
+                key = structural_key(e)
+                if not guarded:
+                    counts[key] += 1
+                nodes.setdefault(key, e)
+                for _, sub, sub_guarded in subexpressions(e):
+                    count(sub, guarded or sub_guarded)
+
+            for root in roots:
+                count(root)
+            for _, value in bindings:
+                count(value)
+
+            candidates = [key for key, n in counts.items()
+                          if n >= 2 and not is_trivial(nodes[key])]
+            if not any(candidates):
+                break
+
+            # the largest repeated subexpression first, so its parts are not bound needlessly
+            key = max(candidates, key=lambda k: size(nodes[k]))
+            bound = [v for v, value in bindings if structural_key(value) == key]
+            if any(bound):
+                variable = bound[0]
+            else:
+                variable = self.temporary(prefix, nodes[key].type)
+                bindings.append((variable, nodes[key]))
+            location = nodes[key].location
+            identifier = expr.Identifier(
+                location, nodes[key].type, "load", variable)
+
+            def replace(e: expr.Expression, guarded: bool = False) -> expr.Expression:
+                return identifier if structural_key(e) == key else rebuild(e, replace)
+
+            roots = [replace(root) for root in roots]
+            bindings = [(v, value if v is variable else rebuild(value, replace))
+                        for v, value in bindings]
+
+        # order the bindings by their dependencies
+        defined = {v.name: (v, value) for v, value in bindings}
+        ordered: list[tuple[Variable, expr.Expression]] = []
+        visited: set[str] = set()
+
+        def define(name: str):
+            if name in visited or name not in defined:
+                return
+            visited.add(name)
+
+            def depends(e: expr.Expression):
+                if isinstance(e, expr.Identifier):
+                    define(e.variable.name)
+                for _, sub, _ in subexpressions(e):
+                    depends(sub)
+            depends(defined[name][1])
+            ordered.append(defined[name])
+
+        for v, _ in bindings:
+            define(v.name)
+        return roots, ordered
+
+
+class Optimizer:
+    def __init__(self, definition: stat.Definition) -> None:
+        self.logger = Logger(self)
+        self.definition = definition
+
+        config = get_config()
+
+        passes: list[IRTransformer] = []
+        if config.optimize:
+            passes.append(Simplification(config.fast_math))
+            passes.append(CommonSubexpression(definition))
+
+        for optimization in passes:
+            self.logger.info(
+                f"Perform '{optimization.__class__.__name__}' on '{definition.name}'")
+            optimization.visit(definition)
+
+    @property
+    def result(self):
+        return self.definition
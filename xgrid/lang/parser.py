@@ -6,7 +6,8 @@ from typing import Literal, NoReturn, cast
 from struct import calcsize
 
 from xgrid.lang.ir import Location, Variable
-from xgrid.lang.ir.expression import Access, Binary, BinaryOperator, Call, Cast, Condition, Constant, Constructor, Expression, GridInfo, Identifier, Stencil, Terminal, Unary, UnaryOperator
+from xgrid.lang.ir.visitor import IRVisitor
+from xgrid.lang.ir.expression import Access, Binary, BinaryOperator, Call, Cast, Condition, Constant, Constructor, Expression, GridInfo, Identifier, Reduction, Stencil, Terminal, Unary, UnaryOperator
 from xgrid.lang.ir.statement import Assignment, Definition, Break, Continue, Evaluation, For, If, Inline, Return, Signature, While
 from xgrid.util.init import get_config
 
@@ -52,7 +53,7 @@ def context(ctx: ast.expr_context):
 
 
 class Parser:
-    def __init__(self, func, name: str, mode: str, self_type: BaseType | None) -> None:
+    def __init__(self, func, name: str, mode: str, self_type: BaseType | None, ordering: Literal["jacobi", "redblack"] = "jacobi") -> None:
         self.logger = Logger(self)
         self.mode = mode
         self.func = func
@@ -78,6 +79,7 @@ class Parser:
 
         self.scope: dict[str, Variable] = {}
         self.boundary_mask = 0
+        self.ordering = ordering
         self.args: list[tuple[str, BaseType]] = []
         self.global_scope = func.__globals__
         self.global_scope.update({"int": int, "float": float, "bool": bool})
@@ -158,7 +160,8 @@ class Parser:
 
     # ===== statements =====
     def visit_Return(self, node: ast.Return):
-        return_value = None if node.value is None else self.visit(node.value)
+        return_value = None if node.value is None else self.convert(
+            self.visit(node.value), self.return_type)
         if return_value is not None:
             if return_value.type != self.return_type:
                 self.syntax_error(
@@ -231,6 +234,16 @@ class Parser:
             body = self.visits(node.body)
             self.boundary_mask = 0
             return body
+        elif global_obj == lang.ordering:
+            args = withitem.context_expr.args
+            if len(args) != 1 or not isinstance(args[0], ast.Constant) or args[0].value not in ("jacobi", "redblack"):
+                self.syntax_error(node, f"Invalid pragram switch 'ordering'")
+
+            ordering = self.ordering
+            self.ordering = args[0].value
+            body = self.visits(node.body)
+            self.ordering = ordering
+            return body
         else:
             self.syntax_error(node, f"Unknown pragma switch '{global_obj}'")
 
@@ -256,6 +269,7 @@ class Parser:
             else:
                 self.syntax_error(node, f"Undefined identifier {terminal}")
 
+        value = self.convert(value, terminal.type)
         if terminal.type != value.type:
             self.syntax_error(
                 node, f"Incompatible assignment from type {value.type} to {terminal.type}")
@@ -274,17 +288,20 @@ class Parser:
                 node, f"Unsupported binary operator '{optype.__name__}'")
         binary_op = OperatorMap.binary[optype]
 
-        if not isinstance(target.type, Number) or not isinstance(value.type, Number) or target.type != value.type:
+        left, value = self.match_constants(self.promote(target), value)
+        if not isinstance(left.type, Number) or not isinstance(value.type, Number) or left.type != value.type:
             self.syntax_error(
                 node, f"Incompatible binary operator '{binary_op.value}' with type '{target.type}' and '{value.type}'")
 
         if binary_op == BinaryOperator.Pow:
-            return_type = Floating(64) if isinstance(
-                target.type, Floating) and value.type.width_bits == 64 else Floating(32)
+            return_type = Floating(calcsize("d")) if isinstance(
+                left.type, Floating) and left.type.width_bits == 64 else Floating(get_config().fsize)
         else:
-            return_type = target.type
+            return_type = left.type
 
-        return Assignment(self.location(node), target, Binary(self.location(node), return_type, target, value, binary_op))
+        binary = Binary(self.location(node), return_type,
+                        left, value, binary_op)
+        return Assignment(self.location(node), target, self.convert(binary, target.type))
 
     def visit_For(self, node: ast.For):
         if not isinstance(node.target, ast.Name):
@@ -345,6 +362,30 @@ class Parser:
                 node, f"Incompatible constant '{constant}' of type '{type(constant)}'")
         return Constant(self.location(node), vtype[type(constant)], constant)
 
+    def promote(self, value: Expression) -> Expression:
+        "widen loads of compact floating storage to the compute precision"
+        config = get_config()
+        if config.compute == "precision" and isinstance(value.type, Floating) and value.type.width_bytes < config.fsize:
+            return Cast(value.location, Floating(config.fsize), value)
+        return value
+
+    def convert(self, value: Expression, t: BaseType) -> Expression:
+        "convert floating value to floating type t, constants are retyped instead of casted"
+        if isinstance(value.type, Floating) and isinstance(t, Floating) and value.type != t:
+            if isinstance(value, Constant):
+                return Constant(value.location, t, value.value)
+            return Cast(value.location, t, value)
+        return value
+
+    def match_constants(self, left: Expression, right: Expression) -> tuple[Expression, Expression]:
+        "floating constants take the floating type of the other operand"
+        if isinstance(left.type, Floating) and isinstance(right.type, Floating):
+            if isinstance(left, Constant) and not isinstance(right, Constant):
+                left = self.convert(left, right.type)
+            elif isinstance(right, Constant) and not isinstance(left, Constant):
+                right = self.convert(right, left.type)
+        return left, right
+
     def visit_Constant(self, node: ast.Constant):
         return self.parse_constant(node, node.value)
 
@@ -369,8 +410,8 @@ class Parser:
                 node, f"Unsupported binary operator '{optype.__name__}'")
         binary_op = OperatorMap.binary[optype]
 
-        left = cast(Expression, self.visit(node.left))
-        right = cast(Expression, self.visit(node.right))
+        left, right = self.match_constants(cast(Expression, self.visit(node.left)),
+                                           cast(Expression, self.visit(node.right)))
         if not isinstance(left.type, Number) or not isinstance(right.type, Number) or left.type != right.type:
             self.syntax_error(
                 node, f"Incompatible binary operator '{binary_op.value}' with type '{left.type}' and '{right.type}'")
@@ -400,7 +441,7 @@ class Parser:
             self.syntax_error(
                 node, f"Incompatible compare expression with type '{left.type}'")
 
-        comparators = [cast(Expression, self.visit(i))
+        comparators = [self.match_constants(left, cast(Expression, self.visit(i)))[1]
                        for i in node.comparators]
         ops = [OperatorMap.binary[type(i)] for i in node.ops]
 
@@ -507,7 +548,7 @@ class Parser:
                     self.syntax_error(
                         grid, f"Incompatible subscript length '{len(spaces)}' with dimension {grid_var.type.dimension}")
 
-                return Stencil(location, grid_var.type.element, ctx, grid_var, time_offset, spaces, self.boundary_mask)
+                return Stencil(location, grid_var.type.element, ctx, grid_var, time_offset, spaces, self.boundary_mask, self.ordering)
 
             if isinstance(node.value, ast.Subscript):
                 time_slice = node.slice
@@ -547,14 +588,14 @@ class Parser:
 
     def visit_Name(self, node: ast.Name):
         local = self.resolve_local(node)
-        return self.parse_constant(node, self.resolve_global(node)) if local is None else local
+        return self.parse_constant(node, self.resolve_global(node)) if local is None else self.promote(local)
 
     def visit_Attribute(self, node: ast.Attribute):
         local = self.resolve_local(node)
-        return self.parse_constant(node, self.resolve_global(node)) if local is None else local
+        return self.parse_constant(node, self.resolve_global(node)) if local is None else self.promote(local)
 
     def visit_Subscript(self, node: ast.Subscript):
-        return self.resolve_local(node)
+        return self.promote(cast(Expression, self.resolve_local(node)))
 
     def visit_Call(self, node: ast.Call):
         from xgrid.lang.operator import Operator
@@ -631,6 +672,24 @@ class Parser:
                         node, f"Incompatible '{func.name}' to argument '{args[0]}'")
 
                 return GridInfo(self.location(node), Integer(calcsize("i")), cast(Literal["shape", "dimension"], func.name), args[0].variable, args[1] if func.name == "shape" else None)
+
+            if func.name in ("sum", "max", "min", "norm"):
+                stencils: list[Stencil] = []
+                nested: list[Reduction] = []
+
+                class ReductionParser(IRVisitor):
+                    def visit_Stencil(self, ir: Stencil):
+                        stencils.append(ir)
+
+                    def visit_Reduction(self, ir: Reduction):
+                        nested.append(ir)
+
+                ReductionParser().visit(args[0])
+                if not any(stencils) or any(nested):
+                    self.syntax_error(
+                        node, f"Reduction '{func.name}' requires a grid expression without nested reduction")
+
+                return Reduction(self.location(node), return_type, cast(Literal["sum", "max", "min", "norm"], func.name), args[0], stencils[0].variable, self.boundary_mask)
         else:
             for id, (arg_name, arg_type) in enumerate(func.signature.arguments):
                 if arg_type != args[id].type:
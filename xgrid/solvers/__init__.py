@@ -0,0 +1,5 @@
+from xgrid.solvers.krylov import bicgstab, cg
+from xgrid.solvers.multigrid import poisson_mg
+from xgrid.solvers.tridiagonal import tridiag
+
+__all__ = ["poisson_mg", "cg", "bicgstab", "tridiag"]
@@ -0,0 +1,176 @@
+from typing import Any
+
+import xgrid
+import xgrid.lang.ir.expression as expr
+from xgrid.lang.ir.visitor import IRVisitor
+from xgrid.lang.operator import Operator
+from xgrid.util.init import get_config
+from xgrid.util.typing.reference import Grid as GridType
+from xgrid.util.typing.value import Floating
+from xgrid.xgrid import Grid
+
+
+# vector operations are pointwise, they run on one dimensional views of the grids whatever their dimension,
+# over the cells labelled 0 of x, the unknowns of the system
+vector = xgrid.grid[float, 1]  # type: ignore
+
+
+@xgrid.kernel(tick=False)
+def krylov_dot(a: vector, b: vector) -> float:
+    return xgrid.sum(a[0][0] * b[0][0])
+
+
+# r = b - q, p = r and returns r . r
+@xgrid.kernel(tick=False)
+def krylov_residual(r: vector, p: vector, b: vector, q: vector) -> float:
+    r[0] = b[0][0] - q[0][0]
+    p[0] = r[0][0]
+    return xgrid.sum(r[0][0] * r[0][0])
+
+
+# x += alpha * p, r -= alpha * q and returns r . r
+@xgrid.kernel(tick=False)
+def krylov_update(x: vector, r: vector, p: vector, q: vector, alpha: float) -> float:
+    x[0] = x[0][0] + alpha * p[0][0]
+    r[0] = r[0][0] - alpha * q[0][0]
+    return xgrid.sum(r[0][0] * r[0][0])
+
+
+# p = r + beta * (p - omega * v)
+@xgrid.kernel(tick=False)
+def krylov_direction(p: vector, r: vector, v: vector, beta: float, omega: float) -> None:
+    p[0] = r[0][0] + beta * (p[0][0] - omega * v[0][0])
+
+
+# s = r - alpha * v and returns s . s
+@xgrid.kernel(tick=False)
+def krylov_stabilize(s: vector, r: vector, v: vector, alpha: float) -> float:
+    s[0] = r[0][0] - alpha * v[0][0]
+    return xgrid.sum(s[0][0] * s[0][0])
+
+
+# x += alpha * p + omega * s, r = s - omega * t and returns r . r
+@xgrid.kernel(tick=False)
+def krylov_combine(x: vector, r: vector, p: vector, s: vector, t: vector, alpha: float, omega: float) -> float:
+    x[0] = x[0][0] + alpha * p[0][0] + omega * s[0][0]
+    r[0] = s[0][0] - omega * t[0][0]
+    return xgrid.sum(r[0][0] * r[0][0])
+
+
+class OperatorChecker(IRVisitor):
+    "apply_A(out, input) must only load its input at the current time level"
+
+    def __init__(self, operator: Operator) -> None:
+        super().__init__()
+        self.operator = operator
+
+        if operator.mode != "kernel" or operator.tick:
+            operator.logger.dead(
+                f"Operator '{operator.name}' should be a kernel with tick=False")
+
+        arguments = operator.signature.arguments
+        if len(arguments) < 2 or not isinstance(arguments[0][1], GridType) or arguments[0][1] != arguments[1][1]:
+            operator.logger.dead(
+                f"Operator '{operator.name}' should take output and input grids of the same type first")
+        self.input = arguments[1][0]
+
+        self.visit(operator.ir)
+
+    def visit_Stencil(self, ir: expr.Stencil):
+        if ir.variable.name != self.input:
+            return
+        if ir.context == "store" or ir.time_offset != 0:
+            self.operator.logger.dead(
+                f"Operator '{self.operator.name}' should only load '{self.input}' at time level 0, got {ir}")
+
+
+# work vectors cached per shape and reused across solves
+workspaces: dict[tuple[str, tuple[int, ...]], list[Grid]] = {}
+
+
+def workspace(method: str, x: Grid, count: int) -> list[Grid]:
+    key = (method, x.shape)
+    if key not in workspaces:
+        workspaces[key] = [Grid(x.shape, float) for _ in range(count)]
+    vectors = workspaces[key]
+    # work vectors share the labels of x, apply_A reads their labelled cells as neighbours, which may hold
+    # directions of an earlier solve on other unknowns
+    for vector in vectors:
+        vector.boundary = x.boundary if x.masked else None
+        if x.masked:
+            vector.now[vector.boundary != 0] = 0.0
+    return vectors
+
+
+def flat(grid: Grid, x: Grid) -> Grid:
+    "one dimensional grid sharing the current level of the grid and the labels of x"
+    view = Grid.from_numpy(grid.now.reshape(-1), float, copy=False)
+    if x.masked:
+        view.boundary = x.boundary.reshape(-1)
+    return view
+
+
+def prepare(apply_A: Operator, x: Grid, b: Grid):
+    OperatorChecker(apply_A)
+    if x.shape != b.shape or x.layout != "aos" or b.layout != "aos" \
+            or x.element != Floating(get_config().fsize) or b.element != x.element:
+        x.logger.dead(
+            "Krylov solvers require contiguous float grids of the same shape")
+
+
+def cg(apply_A: Operator, x: Grid, b: Grid, *args: Any, tol: float = 1e-8, max_iterations: int = 1000) -> int:
+    "solve A(x) = b on the cells labelled 0 of x for symmetric positive definite A, returns the iterations"
+    prepare(apply_A, x, b)
+    r, p, q = workspace("cg", x, 3)
+    x_, b_, r_, p_, q_ = [flat(grid, x) for grid in (x, b, r, p, q)]
+
+    apply_A(q, x, *args)
+    rr = krylov_residual(r_, p_, b_, q_)
+    bound = tol * tol * max(krylov_dot(b_, b_), 1e-300)
+
+    iterations = 0
+    while rr > bound and iterations < max_iterations:
+        apply_A(q, p, *args)
+        alpha = rr / krylov_dot(p_, q_)
+        rr_next = krylov_update(x_, r_, p_, q_, alpha)
+        iterations += 1
+        if rr_next <= bound:
+            break
+        krylov_direction(p_, r_, q_, rr_next / rr, 0.0)
+        rr = rr_next
+    return iterations
+
+
+def bicgstab(apply_A: Operator, x: Grid, b: Grid, *args: Any, tol: float = 1e-8, max_iterations: int = 1000) -> int:
+    "solve A(x) = b on the cells labelled 0 of x for general A, returns the iterations"
+    prepare(apply_A, x, b)
+    r, shadow, p, v, s, t = workspace("bicgstab", x, 6)
+    x_, b_, r_, shadow_, p_, v_, s_, t_ = [flat(grid, x) for grid in (x, b, r, shadow, p, v, s, t)]
+
+    apply_A(v, x, *args)
+    rr = krylov_residual(r_, shadow_, b_, v_)
+    bound = tol * tol * max(krylov_dot(b_, b_), 1e-300)
+    p.now[...] = 0.0
+    v.now[...] = 0.0
+
+    rho, alpha, omega = 1.0, 1.0, 1.0
+    iterations = 0
+    while rr > bound and iterations < max_iterations:
+        rho_next = krylov_dot(shadow_, r_)
+        if rho_next == 0.0 or omega == 0.0:
+            break
+        krylov_direction(p_, r_, v_, rho_next / rho * alpha / omega, omega)
+        apply_A(v, p, *args)
+        alpha = rho_next / krylov_dot(shadow_, v_)
+
+        iterations += 1
+        if krylov_stabilize(s_, r_, v_, alpha) <= bound:
+            krylov_update(x_, s_, p_, v_, alpha)
+            break
+
+        apply_A(t, s, *args)
+        tt = krylov_dot(t_, t_)
+        omega = krylov_dot(t_, s_) / tt if tt > 0.0 else 0.0
+        rr = krylov_combine(x_, r_, p_, s_, t_, alpha, omega)
+        rho = rho_next
+    return iterations
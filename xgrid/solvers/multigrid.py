@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+import xgrid
+from xgrid.xgrid import Grid
+
+
+float2d = xgrid.grid[float, 2]  # type: ignore
+
+# boundary labels of the solver levels, neumann labels copy the neighbour at the given offset
+INTERIOR, DIRICHLET = 0, 1
+NEUMANN = {(1, 0): 2, (-1, 0): 3, (0, 1): 4, (0, -1): 5}
+
+
+@xgrid.kernel(tick=False)
+def mg_smooth(x: float2d, f: float2d, h0: float, h1: float, sweeps: int) -> None:
+    for _ in range(0, sweeps):
+        with xgrid.ordering("redblack"):
+            x[0, 0] = ((x[1, 0][0] + x[-1, 0][0]) * h1 * h1 +
+                       (x[0, 1][0] + x[0, -1][0]) * h0 * h0 -
+                       h0 * h0 * h1 * h1 * f[0, 0][0]) / (2.0 * (h0 * h0 + h1 * h1))
+
+        with xgrid.boundary(2):
+            x[0, 0] = x[1, 0][0]
+        with xgrid.boundary(3):
+            x[0, 0] = x[-1, 0][0]
+        with xgrid.boundary(4):
+            x[0, 0] = x[0, 1][0]
+        with xgrid.boundary(5):
+            x[0, 0] = x[0, -1][0]
+
+
+@xgrid.kernel(tick=False)
+def mg_residual(r: float2d, x: float2d, f: float2d, h0: float, h1: float) -> float:
+    r[0, 0] = f[0, 0][0] - ((x[1, 0][0] - 2.0 * x[0, 0][0] + x[-1, 0][0]) / (h0 * h0) +
+                            (x[0, 1][0] - 2.0 * x[0, 0][0] + x[0, -1][0]) / (h1 * h1))
+    return xgrid.norm(r[0, 0][0])
+
+
+@xgrid.kernel(tick=False)
+def mg_restrict(r: float2d, f: float2d, x: float2d) -> None:
+    # transpose of the linear interpolation, coarse levels share the end cells of the fine level
+    with xgrid.c():
+        """
+        int32_t $offsets[6][2] = {{0, 0}, {0, 0}, {1, 0}, {-1, 0}, {0, 1}, {0, -1}};
+        double $ratio0 = (double) (r.shape[0] - 1) / (f.shape[0] - 1), $ratio1 = (double) (r.shape[1] - 1) / (f.shape[1] - 1);
+        #pragma omp parallel for
+        for (int32_t i = 0; i < f.shape[0]; i++) {
+            for (int32_t j = 0; j < f.shape[1]; j++) {
+                int32_t id = i * f.shape[1] + j;
+                double value = 0;
+                for (int32_t fi = (int32_t) ceil((i - 1) * $ratio0); fi <= (int32_t) floor((i + 1) * $ratio0); fi++) {
+                    for (int32_t fj = (int32_t) ceil((j - 1) * $ratio1); fj <= (int32_t) floor((j + 1) * $ratio1); fj++) {
+                        if (fi >= 0 && fi < r.shape[0] && fj >= 0 && fj < r.shape[1]) {
+                            value += r.data[0][fi * r.shape[1] + fj] * (1 - fabs(fi / $ratio0 - i)) * (1 - fabs(fj / $ratio1 - j));
+                        }
+                    }
+                }
+                x.data[0][id] = 0;
+                f.data[0][id] = value / ($ratio0 * $ratio1);
+            }
+        }
+        // residuals restricted onto neumann cells belong to the cells they copy
+        for (int32_t i = 0; i < f.shape[0]; i++) {
+            for (int32_t j = 0; j < f.shape[1]; j++) {
+                int32_t id = i * f.shape[1] + j, label = f.boundary_mask[id];
+                if (label >= 2) {
+                    int32_t target = (i + $offsets[label][0]) * f.shape[1] + j + $offsets[label][1];
+                    if (f.boundary_mask[target] == 0) {
+                        f.data[0][target] += f.data[0][id];
+                    }
+                }
+                if (label != 0) {
+                    f.data[0][id] = 0;
+                }
+            }
+        }
+        """
+
+
+@xgrid.kernel(tick=False)
+def mg_prolong(x: float2d, coarse: float2d) -> None:
+    with xgrid.c():
+        """
+        double $ratio0 = (double) (coarse.shape[0] - 1) / (x.shape[0] - 1), $ratio1 = (double) (coarse.shape[1] - 1) / (x.shape[1] - 1);
+        #pragma omp parallel for
+        for (int32_t i = 0; i < x.shape[0]; i++) {
+            for (int32_t j = 0; j < x.shape[1]; j++) {
+                int32_t id = i * x.shape[1] + j;
+                if (x.boundary_mask[id] == 1) {
+                    continue;
+                }
+                double s0 = i * $ratio0, s1 = j * $ratio1;
+                int32_t i0 = (int32_t) s0, j0 = (int32_t) s1;
+                int32_t i1 = i0 + 1 < coarse.shape[0] ? i0 + 1 : i0, j1 = j0 + 1 < coarse.shape[1] ? j0 + 1 : j0;
+                double t0 = s0 - i0, t1 = s1 - j0;
+                int32_t n = coarse.shape[1];
+                x.data[0][id] += (1 - t0) * ((1 - t1) * coarse.data[0][i0 * n + j0] + t1 * coarse.data[0][i0 * n + j1]) +
+                                 t0 * ((1 - t1) * coarse.data[0][i1 * n + j0] + t1 * coarse.data[0][i1 * n + j1]);
+            }
+        }
+        """
+
+
+@dataclass
+class Level:
+    x: Grid
+    f: Grid
+    r: Grid
+    spacing: tuple[float, float]
+
+
+# grid hierarchies cached per fine grid shape
+hierarchies: dict[tuple[int, ...], list[Level]] = {}
+
+
+def hierarchy(shape: tuple[int, ...]) -> list[Level]:
+    if shape not in hierarchies:
+        levels = []
+        coarse = shape
+        while True:
+            levels.append(Level(Grid(coarse, float), Grid(
+                coarse, float), Grid(coarse, float), (1.0, 1.0)))
+            if min(coarse) <= 5:
+                break
+            # coarse cells are evenly spaced between the end cells of the fine level
+            coarse = tuple((n - 1) // 2 + 1 for n in coarse)
+        hierarchies[shape] = levels
+    return hierarchies[shape]
+
+
+def poisson_mg(p: Grid, rhs: Grid, boundary: dict[int, float | tuple[int, int]] | None = None,
+               spacing: tuple[float, float] = (1.0, 1.0), tol: float = 1e-8, max_cycles: int = 50,
+               cycle: Literal["V", "W"] = "W", sweeps: int = 2) -> int:
+    """
+    solve laplace(p) = rhs on the cells labelled 0, boundary maps other labels to a dirichlet value
+    or to the neighbour offset copied by a neumann condition, unmapped labels keep their values
+    """
+    if p.dimension != 2 or p.shape != rhs.shape:
+        p.logger.dead(
+            "Multigrid solver requires two dimensional grids of the same shape")
+    boundary = {} if boundary is None else boundary
+
+    levels = hierarchy(p.shape)
+
+    # translate the labels of p to the labels of the solver, coarse labels are taken from the nearest fine cells
+    labels = np.where(p.boundary == 0, INTERIOR, DIRICHLET)
+    fine = levels[0]
+    fine.x.now[:] = p.now
+    for label, condition in boundary.items():
+        cells = p.boundary == label
+        if isinstance(condition, tuple):
+            if condition not in NEUMANN:
+                p.logger.dead(
+                    f"Unsupported neumann offset {condition} of boundary label {label}")
+            labels[cells] = NEUMANN[condition]
+        else:
+            fine.x.now[cells] = condition
+    fine.f.now[:] = rhs.now
+
+    h = spacing
+    for level in levels:
+        if level is not fine:
+            shape = level.x.shape
+            ratios = [(m - 1) / (n - 1) for n, m in zip(shape, labels.shape)]
+            labels = labels[np.ix_(*(np.rint(np.arange(n) * ratio).astype(int)
+                                     for n, ratio in zip(shape, ratios)))]
+            h = (h[0] * ratios[0], h[1] * ratios[1])
+        level.spacing = h
+        level.x.boundary = labels
+        level.f.boundary = level.r.boundary = level.x.boundary
+
+    def solve(depth: int):
+        level = levels[depth]
+        h0, h1 = level.spacing
+        if depth == len(levels) - 1:
+            mg_smooth(level.x, level.f, h0, h1, 50)
+            return
+
+        mg_smooth(level.x, level.f, h0, h1, sweeps)
+        mg_residual(level.r, level.x, level.f, h0, h1)
+        coarse = levels[depth + 1]
+        mg_restrict(level.r, coarse.f, coarse.x)
+        for _ in range(2 if cycle == "W" else 1):
+            solve(depth + 1)
+        mg_prolong(level.x, coarse.x)
+        mg_smooth(level.x, level.f, h0, h1, sweeps)
+
+    initial = mg_residual(fine.r, fine.x, fine.f, *spacing)
+    cycles = 0
+    norm = initial
+    while cycles < max_cycles and norm > tol * max(initial, 1e-300):
+        solve(0)
+        norm = mg_residual(fine.r, fine.x, fine.f, *spacing)
+        cycles += 1
+
+    p.now[:] = fine.x.now
+    return cycles
@@ -0,0 +1,89 @@
+import xgrid
+from xgrid.lang.operator import Operator
+from xgrid.util.init import get_config
+from xgrid.util.typing.value import Floating
+from xgrid.xgrid import Grid
+
+
+# lines are swept in batches of cells adjacent in memory, a batch of one when the axis has unit stride
+BATCH = 64
+
+kernels: dict[int, Operator] = {}
+
+
+def line_kernel(dimension: int) -> Operator:
+    if dimension in kernels:
+        return kernels[dimension]
+
+    line = xgrid.grid[float, dimension]  # type: ignore
+
+    @xgrid.kernel(tick=False, macro=[f"size_t $batch_size = {BATCH};"])
+    def thomas(x: line, a: line, b: line, c: line, d: line, axis: int) -> None:
+        with xgrid.c():
+            """
+            size_t $outer = 1, $inner = 1, $n = x.shape[axis];
+            for (int32_t $i = 0; $i < (int32_t) (sizeof(x.shape) / sizeof(x.shape[0])); $i++) {
+                if ($i < axis) {
+                    $outer *= x.shape[$i];
+                } else if ($i > axis) {
+                    $inner *= x.shape[$i];
+                }
+            }
+            size_t $batch = $inner < $batch_size ? $inner : $batch_size;
+            size_t $blocks = ($inner + $batch - 1) / $batch;
+            #pragma omp parallel
+            {
+                double* $factors = malloc(sizeof(double) * $n * $batch);
+                #pragma omp for collapse(2)
+                for (size_t $o = 0; $o < $outer; $o++) {
+                    for (size_t $block = 0; $block < $blocks; $block++) {
+                        size_t $first = $block * $batch;
+                        size_t $width = $inner - $first < $batch ? $inner - $first : $batch;
+                        size_t $base = $o * $n * $inner + $first;
+                        // forward elimination, x holds the modified right hand side
+                        for (size_t $k = 0; $k < $width; $k++) {
+                            size_t $id = $base + $k;
+                            double $pivot = b.data[0][$id];
+                            $factors[$k] = c.data[0][$id] / $pivot;
+                            x.data[0][$id] = d.data[0][$id] / $pivot;
+                        }
+                        for (size_t $i = 1; $i < $n; $i++) {
+                            for (size_t $k = 0; $k < $width; $k++) {
+                                size_t $id = $base + $i * $inner + $k;
+                                double $pivot = b.data[0][$id] - a.data[0][$id] * $factors[($i - 1) * $batch + $k];
+                                $factors[$i * $batch + $k] = c.data[0][$id] / $pivot;
+                                x.data[0][$id] = (d.data[0][$id] - a.data[0][$id] * x.data[0][$id - $inner]) / $pivot;
+                            }
+                        }
+                        // back substitution
+                        for (size_t $i = $n - 1; $i-- > 0;) {
+                            for (size_t $k = 0; $k < $width; $k++) {
+                                size_t $id = $base + $i * $inner + $k;
+                                x.data[0][$id] -= $factors[$i * $batch + $k] * x.data[0][$id + $inner];
+                            }
+                        }
+                    }
+                }
+                free($factors);
+            }
+            """
+
+    kernels[dimension] = thomas
+    return thomas
+
+
+def tridiag(x: Grid, axis: int, a: Grid, b: Grid, c: Grid, rhs: Grid) -> None:
+    """
+    solve a * x[i - 1] + b * x[i] + c * x[i + 1] = rhs along every line of the axis with the thomas algorithm,
+    a at the first and c at the last cell of a line are ignored, rhs may be x itself
+    """
+    grids = [x, a, b, c, rhs]
+    if any(grid.shape != x.shape or grid.layout != "aos" or grid.element != Floating(get_config().fsize)
+           for grid in grids):
+        x.logger.dead(
+            "Tridiagonal solver requires contiguous float grids of the same shape")
+    if not 0 <= axis < x.dimension:
+        x.logger.dead(
+            f"Invalid axis {axis} of {x.dimension} dimensional grid")
+
+    line_kernel(x.dimension)(x, a, b, c, rhs, axis)
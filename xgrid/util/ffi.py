@@ -32,12 +32,19 @@ class Library:
                 raise TypeError(
                     f"this function takes {len(argtypes)} argument ({len(args)} given)")
             return restype.deserialize(handler(*map(lambda x: x[0](x[1]), zip(map(lambda x: x.serialize, argtypes), args))))
+        # native interface for callers serializing the arguments themselves
+        wrapper.handler = handler  # type: ignore
+        wrapper.argtypes = argtypes  # type: ignore
+        wrapper.restype = restype  # type: ignore
         return wrapper
 
 
 class Compiler:
     "compiler driver to perform compiling and linking to dynamic library"
 
+    # sources probed by supports, by compiler and flags
+    probes: dict[tuple[str, str, tuple[str, ...]], bool] = {}
+
     def __init__(self, *, cacheroot: str, cc: Iterable[str]) -> None:
         self.logger = Logger(self)
 
@@ -56,6 +63,16 @@ class Compiler:
         self.logger.info(
             f"compiler initialized with cacheroot = '{self.cacheroot}', cc = '{self.cc}'")
 
+    def supports(self, source: str, cflags: Iterable[str] = []) -> bool:
+        "whether the compiler accepts the source, each source is probed once"
+        key = (self.cc, source, tuple(cflags))
+        if key not in Compiler.probes:
+            process = Popen([self.cc, "-x", "c", "-fsyntax-only", *cflags, "-"],
+                            stdin=PIPE, stdout=PIPE, stderr=PIPE)
+            process.communicate(source.encode())
+            Compiler.probes[key] = process.returncode == 0
+        return Compiler.probes[key]
+
     def compile(self, source: str, cflags: Iterable[str] = []):
         args = [self.cc, "-shared"]
 
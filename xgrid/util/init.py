@@ -1,12 +1,18 @@
 from dataclasses import asdict, dataclass
+import os
 import sys
-from typing import Literal
+from typing import Literal, get_args
 from xgrid.util.logging import Logger
 
 
 logger = Logger("xgrid")
 
 
+Schedule = Literal["static", "dynamic", "guided"]
+# integer type of the boundary labels of grids, labels above 255 need the wider one
+Mask = Literal["uint8", "int32"]
+
+
 @dataclass
 class Configuration:
     parallel: bool
@@ -16,6 +22,13 @@ class Configuration:
     overstep: Literal["none", "limit", "wrap"]
     opt_level: Literal[0, 1, 2, 3]
     precision: Literal["float", "double"]
+    optimize: bool
+    fast_math: bool
+    compute: Literal["precision", "storage"]
+    threads: int | None
+    schedule: Schedule
+    min_parallel_cells: int
+    mask: Mask
 
     def __repr__(self) -> str:
         return repr(asdict(self))
@@ -45,7 +58,7 @@ def get_config() -> Configuration:
     return _config
 
 
-def init(*, parallel: bool = True, cc: list[str] = ["gcc", "clang"], cacheroot: str = ".xgrid", comment: bool = False, overstep: Literal["none", "limit", "wrap"] = "none", opt_level: Literal[0, 1, 2, 3] = 2, precision: Literal["float", "double"] = "float") -> None:
+def init(*, parallel: bool = True, cc: list[str] = ["gcc", "clang"], cacheroot: str = ".xgrid", comment: bool = False, overstep: Literal["none", "limit", "wrap"] = "none", opt_level: Literal[0, 1, 2, 3] = 2, precision: Literal["float", "double"] = "float", optimize: bool = True, fast_math: bool = False, compute: Literal["precision", "storage"] = "precision", threads: int | None = None, schedule: Schedule = "static", min_parallel_cells: int = 4096, mask: Mask = "uint8", affinity: Literal["close", "spread", "master"] | None = None, places: str | None = None) -> None:
     global _config
 
     if sys.version_info < (3, 10):
@@ -60,7 +73,19 @@ def init(*, parallel: bool = True, cc: list[str] = ["gcc", "clang"], cacheroot:
             logger.fail(
                 f"Failed to find cc within {cc}, possible solutions are:", *solutions)
 
+    if threads is not None and threads < 1:
+        logger.dead(f"Kernels should run on at least one thread instead of {threads}")
+    if mask not in get_args(Mask):
+        logger.dead(f"Unknown boundary mask type '{mask}'")
+
+    # thread pinning is read by the openmp runtime when the first kernel is loaded
+    if affinity is not None:
+        os.environ["OMP_PROC_BIND"] = affinity
+    if places is not None:
+        os.environ["OMP_PLACES"] = places
+
     _config = Configuration(parallel, cc, cacheroot,
-                            comment, overstep, opt_level, precision)
+                            comment, overstep, opt_level, precision, optimize, fast_math, compute,
+                            threads, schedule, min_parallel_cells, mask)
 
     logger.info(f"initialized with configuration: {_config}")
@@ -0,0 +1,94 @@
+import ctypes
+from threading import Lock
+
+import numpy as np
+from xgrid.util.ffi import Compiler
+from xgrid.util.init import get_config
+
+
+# arrays smaller than a few pages are not worth a parallel region
+THRESHOLD = 1 << 16
+
+
+SOURCE = """
+#include <stddef.h>
+#include <string.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+// cells of the calling thread under a static schedule without chunk size, the schedule of the stencil loops
+static void xgrid_block(size_t cells, size_t* first, size_t* last) {
+#ifdef _OPENMP
+    size_t threads = omp_get_num_threads(), thread = omp_get_thread_num();
+#else
+    size_t threads = 1, thread = 0;
+#endif
+    size_t count = cells / threads, rest = cells % threads;
+    if (thread < rest) {
+        count++;
+        *first = thread * count;
+    } else {
+        *first = thread * count + rest;
+    }
+    *last = *first + count;
+}
+
+void xgrid_touch(char* data, size_t cells, size_t size, int threads) {
+    #pragma omp parallel num_threads(threads > 0 ? threads : omp_get_max_threads())
+    {
+        size_t first, last;
+        xgrid_block(cells, &first, &last);
+        memset(data + first * size, 0, (last - first) * size);
+    }
+}
+
+void xgrid_copy(char* target, const char* source, size_t cells, size_t size, int threads) {
+    #pragma omp parallel num_threads(threads > 0 ? threads : omp_get_max_threads())
+    {
+        size_t first, last;
+        xgrid_block(cells, &first, &last);
+        memcpy(target + first * size, source + first * size, (last - first) * size);
+    }
+}
+"""
+
+_library: ctypes.CDLL | None = None
+_loading = Lock()
+
+
+def runtime() -> ctypes.CDLL:
+    "memory routines compiled with the flags of the kernels, so that they share the thread team"
+    global _library
+    with _loading:
+        if _library is None:
+            config = get_config()
+            library = ctypes.cdll.LoadLibrary(Compiler(
+                cacheroot=config.cacheroot, cc=config.cc).compile(SOURCE, config.cflags))
+            library.xgrid_touch.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_size_t, ctypes.c_int]
+            library.xgrid_copy.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_size_t, ctypes.c_int]
+            _library = library
+    return _library
+
+
+def first_touch(array: np.ndarray, cells: int | None = None) -> np.ndarray:
+    """
+    zero a contiguous array from the threads that sweep its cells in the stencil loops,
+    so that its pages are placed on their numa nodes
+    """
+    cells = array.size if cells is None else cells
+    if array.nbytes < THRESHOLD or cells == 0:
+        array.view(np.uint8).fill(0)
+    else:
+        runtime().xgrid_touch(array.ctypes.data, cells, array.nbytes // cells, get_config().threads or 0)
+    return array
+
+
+def parallel_copy(target: np.ndarray, source: np.ndarray):
+    "copy an array into a contiguous array of the same shape cell range by cell range as the stencil loops"
+    if target.nbytes < THRESHOLD or source.dtype != target.dtype or \
+            not source.flags.c_contiguous or not target.flags.c_contiguous:
+        target[...] = source
+    else:
+        runtime().xgrid_copy(target.ctypes.data, source.ctypes.data, target.size, target.itemsize,
+                             get_config().threads or 0)
@@ -28,6 +28,18 @@ class grid(Annotation, Generic[Value, Length]):
     def __setitem__(self, key, value) -> Any: ...
 
 
+class f16(Annotation):
+    ...
+
+
+class f32(Annotation):
+    ...
+
+
+class f64(Annotation):
+    ...
+
+
 def parse_annotation(annotation, glbs=globals()) -> BaseType | None:
     if annotation is None:
         return Void()
@@ -38,6 +50,9 @@ def parse_annotation(annotation, glbs=globals()) -> BaseType | None:
     if annotation is Any:
         return Ignore()
 
+    if annotation in (f16, f32, f64):
+        return val.Floating({f16: 2, f32: 4, f64: 8}[annotation])
+
     if annotation in (int, float, bool):
         return {int: val.Integer(struct.calcsize("i")), float: val.Floating(get_config().fsize), bool: val.Boolean()}[annotation]
 
@@ -45,7 +60,8 @@ def parse_annotation(annotation, glbs=globals()) -> BaseType | None:
         elements = []
         for field in fields(annotation):
             t = parse_annotation(field.type)
-            if not isinstance(t, val.Value):
+            # half precision has no ctypes layout to be shared with C
+            if not isinstance(t, val.Value) or t == val.Floating(2):
                 return None
             elements.append((field.name, t))
         return val.Structure(annotation, annotation.__name__, tuple(elements))
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Literal
 import ctypes
 
 from xgrid.util.typing import BaseType
@@ -31,20 +32,64 @@ class Pointer(Reference):
         return f"Pointer of {repr(self.element)}"
 
 
+@dataclass
+class Region(Reference):
+    "bounds of the cells visited by the stencil loops of a kernel launch, passed after the arguments"
+
+    @property
+    def ctype(self):
+        return ctypes.POINTER(ctypes.c_int32)
+
+    def serialize(self, value):
+        # every cell is visited without bounds
+        return value
+
+    def deserialize(self, value):
+        assert False, "Region should not be deserialized"
+
+    def __repr__(self) -> str:
+        return "Region"
+
+
 @dataclass
 class Grid(Reference):
     element: Value
     dimension: int
+    # storage layout of the elements, a kernel is specialized for it at runtime
+    layout: Literal["aos", "soa", "strided", "sparse"] = field(default="aos", compare=False)
+    # distance in bytes between consecutive elements of strided grids
+    stride: int = field(default=0, compare=False)
+    # edge length of the tiles of sparse grids
+    tile: int = field(default=0, compare=False)
 
     def __post_init__(self):
         # this should be changed according with type definition of structure
-        self._ctype = type(f"__Grid{self.dimension}d_{self.element.abbr}", (ctypes.Structure,), {
-            "_fields_": [("time", ctypes.c_int32),
-                         ("shape", ctypes.c_int32 * self.dimension),
-                         ("data", ctypes.POINTER(ctypes.POINTER(self.element.ctype))),
-                         ("boundary_mask", ctypes.POINTER(ctypes.c_int32))]
+        suffix = self.suffix
+        fields = [("time", ctypes.c_int32),
+                  ("shape", ctypes.c_int32 * self.dimension),
+                  ("data", ctypes.POINTER(self.level_ctype)),
+                  # labels are of the mask type of the configuration, null for grids without a mask
+                  ("boundary_mask", ctypes.c_void_p)]
+        if self.layout == "sparse":
+            # tile slots of the tile grid, first cells of the slots and the slots swept by stencils
+            fields += [("table", ctypes.POINTER(ctypes.c_int32)),
+                       ("origins", ctypes.POINTER(ctypes.c_int32)),
+                       ("active", ctypes.POINTER(ctypes.c_int32)),
+                       ("active_count", ctypes.c_int32),
+                       ("tile_count", ctypes.c_int32)]
+        self._ctype = type(f"__Grid{self.dimension}d_{self.element.abbr}{suffix}", (ctypes.Structure,), {
+            "_fields_": fields
         })
 
+    @property
+    def suffix(self) -> str:
+        return {"aos": "", "soa": "_soa", "strided": f"_s{self.stride}", "sparse": f"_t{self.tile}"}[self.layout]
+
+    @property
+    def level_ctype(self):
+        # structure of arrays, strided and sparse levels are addressed bytewise
+        return ctypes.POINTER(self.element.ctype if self.layout == "aos" else ctypes.c_char)
+
     @property
     def ctype(self):
         return self._ctype
@@ -62,4 +107,5 @@ class Grid(Reference):
         assert False, "Grid should not be deserialized"
 
     def __repr__(self) -> str:
-        return f"Grid({self.dimension}) of {repr(self.element)}"
+        suffix = f" ({self.layout})" if self.layout != "aos" else ""
+        return f"Grid({self.dimension}) of {repr(self.element)}{suffix}"
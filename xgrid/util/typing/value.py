@@ -65,8 +65,9 @@ class Floating(Number):
     __concrete_typing__ = True
 
     def __post_init__(self):
-        assert self.width_bytes in (4, 8)
-        self._ctype = ctypes.c_float if self.width_bytes == 4 else ctypes.c_double
+        assert self.width_bytes in (2, 4, 8)
+        # ctypes has no half precision, it is passed as float
+        self._ctype = ctypes.c_double if self.width_bytes == 8 else ctypes.c_float
 
     @property
     def ctype(self):
@@ -1,10 +1,14 @@
 import numpy as np
+from xgrid.util.init import get_config
 from xgrid.util.logging import Logger
-from xgrid.util.typing.annotation import parse_annotation
+from xgrid.util.memory import first_touch, parallel_copy
+from xgrid.util.typing.annotation import f16, f32, f64, parse_annotation
+from xgrid.xgrid.storage import MappedStorage
 from xgrid.util.typing.value import Boolean, Floating, Integer, Structure, Value
 import xgrid.util.typing.reference as ref
 
-from ctypes import c_int32, POINTER
+from ctypes import c_int32, c_void_p, cast, POINTER
+from typing import Literal
 
 
 def parse_numpy_dtype(dtype: Value):
@@ -13,62 +17,291 @@ def parse_numpy_dtype(dtype: Value):
     elif isinstance(dtype, Integer):
         return {8: np.int8, 16: np.int16, 32: np.int32, 64: np.int64}[dtype.width_bits]
     elif isinstance(dtype, Floating):
-        return {32: np.float32, 64: np.float64}[dtype.width_bits]
+        return {16: np.float16, 32: np.float32, 64: np.float64}[dtype.width_bits]
     elif isinstance(dtype, Structure):
         return [(x[0], parse_numpy_dtype(x[1])) for x in dtype.elements]
 
 
+def aligned_empty(shape: tuple[int, ...], dtype, alignment: int = 64) -> np.ndarray:
+    "uninitialized aligned array, its pages are not placed until first touched"
+    dtype = np.dtype(dtype)
+    size = int(np.prod(shape)) * dtype.itemsize
+    raw = np.empty(size + alignment, dtype=np.uint8)
+    offset = -raw.ctypes.data % alignment
+    return raw[offset:offset + size].view(dtype).reshape(shape)
+
+
+def aligned_zeros(shape: tuple[int, ...], dtype, alignment: int = 64) -> np.ndarray:
+    return first_touch(aligned_empty(shape, dtype, alignment))
+
+
+def mask_dtype() -> np.dtype:
+    "type of the boundary labels of grids, set by init"
+    return np.dtype(get_config().mask)
+
+
+NUMPY_ANNOTATIONS = {np.float16: f16, np.float32: f32, np.float64: f64, np.int32: int, np.bool_: bool}
+
+
+def plane_offsets(element: Structure, shape: tuple[int, ...], alignment: int = 64) -> tuple[list[int], int]:
+    "byte offsets of the field planes of a structure of arrays level, and the size of the level"
+    offsets, size = [], 0
+    for _, t in element.elements:
+        offsets.append(size)
+        plane = int(np.prod(shape)) * np.dtype(parse_numpy_dtype(t)).itemsize
+        size += (plane + alignment - 1) // alignment * alignment
+    return offsets, size
+
+
+def active_region(active: np.ndarray, margin: int = 0) -> tuple[slice, ...]:
+    "bounding box of the true cells of active grown by margin, as a region of kernel launches"
+    region = []
+    for axis in range(active.ndim):
+        cells = np.flatnonzero(active.any(axis=tuple(i for i in range(active.ndim) if i != axis)))
+        if len(cells) == 0:
+            return tuple(slice(0, 0) for _ in range(active.ndim))
+        region.append(slice(max(int(cells[0]) - margin, 0),
+                            min(int(cells[-1]) + 1 + margin, active.shape[axis])))
+    return tuple(region)
+
+
+class Planes:
+    "field-wise view of a structure of arrays time level"
+
+    def __init__(self, buffer: np.ndarray, element: Structure, shape: tuple[int, ...]) -> None:
+        self.buffer = buffer
+        self.shape = shape
+        self.dtype = np.dtype(parse_numpy_dtype(element))
+
+        offsets, _ = plane_offsets(element, shape)
+        self.planes: dict[str, np.ndarray] = {}
+        for (name, t), offset in zip(element.elements, offsets):
+            dtype = np.dtype(parse_numpy_dtype(t))
+            size = int(np.prod(shape)) * dtype.itemsize
+            self.planes[name] = buffer[offset:offset + size].view(dtype).reshape(shape)
+
+    @property
+    def fields(self):
+        return list(self.planes.keys())
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.planes[field]
+
+    def __setitem__(self, field: str, value):
+        self.planes[field][...] = value
+
+    def __getattr__(self, field: str) -> np.ndarray:
+        planes = self.__dict__.get("planes", {})
+        if field not in planes:
+            raise AttributeError(field)
+        return planes[field]
+
+
 class Grid:
-    def __init__(self, shape: tuple[int, ...], dtype: type) -> None:
+    def __init__(self, shape: tuple[int, ...], dtype: type, layout: Literal["aos", "soa"] = "aos",
+                 data: np.ndarray | None = None, storage: Literal["memory", "mmap"] = "memory",
+                 path: str | None = None, mapped_boundary: bool = False) -> None:
         self.logger = Logger(self)
 
         dtype_parsed = parse_annotation(dtype)
         if not isinstance(dtype_parsed, Value):
             self.logger.dead(
                 f"Grid element should be value instead of '{dtype_parsed}'")
+        if layout not in ("aos", "soa"):
+            self.logger.dead(f"Unknown grid layout '{layout}'")
+        if layout == "soa" and not isinstance(dtype_parsed, Structure):
+            self.logger.dead(
+                f"Structure of arrays layout requires structure element instead of '{dtype_parsed}'")
         self.numpy_dtype = parse_numpy_dtype(dtype_parsed)
 
         # properties
         self.element = dtype_parsed
         self.shape = shape
+        self.layout = layout
 
         # internal typing used for serialization
-        self.typing = ref.Grid(self.element, self.dimension)
+        self.typing = ref.Grid(self.element, self.dimension, layout)
+
+        # levels of out of core grids are files of the directory at path, reopened when it holds a flushed grid
+        self.storage: MappedStorage | None = None
+        self.mapped_boundary = mapped_boundary
+        manifest = None
+        if storage == "mmap":
+            if path is None or data is not None:
+                self.logger.dead(
+                    "Memory mapped grids require the path of their directory and allocate their own levels")
+            self.storage = MappedStorage(path)
+            manifest = self.storage.manifest()
+        elif storage != "memory":
+            self.logger.dead(f"Unknown grid storage '{storage}'")
+
+        # scratch time level for implicit stencils, allocated once on demand
+        self._scratch: np.ndarray | None = None
+        self._pointers = None
+        # boundary labels, allocated on first access or shared with other grids by assignment
+        self._boundary: np.ndarray | None = None
+
+        if manifest is not None:
+            self._reopen(manifest)
+            return
+
+        # the current time level is either allocated or an array shared with its owner
+        if data is None:
+            self._data = [self._allocate()]
+        else:
+            self._adoptable(data)
+            self._data = [data]
 
-        self._data = [np.zeros(shape=shape, dtype=self.numpy_dtype)]
+    def _allocate(self) -> np.ndarray:
+        if self.storage is not None:
+            if self.layout == "soa":
+                return self.storage.create((plane_offsets(self.element, self.shape)[1],), np.uint8)  # type: ignore
+            return self.storage.create(self.shape, self.numpy_dtype)
+        if self.layout == "soa":
+            offsets, size = plane_offsets(self.element, self.shape)  # type: ignore
+            level = aligned_empty((size,), np.uint8)
+            # every plane is swept by the threads of the stencil loops on its own
+            bounds = offsets + [size]
+            for start, stop in zip(bounds, bounds[1:]):
+                first_touch(level[start:stop], int(np.prod(self.shape)))
+            return level
+        return aligned_zeros(self.shape, self.numpy_dtype)
+
+    def _allocate_boundary(self):
+        if self.storage is not None and self.mapped_boundary:
+            return self.storage.create(self.shape, mask_dtype(), "boundary")
+        return aligned_zeros(self.shape, mask_dtype())
+
+    @property
+    def boundary(self) -> np.ndarray:
+        "boundary labels of the cells, zero until written, kernels skip the labels of grids never given any"
+        if self._boundary is None:
+            self._boundary = self._allocate_boundary()
+        return self._boundary
+
+    @boundary.setter
+    def boundary(self, labels: np.ndarray | None):
+        # labels of the mask type are shared, others are converted, None drops the labels
+        if labels is not None:
+            converted = np.ascontiguousarray(labels, dtype=mask_dtype())
+            if converted.shape != tuple(self.shape):
+                self.logger.dead(
+                    f"Boundary labels of shape {converted.shape} do not match grid of shape {self.shape}")
+            if converted is not labels and not np.array_equal(converted, labels):
+                self.logger.dead(
+                    f"Boundary labels exceed the range of mask type '{mask_dtype()}'")
+            labels = converted
+        self._boundary = labels
+
+    @property
+    def masked(self) -> bool:
+        return self._boundary is not None
+
+    def _manifest(self) -> dict:
+        return {"shape": list(self.shape), "dtype": np.dtype(self.numpy_dtype).str, "layout": self.layout,
+                "mask": mask_dtype().str}
+
+    def _reopen(self, manifest: dict):
+        storage = self.storage
+        assert storage is not None
+        expected = self._manifest()
+        if any(manifest.get(key) != value for key, value in expected.items()):
+            self.logger.dead(
+                f"Mapped grid at '{storage.path}' holds {manifest} instead of {expected}")
 
-        # boundary condition
-        self.boundary = np.zeros(shape=shape, dtype=np.int32)
+        def open(name: str):
+            if self.layout == "soa":
+                return storage.open(name, (plane_offsets(self.element, self.shape)[1],), np.uint8)  # type: ignore
+            return storage.open(name, self.shape, self.numpy_dtype)
+
+        self._data = [open(name) for name in manifest["levels"]]
+        if manifest["scratch"] is not None:
+            self._scratch = open(manifest["scratch"])
+        if manifest["boundary"] is not None:
+            self._boundary = storage.open(manifest["boundary"], self.shape, mask_dtype())
+
+    def flush(self):
+        "write the mapped levels back to their files and record their order, the grid is reopened from its path"
+        if self.storage is None:
+            self.logger.dead("Only memory mapped grids are flushed")
+        levels = [self.storage.name(level) for level in self._data]
+        scratch = None if self._scratch is None else self.storage.name(self._scratch)
+        if None in levels or (self._scratch is not None and scratch is None):
+            self.logger.dead("Unable to flush levels shared with arrays outside the mapped files")
+        boundary = self.storage.name(self._boundary) if self.mapped_boundary and self.masked else None
+        self.storage.flush(dict(self._manifest(), levels=levels, scratch=scratch, boundary=boundary))
+
+    def prefetch(self, region: tuple[slice, ...] | None = None):
+        "ask the os to page in the leading rows of the region on every mapped level ahead of a launch"
+        if self.storage is None:
+            return
+        for level in self._data + ([] if self._scratch is None else [self._scratch]):
+            if self.layout == "soa" or region is None or len(region) == 0:
+                self.storage.prefetch(level, 0, level.nbytes)
+                continue
+            start, stop, _ = region[0].indices(self.shape[0])
+            row = level.nbytes // max(self.shape[0], 1)
+            self.storage.prefetch(level, start * row, stop * row)
 
     def _extend_time(self, depth: int):
+        # levels are kept when a kernel addresses fewer of them, they hold the history for other kernels
         while len(self._data) < depth:
-            self._data.append(
-                np.zeros(shape=self.shape, dtype=self.numpy_dtype))
-        self._data = self._data[:depth]
+            self._data.append(self._allocate())
 
-    def _op_invoke(self, depth: int, tick: bool):
+    def _op_invoke(self, depth: int, tick: bool, scratch: bool = False):
         self._extend_time(depth)
 
         if tick:
             last = self._data.pop()
             self._data.insert(0, last)
 
+        if scratch and self._scratch is None:
+            self._scratch = self._allocate()
+
+        self._pointers = None
+
+    def _op_return(self):
+        # implicit stencils swap the scratch level with the stored time level in place
+        if self._pointers is not None and self._scratch is not None:
+            self._reorder()
+
+        self._pointers = None
+
+    def _reorder(self):
+        "adopt the order the native code left the level pointers in"
+        levels = self._data + ([] if self._scratch is None else [self._scratch])
+        buffers = {buffer.ctypes.data: buffer for buffer in levels}
+        ordered = [buffers[cast(pointer, c_void_p).value]
+                   for pointer in self._pointers[:len(levels)]]  # type: ignore
+        self._data = ordered[:len(self._data)]
+        if self._scratch is not None:
+            self._scratch = ordered[-1]
+
     @property
     def dimension(self):
         return len(self.shape)
 
+    def _level_pointers(self):
+        # time levels followed by the scratch level slot, shared by every argument aliasing this grid
+        if self._pointers is None:
+            level = self.typing.level_ctype
+            levels = [data.ctypes.data_as(level) for data in self._data]
+            levels.append(None if self._scratch is None else self._scratch.ctypes.data_as(level))
+            self._pointers = (level * len(levels))(*levels)
+        return self._pointers
+
     def serialize(self):
-        boundary_mask = self.boundary.ctypes.data_as(POINTER(c_int32))
-        data = (POINTER(self.element.ctype) * len(self._data))(*
-                                                               [data.ctypes.data_as(POINTER(self.element.ctype)) for data in self._data])
+        boundary_mask = None if self._boundary is None else self._boundary.ctypes.data
 
         return self.typing.ctype(len(self._data),
                                  (c_int32 * self.dimension)(*self.shape),
-                                 data,
+                                 self._level_pointers(),
                                  boundary_mask)
 
     @property
     def now(self):
+        if self.layout == "soa":
+            return Planes(self._data[0], self.element, self.shape)  # type: ignore
         return self._data[0]
 
     def fill(self, data: np.ndarray, time: int = 0):
@@ -76,11 +309,440 @@ class Grid:
             self.logger.dead(
                 f"Unable to fill grid with incompatible shape or data type")
 
-        self._extend_time(abs(time))
-        self._data[time] = data.copy()
+        self._extend_time(max(len(self._data), abs(time)))
+        if self.layout == "soa":
+            planes = Planes(self._data[time], self.element, self.shape)  # type: ignore
+            for field in planes.fields:
+                planes[field] = data[field]
+        else:
+            parallel_copy(self._data[time], data)
+
+    @classmethod
+    def from_numpy(cls, data: np.ndarray, dtype: type | None = None, copy: bool = True) -> "Grid":
+        """
+        grid of the shape of the array holding it as the current time level, copied or shared,
+        dtype is inferred for scalars
+        """
+        if dtype is None:
+            dtype = NUMPY_ANNOTATIONS.get(data.dtype.type)
+            if dtype is None:
+                Logger("Grid").dead(
+                    f"Unable to infer grid element of numpy data type '{data.dtype}'")
+        if not copy:
+            return cls(data.shape, dtype, data=data)
+        grid = cls(data.shape, dtype)
+        grid.fill(data)
+        return grid
+
+    def _adoptable(self, data: np.ndarray):
+        if self.layout != "aos":
+            self.logger.dead(
+                f"Unable to share arrays with {self.layout} grids")
+        if data.shape != self.shape or data.dtype != np.dtype(self.numpy_dtype):
+            self.logger.dead(
+                f"Unable to share array of shape {data.shape} and type '{data.dtype}' with grid of shape {self.shape} and type '{np.dtype(self.numpy_dtype)}'")
+        if not data.flags.c_contiguous or not data.flags.writeable:
+            self.logger.dead(
+                "Unable to share array which is not writeable and row major contiguous")
+        if data.ctypes.data % data.dtype.alignment != 0:
+            self.logger.dead(
+                f"Unable to share array not aligned to {data.dtype.alignment} bytes")
+
+    def adopt(self, level: int, data: np.ndarray):
+        "share the array as the time level counted back from the current one, ticking kernels rotate it like other levels"
+        self._adoptable(data)
+        if level < 0:
+            self.logger.dead(f"Invalid time level {level}")
+
+        self._extend_time(level + 1)
+        others = [buffer for i, buffer in enumerate(self._data) if i != level]
+        if self._scratch is not None:
+            others.append(self._scratch)
+        if any(np.shares_memory(buffer, data) for buffer in others):
+            self.logger.dead(
+                "Unable to share array overlapping another time level of the grid")
+        self._data[level] = data
+        self._pointers = None
+
+    def level(self, time: int = 0):
+        "time level counted back from the current one, sharing its memory"
+        if self.layout == "soa":
+            return Planes(self._data[time], self.element, self.shape)  # type: ignore
+        return self._data[time]
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.level()
+        if isinstance(data, np.ndarray) and (dtype is None or np.dtype(dtype) == data.dtype):
+            return data.copy() if copy else data
+        # numpy expects a ValueError when the array cannot be exported without a copy
+        if copy is False:
+            raise ValueError(
+                f"Unable to export the current level of {self.layout} grid as {np.dtype(dtype or self.numpy_dtype)} without a copy")
+        return np.asarray(data, dtype=dtype)
+
+    def __buffer__(self, flags: int):
+        return memoryview(self.level())
+
+    def __dlpack__(self, **kwargs):
+        return self.level().__dlpack__(**kwargs)
+
+    def __dlpack_device__(self):
+        return self.level().__dlpack_device__()
 
     def __getitem__(self, slice):
         return self.now[slice]
 
     def __setitem__(self, slice, value):
         self.now[slice] = value
+
+
+class BundledGrid(Grid):
+    "grid whose elements are interleaved with the other fields of a bundle"
+
+    def __init__(self, bundle: "FieldBundle", name: str, dtype: type) -> None:
+        self.bundle = bundle
+        self.name = name
+        self._data = []
+        self._scratch = None
+        super().__init__(bundle.shape, dtype)
+
+        self.layout = "strided"
+        self.typing = ref.Grid(self.element, self.dimension,
+                               "strided", bundle.numpy_dtype.itemsize)
+
+    def _allocate(self) -> np.ndarray:
+        self.bundle._extend_time(1)
+        return self.bundle._levels[0][self.name]
+
+    def _extend_time(self, depth: int):
+        # time levels are records of the whole bundle
+        self.bundle._extend_time(depth)
+        self.bundle._sync()
+
+    def fill(self, data: np.ndarray, time: int = 0):
+        if data.shape != self.now.shape or data.dtype != self.now.dtype:
+            self.logger.dead(
+                f"Unable to fill grid with incompatible shape or data type")
+
+        self._extend_time(abs(time))
+        self._data[time][...] = data
+
+
+class FieldBundle:
+    "co-accessed grids stored interleaved cell by cell, members are passed to kernels as separate grids"
+
+    def __init__(self, fields: dict[str, type], shape: tuple[int, ...]) -> None:
+        self.logger = Logger(self)
+        self.shape = shape
+
+        elements = []
+        for name, dtype in fields.items():
+            dtype_parsed = parse_annotation(dtype)
+            if not isinstance(dtype_parsed, Value):
+                self.logger.dead(
+                    f"Bundle field '{name}' should be value instead of '{dtype_parsed}'")
+            elements.append((name, parse_numpy_dtype(dtype_parsed)))
+        # fields are aligned within a record as members of a structure in C
+        self.numpy_dtype = np.dtype(elements, align=True)
+
+        # record levels in time order, the current one first, every field has its levels in the same records
+        self._levels: list[np.ndarray] = []
+        self.fields = {name: BundledGrid(self, name, dtype)
+                       for name, dtype in fields.items()}
+
+    def _extend_time(self, depth: int):
+        while len(self._levels) < depth:
+            self._levels.append(aligned_zeros(self.shape, self.numpy_dtype))
+
+    def _sync(self):
+        for name, grid in self.fields.items():
+            grid._data = [level[name] for level in self._levels]
+            grid._pointers = None
+
+    def _op_invoke(self, depth: int, ticked: list["BundledGrid"]):
+        "advance the fields as a whole when a launch ticks any of them, the others keep their current values"
+        self._extend_time(depth)
+        if len(ticked) > 0 and len(self._levels) > 1:
+            self._levels.insert(0, self._levels.pop())
+            for name, grid in self.fields.items():
+                if all(grid is not other for other in ticked):
+                    self._levels[0][name] = self._levels[1][name]
+        self._sync()
+
+    def _reorder(self, grid: "BundledGrid"):
+        "adopt the level order native code left the levels of a field in"
+        records = {level[grid.name].ctypes.data: level for level in self._levels}
+        self._levels = [records[level.ctypes.data] for level in grid._data]
+        self._sync()
+
+    def __getitem__(self, name: str) -> BundledGrid:
+        return self.fields[name]
+
+    def __getattr__(self, name: str) -> BundledGrid:
+        fields = self.__dict__.get("fields", {})
+        if name not in fields:
+            raise AttributeError(name)
+        return fields[name]
+
+    def __iter__(self):
+        return iter(self.fields.values())
+
+
+class Tiles:
+    """
+    dense view of tiled storage, reads gather the allocated tiles and writes scatter into them, basic indexes
+    only gather the tiles they touch
+    """
+
+    def __init__(self, grid: "SparseGrid", pool, activate: bool) -> None:
+        self.grid = grid
+        self.pool = pool
+        self.activate = activate
+
+    @property
+    def shape(self):
+        return self.grid.shape
+
+    @property
+    def dtype(self):
+        return self.pool().dtype
+
+    def dense(self) -> np.ndarray:
+        grid = self.grid
+        pool = self.pool()
+        blocks = np.zeros((grid.table.size, pool.shape[1]), dtype=pool.dtype)
+        tiles = np.flatnonzero(grid.table >= 0)
+        blocks[tiles] = pool[grid.table.flat[tiles]]
+        return grid._unblock(blocks)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.dense() if dtype is None else self.dense().astype(dtype)
+
+    def __getitem__(self, index):
+        window = self.grid._window(index)
+        if window is None:
+            return self.dense()[index]
+        box, local = window
+        return self.grid._gather(self.pool(), box)[local]
+
+    def __setitem__(self, index, value):
+        grid = self.grid
+        window = grid._window(index)
+        if window is None:
+            # advanced indexes may address any cell, the whole grid is gathered
+            window = tuple(slice(0, n) for n in grid.tiles), None
+        box, local = window
+        cells = grid._gather(self.pool(), box)
+        touched = np.zeros(cells.shape, dtype=np.bool_)
+        if local is None:
+            dense = cells[tuple(slice(0, n) for n in grid.shape)]
+            dense[index] = value
+            touched[tuple(slice(0, n) for n in grid.shape)][index] = True
+        else:
+            cells[local] = value
+            touched[local] = True
+
+        # zeros written to inactive tiles are already read as zeros
+        tiles = tuple(s.stop - s.start for s in box)
+        written = np.flatnonzero(grid._split(touched & grid._nonzero(cells), tiles).any(axis=1))
+        written = np.ravel_multi_index(tuple(c + s.start for c, s in zip(
+            np.unravel_index(written, tiles), box)), grid.tiles)
+        if np.any(grid.table.flat[written] < 0):
+            if not self.activate:
+                grid.logger.dead(
+                    "Unable to write non-zero cells of inactive tiles through a time level, activate them first")
+            grid._activate_tiles(written)
+
+        table = grid.table[box].flatten()
+        changed = np.flatnonzero(grid._split(touched, tiles).any(axis=1) & (table >= 0))
+        self.pool()[table[changed]] = grid._split(cells, tiles)[changed]
+
+
+class SparseGrid(Grid):
+    """
+    grid storing fixed size tiles of cells allocated when activated, stencils only sweep the active tiles
+    and cells of inactive tiles read as zero
+    """
+
+    def __init__(self, shape: tuple[int, ...], dtype: type, tile: int = 8) -> None:
+        self.tile = tile
+        self.tiles = tuple(-(-n // tile) for n in shape)
+        self.table = np.full(self.tiles, -1, dtype=np.int32)
+        self.origins = np.zeros((1, len(shape)), dtype=np.int32)
+        self.active = np.zeros(0, dtype=np.int32)
+        self._masks = np.zeros((1, tile ** len(shape)), dtype=mask_dtype())
+        self._data = []
+        self._scratch = None
+        super().__init__(shape, dtype)
+
+        self.layout = "sparse"
+        self.typing = ref.Grid(self.element, self.dimension,
+                               "sparse", tile=tile)
+
+    @property
+    def capacity(self) -> int:
+        return len(self._masks)
+
+    def _allocate(self) -> np.ndarray:
+        return aligned_zeros((self.capacity, self.tile ** self.dimension), self.numpy_dtype)
+
+    def _allocate_boundary(self):
+        # labels written to inactive tiles activate them like values do
+        return Tiles(self, lambda: self._masks, True)
+
+    @property
+    def masked(self) -> bool:
+        # labels are allocated along with the tiles
+        return True
+
+    def _block(self, array: np.ndarray, padding=0) -> np.ndarray:
+        "cells of a dense array grouped by tiles, one row per tile of the tile grid"
+        padded = np.full(tuple(n * self.tile for n in self.tiles), padding, dtype=array.dtype)
+        padded[tuple(slice(0, n) for n in self.shape)] = array
+        return self._split(padded, self.tiles)
+
+    def _unblock(self, blocks: np.ndarray) -> np.ndarray:
+        padded = self._merge(blocks, self.tiles)
+        return padded[tuple(slice(0, n) for n in self.shape)].copy()
+
+    def _split(self, padded: np.ndarray, tiles: tuple[int, ...]) -> np.ndarray:
+        "cells of an array covering whole tiles grouped by tiles, one row per tile"
+        blocks = padded.reshape(sum(((n, self.tile) for n in tiles), ()))
+        order = list(range(0, 2 * self.dimension, 2)) + list(range(1, 2 * self.dimension, 2))
+        return blocks.transpose(order).reshape(int(np.prod(tiles)), self.tile ** self.dimension)
+
+    def _merge(self, blocks: np.ndarray, tiles: tuple[int, ...]) -> np.ndarray:
+        padded = blocks.reshape(tiles + (self.tile,) * self.dimension)
+        order = sum(((i, self.dimension + i) for i in range(self.dimension)), ())
+        return padded.transpose(order).reshape(tuple(n * self.tile for n in tiles))
+
+    def _gather(self, pool: np.ndarray, box: tuple[slice, ...]) -> np.ndarray:
+        "cells of the tiles in the box of tile indexes, cells of inactive tiles read as zero"
+        table = self.table[box]
+        blocks = np.zeros((table.size, pool.shape[1]), dtype=pool.dtype)
+        tiles = np.flatnonzero(table >= 0)
+        blocks[tiles] = pool[table.flat[tiles]]
+        return self._merge(blocks, table.shape)
+
+    def _window(self, index) -> tuple[tuple[slice, ...], tuple] | None:
+        """
+        box of tile indexes covering the cells of a basic index and the index relative to its first cell,
+        None for advanced indexes
+        """
+        index = index if isinstance(index, tuple) else (index,)
+        if not all(isinstance(i, (int, np.integer, slice)) and not isinstance(i, bool) or i is Ellipsis
+                   for i in index):
+            return None
+        ellipsis = [k for k, i in enumerate(index) if i is Ellipsis]
+        if len(ellipsis) > 1 or len(index) - len(ellipsis) > self.dimension:
+            return None
+        if ellipsis:
+            k = ellipsis[0]
+            index = index[:k] + (slice(None),) * (self.dimension - len(index) + 1) + index[k + 1:]
+        index = index + (slice(None),) * (self.dimension - len(index))
+
+        box, local = [], []
+        for i, n in zip(index, self.shape):
+            if isinstance(i, slice):
+                start, stop, step = i.indices(n)
+                count = len(range(start, stop, step))
+                last = start + (count - 1) * step
+                lower, upper = (min(start, last), max(start, last) + 1) if count > 0 else (0, 0)
+            else:
+                if not -n <= i < n:
+                    return None
+                lower = upper = int(i) % n
+                upper += 1
+            base = lower // self.tile * self.tile
+            box.append(slice(lower // self.tile, -(-upper // self.tile)))
+            if isinstance(i, slice):
+                offset = start - base
+                # a negative stop of a reversed slice would count from the end
+                end = offset + count * step
+                local.append(slice(offset, None if end < 0 else end, step) if count > 0 else slice(0, 0))
+            else:
+                local.append(lower - base)
+        return tuple(box), tuple(local)
+
+    def _nonzero(self, array: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(array).view(np.uint8).reshape(array.shape + (array.dtype.itemsize,)).any(axis=-1)
+
+    def _resize(self, capacity: int):
+        def grow(array: np.ndarray) -> np.ndarray:
+            resized = aligned_zeros((capacity,) + array.shape[1:], array.dtype)
+            resized[:len(array)] = array
+            return resized
+
+        self._data = [grow(level) for level in self._data]
+        if self._scratch is not None:
+            self._scratch = grow(self._scratch)
+        self._masks = grow(self._masks)
+        self.origins = grow(self.origins)
+        self._pointers = None
+
+    def activate(self, cells: np.ndarray):
+        "allocate the tiles touching the true cells of the mask"
+        self._activate_tiles(np.flatnonzero(self._block(cells).any(axis=1)))
+
+    def _activate_tiles(self, tiles: np.ndarray):
+        tiles = tiles[self.table.flat[tiles] < 0]
+        if len(tiles) == 0:
+            return
+
+        def free_slots() -> np.ndarray:
+            # slot 0 is never assigned so that levels always own memory of their own
+            used = np.zeros(self.capacity, dtype=np.bool_)
+            used[0] = True
+            used[self.active] = True
+            return np.flatnonzero(~used)
+
+        free = free_slots()
+        if len(free) < len(tiles):
+            self._resize(max(2 * self.capacity, self.capacity + len(tiles) - len(free)))
+            free = free_slots()
+
+        slots = free[:len(tiles)].astype(np.int32)
+        self.table.flat[tiles] = slots
+        self.origins[slots] = np.stack(np.unravel_index(
+            tiles, self.tiles), axis=1) * self.tile
+        self.active = self.table.flat[np.flatnonzero(self.table >= 0)].astype(np.int32)
+
+    def deactivate(self, cells: np.ndarray):
+        "release the tiles whose cells are all true in the mask, their cells read as zero afterwards"
+        tiles = np.flatnonzero(self._block(cells, True).all(axis=1) & (self.table.flatten() >= 0))
+        slots = self.table.flat[tiles]
+        for level in self._data:
+            level[slots] = 0
+        self._masks[slots] = 0
+        self.table.flat[tiles] = -1
+        self.active = self.table.flat[np.flatnonzero(self.table >= 0)].astype(np.int32)
+
+    def serialize(self):
+        pointer = POINTER(c_int32)
+        return self.typing.ctype(len(self._data),
+                                 (c_int32 * self.dimension)(*self.shape),
+                                 self._level_pointers(),
+                                 self._masks.ctypes.data,
+                                 self.table.ctypes.data_as(pointer),
+                                 self.origins.ctypes.data_as(pointer),
+                                 self.active.ctypes.data_as(pointer),
+                                 len(self.active),
+                                 self.capacity)
+
+    @property
+    def now(self):
+        return Tiles(self, lambda: self._data[0], True)
+
+    def level(self, time: int = 0):
+        return Tiles(self, lambda: self._data[time], False)
+
+    def fill(self, data: np.ndarray, time: int = 0):
+        if data.shape != self.shape or data.dtype != self.numpy_dtype:
+            self.logger.dead(
+                f"Unable to fill grid with incompatible shape or data type")
+
+        # tiles holding non-zero cells are activated
+        self.activate(self._nonzero(data))
+        self._extend_time(max(len(self._data), abs(time)))
+        tiles = np.flatnonzero(self.table >= 0)
+        self._data[time][self.table.flat[tiles]] = self._block(data)[tiles]
@@ -0,0 +1,73 @@
+import json
+import mmap
+import os
+
+import numpy as np
+
+
+# description of the mapped levels of a grid, written when the grid is flushed
+MANIFEST = "levels.json"
+
+
+def advise(mapping: mmap.mmap, hint: str, start: int = 0, length: int | None = None):
+    "paging hint of a mapped range, ignored where the platform has no madvise"
+    advice = getattr(mmap, hint, None)
+    if advice is None or not hasattr(mapping, "madvise"):
+        return
+    # ranges start on page boundaries
+    aligned = start - start % mmap.PAGESIZE
+    length = len(mapping) - start if length is None else length
+    mapping.madvise(advice, aligned, min(length + start - aligned, len(mapping) - aligned))
+
+
+class MappedStorage:
+    "time levels stored in the files of a directory, mapped into memory and paged in and out by the os"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        # mapping and file name of every mapped array by its address
+        self.mappings: dict[int, tuple[mmap.mmap, str]] = {}
+
+    def manifest(self) -> dict | None:
+        name = os.path.join(self.path, MANIFEST)
+        if not os.path.exists(name):
+            return None
+        with open(name, "r") as file:
+            return json.load(file)
+
+    def create(self, shape: tuple[int, ...], dtype, prefix: str = "level") -> np.ndarray:
+        # files are created sparse, their pages read as zero until written
+        index = 0
+        while os.path.exists(os.path.join(self.path, f"{prefix}{index}.bin")):
+            index += 1
+        return self.open(f"{prefix}{index}.bin", shape, dtype, True)
+
+    def open(self, name: str, shape: tuple[int, ...], dtype, create: bool = False) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        with open(os.path.join(self.path, name), "w+b" if create else "r+b") as file:
+            if create:
+                file.truncate(max(size, 1))
+            mapping = mmap.mmap(file.fileno(), max(size, 1))
+        # stencil loops sweep the cells of a level in row major order
+        advise(mapping, "MADV_SEQUENTIAL")
+        array = np.frombuffer(mapping, dtype=np.uint8, count=size).view(dtype).reshape(shape)
+        self.mappings[array.ctypes.data] = (mapping, name)
+        return array
+
+    def name(self, array: np.ndarray) -> str | None:
+        mapped = self.mappings.get(array.ctypes.data)
+        return None if mapped is None else mapped[1]
+
+    def prefetch(self, array: np.ndarray, start: int, stop: int):
+        "ask the os to page in a byte range of a mapped array ahead of a sweep"
+        mapped = self.mappings.get(array.ctypes.data)
+        if mapped is not None and stop > start:
+            advise(mapped[0], "MADV_WILLNEED", start, stop - start)
+
+    def flush(self, manifest: dict):
+        for mapping, _ in self.mappings.values():
+            mapping.flush()
+        with open(os.path.join(self.path, MANIFEST), "w") as file:
+            json.dump(manifest, file)